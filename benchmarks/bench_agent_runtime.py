@@ -0,0 +1,57 @@
+# benchmarks/bench_agent_runtime.py
+"""How quickly a runaway agent task stops: cancellation and deadlines.
+
+A scripted model (benchmarks/stub_openai_server.py) asks the agent to run
+a command that would take 30 s. The task is cancelled from another thread
+after `CANCEL_AFTER` seconds, as barge-in or the Escape key would; then
+the same command runs under a short command deadline and a short task
+budget. Reports how long each took to return control, and whether any
+of the commands was left running.
+
+    python benchmarks/bench_agent_runtime.py
+"""
+import json
+import os
+import sys
+import threading
+import time
+import psutil
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stub_openai_server import StubServer
+
+CANCEL_AFTER = 1.0
+TAG = "commandly-runaway-benchmark"
+
+server = StubServer(latency=0.1).start()
+os.environ["COMMANDLY_API_BASE_URL"] = server.base_url
+os.environ["COMMANDLY_LLM_CACHE"] = "false"
+
+from modules import agent_core
+from modules.agent_runtime import AgentRuntime
+
+agent_core.FULL_CONTROL = True  # the scripted command is harmless
+RUNAWAY = f'"{sys.executable}" -c "import time; time.sleep(30)" {TAG}'
+CALL = {"tool_calls": [{"id": "call_0", "type": "function",
+                        "function": {"name": "execute_command", "arguments": json.dumps({"command": RUNAWAY})}}]}
+
+
+def attempt(name, runtime, cancel_after=None):
+    server.script = [CALL, {"content": "The command finished."}]
+    if cancel_after is not None:
+        threading.Timer(cancel_after, runtime.cancel).start()
+    start = time.perf_counter()
+    reply = runtime.run("run the long job")
+    elapsed = time.perf_counter() - start
+    print(f"🧪 {name:22s}: returned after {elapsed:5.2f} s -> {reply.splitlines()[0]}")
+
+
+attempt("cancel (Escape)", AgentRuntime(), cancel_after=CANCEL_AFTER)
+attempt("command deadline 2 s", AgentRuntime(tool_timeouts={"execute_command": 2.0}))
+attempt("task budget 1.5 s", AgentRuntime(budget=1.5))
+time.sleep(0.5)
+left = [p for p in psutil.process_iter(["cmdline", "status"])
+        if TAG in " ".join(p.info["cmdline"] or []) and p.info["status"] != psutil.STATUS_ZOMBIE]
+print(f"🧹 Runaway processes left behind: {len(left)}")
@@ -0,0 +1,53 @@
+# benchmarks/bench_agent_tools.py
+"""Agent task time: one tool call per model turn vs parallel calls in one turn.
+
+Runs run_agent against benchmarks/stub_openai_server.py with a scripted
+model that reads four files and answers. The sequential script asks for
+one read per turn (as the JSON-only protocol forced); the parallel
+script asks for all four in one turn. Each model turn costs `LATENCY`.
+
+    python benchmarks/bench_agent_tools.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stub_openai_server import StubServer
+
+LATENCY = 0.8  # seconds per model turn
+
+server = StubServer(latency=LATENCY).start()
+os.environ["COMMANDLY_API_BASE_URL"] = server.base_url
+os.environ["COMMANDLY_LLM_CACHE"] = "false"
+
+from modules.agent_core import run_agent
+
+folder = tempfile.mkdtemp()
+paths = []
+for name in ("a", "b", "c", "d"):
+    paths.append(os.path.join(folder, f"{name}.txt"))
+    with open(paths[-1], "w") as f:
+        f.write(f"contents of {name}\n")
+
+
+def read(i, path):
+    return {"id": f"call_{i}", "type": "function",
+            "function": {"name": "read_file", "arguments": json.dumps({"path": path})}}
+
+
+scripts = {
+    "sequential": [{"tool_calls": [read(i, p)]} for i, p in enumerate(paths)],
+    "parallel": [{"tool_calls": [read(i, p) for i, p in enumerate(paths)]}],
+}
+for name, script in scripts.items():
+    server.script = script + [{"content": "Read all four files."}]
+    before = server.stats["requests"]
+    start = time.perf_counter()
+    reply = run_agent("Summarise the four text files")
+    elapsed = time.perf_counter() - start
+    print(f"🧪 {name:10s}: {server.stats['requests'] - before} model turns, {elapsed:.2f} s -> {reply}")
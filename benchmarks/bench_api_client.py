@@ -0,0 +1,121 @@
+# benchmarks/bench_api_client.py
+"""API client latency against a local stub: SDK defaults vs modules.api_client.
+
+The baseline is what the app used before: one default client per module
+(transcription and speech on one, chat on another), default keep-alive
+expiry, SDK retry policy and no overall timeout. Three scenarios run
+against benchmarks/stub_openai_server.py:
+
+  turns    transcription -> chat -> speech per turn with the user idle
+           between turns; new connections pay a simulated handshake
+  flaky    a share of requests fail with 503 and must be retried
+  hung     the server stops answering; how long until the caller gets
+           control back
+
+Idle gaps and keep-alive expiries are scaled down 10x (SDK 5 s -> 0.5 s,
+ours 60 s -> 6 s, idle 8 s -> 0.8 s) so the run takes under a minute.
+
+    python benchmarks/bench_api_client.py
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import openai
+from modules.api_client import httpx, make_client
+from stub_openai_server import StubServer
+
+SCALE = 0.1
+TURNS = 8
+HANDSHAKE_S = 0.15
+LATENCY_S = 0.05
+FLAKY_CALLS = 40
+FAIL_RATE = 0.2
+HANG_S = 4.0
+CHAT_TIMEOUT_S = 1.0
+MESSAGES = [{"role": "user", "content": "open the calculator"}]
+
+
+def baseline_client(base_url):
+    http_client = openai.DefaultHttpxClient(limits=httpx.Limits(
+        max_connections=1000, max_keepalive_connections=100, keepalive_expiry=5.0 * SCALE))
+    return openai.OpenAI(api_key="local", base_url=base_url, http_client=http_client)
+
+
+def ours(base_url):
+    return make_client(base_url, keepalive=60.0 * SCALE)
+
+
+def turn(voice, chat):
+    start = time.perf_counter()
+    voice.audio.transcriptions.create(model="whisper-1", file=("speech.wav", b"\0" * 32000), language="en")
+    chat.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+    with voice.audio.speech.with_streaming_response.create(
+            model="tts-1", voice="nova", input="Calculator is open.", response_format="pcm") as response:
+        for _ in response.iter_bytes(4800):
+            pass
+    return time.perf_counter() - start
+
+
+def scenario_turns():
+    print(f"turns: {TURNS} turns, {8 * SCALE:.1f} s idle between them, "
+          f"{HANDSHAKE_S * 1000:.0f} ms per new connection, {LATENCY_S * 1000:.0f} ms per request")
+    for label, build in (("SDK defaults", None), ("shared pool", ours)):
+        server = StubServer(latency=LATENCY_S, handshake=HANDSHAKE_S).start()
+        if build is None:
+            voice, chat = baseline_client(server.base_url), baseline_client(server.base_url)
+        else:
+            voice = chat = build(server.base_url)
+        times = []
+        for _ in range(TURNS):
+            times.append(turn(voice, chat))
+            time.sleep(8 * SCALE)
+        times = np.array(times[1:]) * 1000  # the first turn always connects
+        print(f"  {label:<14} turn p50 {np.percentile(times, 50):6.0f} ms  p95 {np.percentile(times, 95):6.0f} ms  "
+              f"connections {server.stats['connections']}")
+        server.shutdown()
+
+
+def scenario_flaky():
+    print(f"\nflaky: {FLAKY_CALLS} chat calls, {FAIL_RATE:.0%} answered with 503")
+    for label, build in (("SDK defaults", baseline_client), ("shared pool", ours)):
+        server = StubServer(latency=LATENCY_S, fail_rate=FAIL_RATE).start()
+        client = build(server.base_url)
+        times, failed = [], 0
+        for _ in range(FLAKY_CALLS):
+            start = time.perf_counter()
+            try:
+                client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+            except openai.APIError:
+                failed += 1
+            times.append(time.perf_counter() - start)
+        times = np.array(times) * 1000
+        print(f"  {label:<14} ok {FLAKY_CALLS - failed}/{FLAKY_CALLS}  mean {times.mean():6.0f} ms  "
+              f"p95 {np.percentile(times, 95):6.0f} ms  max {times.max():6.0f} ms")
+        server.shutdown()
+
+
+def scenario_hung():
+    print(f"\nhung: server holds every request for {HANG_S:.0f} s")
+    server = StubServer(latency=LATENCY_S, hang=HANG_S, hang_rate=1.0).start()
+    print(f"  {'SDK defaults':<14} would wait up to 3 x 600 s (default timeout, retried twice); not run")
+    client = ours(server.base_url).with_options(timeout=httpx.Timeout(CHAT_TIMEOUT_S, connect=1.0))
+    start = time.perf_counter()
+    try:
+        client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+        outcome = "answered"
+    except openai.APITimeoutError:
+        outcome = "timed out"
+    print(f"  {'shared pool':<14} {outcome} after {time.perf_counter() - start:.2f} s "
+          f"(chat timeout {CHAT_TIMEOUT_S:.0f} s)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    scenario_turns()
+    scenario_flaky()
+    scenario_hung()
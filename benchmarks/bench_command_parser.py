@@ -0,0 +1,66 @@
+# benchmarks/bench_command_parser.py
+"""Simple commands: local parser fast path vs a round trip through the agent.
+
+Coverage: how many of the labeled agent requests in modules/data/intents.tsv
+the parser handles, and whether it ever claims a chat request. Latency:
+"open notepad" through parse_command + run_command, and through run_agent
+against benchmarks/stub_openai_server.py scripted to call the same tool
+(`LATENCY` per model turn). The tool itself is replaced by a no-op in both
+paths, so only the routing overhead is measured.
+
+    python benchmarks/bench_command_parser.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stub_openai_server import StubServer
+
+LATENCY = 0.6  # seconds per model turn, a typical small-model round trip
+RUNS = 5
+
+server = StubServer(latency=LATENCY).start()
+os.environ["COMMANDLY_API_BASE_URL"] = server.base_url
+os.environ["COMMANDLY_LLM_CACHE"] = "false"
+os.environ["COMMANDLY_MACROS"] = "false"  # measure the model round trips, not a replay
+
+from modules import agent_core, agent_runtime, command_parser
+from modules.intent_router import load_examples
+
+texts, labels = load_examples()
+handled = [t for t, label in zip(texts, labels) if label == "agent" and command_parser.parse_command(t)]
+wrong = [t for t, label in zip(texts, labels) if label == "chat" and command_parser.parse_command(t)]
+print(f"🧪 Parser handles {len(handled)}/{labels.count('agent')} agent requests, "
+      f"claims {len(wrong)}/{labels.count('chat')} chat requests {wrong if wrong else ''}")
+
+start = time.perf_counter()
+for _ in range(100):
+    for text in texts:
+        command_parser.parse_command(text)
+print(f"⏱️ parse_command: {(time.perf_counter() - start) / (100 * len(texts)) * 1e6:.1f} µs per utterance")
+
+launch = lambda tool, args: f"✅ Successfully opened {args.get('name')}"
+agent_core.execute_tool = launch
+agent_runtime.ASYNC_TOOLS = {}  # launch programs through the no-op too
+
+fast = []
+for _ in range(RUNS):
+    start = time.perf_counter()
+    command_parser.run_command(command_parser.parse_command("open notepad"))
+    fast.append(time.perf_counter() - start)
+
+slow = []
+call = {"id": "call_0", "type": "function",
+        "function": {"name": "open_application", "arguments": json.dumps({"name": "notepad"})}}
+for _ in range(RUNS):
+    server.script = [{"tool_calls": [call]}, {"content": "Notepad is open."}]
+    start = time.perf_counter()
+    agent_core.run_agent("open notepad")
+    slow.append(time.perf_counter() - start)
+
+print(f"⏱️ 'open notepad' via fast path: {min(fast) * 1000:8.2f} ms")
+print(f"⏱️ 'open notepad' via agent:     {min(slow) * 1000:8.2f} ms ({LATENCY} s per model turn)")
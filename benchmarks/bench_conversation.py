@@ -0,0 +1,66 @@
+# benchmarks/bench_conversation.py
+"""Request size and latency over a long session: full history vs token-budgeted window.
+
+Runs many chat turns against benchmarks/stub_openai_server.py. The
+unbounded mode sends every earlier message on every turn, as the app
+used to; the managed mode uses ConversationManager, which summarises
+evicted turns on a background thread through the same stub.
+
+    python benchmarks/bench_conversation.py [turns]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stub_openai_server import StubServer, REPLY
+
+TURNS = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+REPORT_AT = [t for t in (10, 50, 100, 200, 400, 800) if t <= TURNS]
+
+server = StubServer(latency=0.0, reply=REPLY).start()
+os.environ["COMMANDLY_API_BASE_URL"] = server.base_url
+os.environ["COMMANDLY_LLM_CACHE"] = "false"
+
+from modules.conversation import ConversationManager, estimate_tokens
+from modules.gpt_integration import chat_completion
+
+SYSTEM = "You are Commandly. Be concise, helpful, and friendly."
+
+
+def question(i):
+    return f"Question {i}: how do Python lists, tuples and dictionaries differ for this case?"
+
+
+def run(managed):
+    convo = ConversationManager(SYSTEM) if managed else None
+    history = [{"role": "system", "content": SYSTEM}]
+    rows = []
+    for i in range(1, TURNS + 1):
+        user = {"role": "user", "content": question(i)}
+        messages = convo.messages([user]) if managed else history + [user]
+        start = time.perf_counter()
+        reply = chat_completion(messages)
+        elapsed = time.perf_counter() - start
+        turn = [user, {"role": "assistant", "content": reply}]
+        if managed:
+            convo.extend(turn)
+        else:
+            history.extend(turn)
+        if i in REPORT_AT:
+            rows.append((i, sum(estimate_tokens(m) for m in messages),
+                         len(json.dumps(messages)) / 1024, elapsed * 1000))
+    if managed:
+        convo.wait(30)
+        print(f"   {convo.evicted} turns summarised, summary {len(convo.summary)} chars")
+    return rows
+
+
+for managed in (False, True):
+    print(f"🧪 {'token-budgeted window' if managed else 'full history'}")
+    for turn, tokens, kb, ms in run(managed):
+        print(f"   turn {turn:4d}: ~{tokens:6d} tokens, {kb:7.1f} KB request, {ms:6.1f} ms")
+print(f"📨 Stub requests: {server.stats['requests']}")
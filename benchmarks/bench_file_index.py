@@ -0,0 +1,85 @@
+# benchmarks/bench_file_index.py
+"""find_files on a large tree: recursive glob vs the incremental file index.
+
+Builds a synthetic tree (default 500,000 empty files in 5,000 folders) in
+a temporary folder, then times:
+  - the old glob walk for one query
+  - building the index from nothing (scandir walk, trigram index, save)
+  - a restart: loading the saved index and checking every folder's mtime
+  - queries against the warm index (substring, short, misspelt)
+  - a refresh after one file was added
+
+    python benchmarks/bench_file_index.py [files]
+"""
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.tools.file_index import FileIndex
+
+FILES = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+PER_FOLDER = 100
+WORDS = ["user", "order", "payment", "config", "handler", "service", "model", "view", "util", "test",
+         "client", "server", "cache", "index", "parser", "report", "session", "schema", "router", "worker"]
+EXTS = [".py", ".js", ".ts", ".md", ".json", ".txt", ".yaml", ".css"]
+
+
+def glob_find(root, query, limit=20):
+    """The old find_files"""
+    matches = []
+    for file_path in glob.glob(f"{root}/**/*{query}*", recursive=True):
+        if os.path.isfile(file_path):
+            matches.append(file_path)
+    return matches[:limit]
+
+
+def timed(label, fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"⏱️ {label:46s} {(time.perf_counter() - start) / repeat * 1000:9.2f} ms")
+    return result
+
+
+root = tempfile.mkdtemp(prefix="commandly-index-")
+cache = os.path.join(tempfile.mkdtemp(), "index.json")
+try:
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    folders = FILES // PER_FOLDER
+    for f in range(folders):
+        folder = os.path.join(root, f"pkg{f // 100:02d}", f"mod{f % 100:02d}")
+        os.makedirs(folder)
+        a, b, e = rng.integers(len(WORDS), size=PER_FOLDER), rng.integers(len(WORDS), size=PER_FOLDER), \
+            rng.integers(len(EXTS), size=PER_FOLDER)
+        for i in range(PER_FOLDER):
+            open(os.path.join(folder, f"{WORDS[a[i]]}_{WORDS[b[i]]}_{f}_{i}{EXTS[e[i]]}"), "w").close()
+        if f == folders // 2:
+            target = f"{WORDS[a[7]]}_{WORDS[b[7]]}_{f}_7"  # one file the exact query should find
+    print(f"🌳 {FILES} files in {folders} folders created in {time.perf_counter() - start:.1f} s")
+    time.sleep(2.1)  # let folder mtimes settle (recent ones are rescanned every time)
+
+    timed("glob walk, one query (old find_files)", lambda: glob_find(root, target))
+    cold = timed("index: cold build", lambda: FileIndex(root, path=cache, refresh_s=0))
+    timed("  scandir walk + trigram index", lambda: cold.refresh(force=True))
+    timed("  saving (off the search path)", cold.flush)
+    index = timed("index: restart (load + mtime check)", lambda: FileIndex(root, path=cache, refresh_s=3600))
+    timed("  of which the mtime check", lambda: index.refresh(force=True))
+    print(f"   rescanned {index.rescanned} folders after the restart, {len(index)} files indexed")
+    misspelt = target.replace("_", "", 1)
+    for query in [target, "router", "py", misspelt]:
+        hits = timed(f"query {query!r}", lambda: index.search(query), repeat=20)
+        print(f"   {len(hits)} hits, first: {os.path.relpath(hits[0], root) if hits else None}")
+    open(os.path.join(root, "pkg00", "mod07", "new_payment_file.py"), "w").close()
+    timed("refresh after adding one file", lambda: index.refresh(force=True))
+    print(f"   rescanned {index.rescanned} folder(s); first hit {index.search('new_payment_file')[0]}")
+    timed("query 'payment' after the change", lambda: index.search("payment"), repeat=20)
+finally:
+    shutil.rmtree(root, ignore_errors=True)
+    shutil.rmtree(os.path.dirname(cache), ignore_errors=True)
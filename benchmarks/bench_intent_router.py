@@ -0,0 +1,80 @@
+# benchmarks/bench_intent_router.py
+"""Routing accuracy and per-call latency: substring triggers vs the intent router.
+
+Accuracy is measured by 5-fold cross-validation over modules/data/intents.tsv
+(the classifier never sees the utterances it is scored on). "chat->agent"
+counts chat requests sent to the agent, the expensive mistake. Latency
+is the mean time of one routing call over every utterance in the file.
+
+    python benchmarks/bench_intent_router.py
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.intent_router import TRIGGERS, IntentClassifier, IntentRouter, KeywordMatcher, load_examples
+
+FOLDS = 5
+REPEAT = 20
+
+
+def substring_mode(text):
+    """The old decide_mode: any trigger anywhere in the text"""
+    t = text.lower()
+    return "agent" if any(trigger in t for trigger in TRIGGERS) else "chat"
+
+
+def folds(labels, k=FOLDS, seed=0):
+    """Stratified fold number for each example"""
+    rng = np.random.default_rng(seed)
+    assignment = np.zeros(len(labels), dtype=int)
+    for label in set(labels):
+        idx = np.flatnonzero(np.array(labels) == label)
+        rng.shuffle(idx)
+        assignment[idx] = np.arange(len(idx)) % k
+    return assignment
+
+
+texts, labels = load_examples()
+assignment = folds(labels)
+matcher = KeywordMatcher()
+predictions = {"substring (old)": [], "word-boundary keywords": [], "classifier only": [], "router": []}
+truth = []
+for k in range(FOLDS):
+    train = [i for i in range(len(texts)) if assignment[i] != k]
+    test = [i for i in range(len(texts)) if assignment[i] == k]
+    classifier = IntentClassifier.fit([texts[i] for i in train], [labels[i] for i in train])
+    router = IntentRouter(classifier, matcher)
+    for i in test:
+        truth.append(labels[i])
+        predictions["substring (old)"].append(substring_mode(texts[i]))
+        predictions["word-boundary keywords"].append("agent" if matcher.match(texts[i]) else "chat")
+        predictions["classifier only"].append("agent" if classifier.probability(texts[i]) >= 0.5 else "chat")
+        predictions["router"].append(router.route(texts[i]).mode)
+
+truth = np.array(truth)
+print(f"🧪 {len(texts)} utterances, {FOLDS}-fold cross-validation")
+for name, predicted in predictions.items():
+    predicted = np.array(predicted)
+    accuracy = np.mean(predicted == truth)
+    chat_to_agent = np.sum((truth == "chat") & (predicted == "agent"))
+    agent_to_chat = np.sum((truth == "agent") & (predicted == "chat"))
+    print(f"   {name:24s} accuracy {accuracy:6.1%}   chat->agent {chat_to_agent:3d}   agent->chat {agent_to_chat:3d}")
+
+start = time.perf_counter()
+full = IntentClassifier.fit(texts, labels)
+print(f"⏱️ Training on all {len(texts)} examples: {(time.perf_counter() - start) * 1000:.0f} ms")
+router = IntentRouter(full, matcher)
+for name, fn in [("substring (old)", substring_mode),
+                 ("word-boundary keywords", matcher.match),
+                 ("classifier only", full.probability),
+                 ("router", router.route)]:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        for text in texts:
+            fn(text)
+    per_call = (time.perf_counter() - start) / (REPEAT * len(texts)) * 1e6
+    print(f"⏱️ {name:24s} {per_call:7.1f} µs per call")
@@ -0,0 +1,76 @@
+# benchmarks/bench_job_runner.py
+"""execute_command on chatty and slow commands: subprocess.run vs the job runner.
+
+A child writes (default) 200 MB of log lines. subprocess.run with
+capture_output keeps every byte; a job keeps JOB_BUFFER_KB per stream.
+Peak Python memory is from tracemalloc. Then: how soon the first line of
+a slow command can be seen (subprocess.run only returns at exit), three
+1-second commands run one after another vs as concurrent jobs, and what
+a command that overruns its timeout leaves behind.
+
+    python benchmarks/bench_job_runner.py [megabytes]
+"""
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.tools import system_control
+from modules.tools.job_runner import JOB_BUFFER_KB, get_job_runner
+
+MEGABYTES = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+PYTHON = f'"{sys.executable}" -u -c'
+CHATTY = f'{PYTHON} "import sys; line = \'x\' * 99 + chr(10); [sys.stdout.write(line * 10000) for _ in range({MEGABYTES})]"'
+SLOW = f'{PYTHON} "import time; print(\'compiling 1/3\'); time.sleep(2); print(\'done\')"'
+
+
+def old_execute_command(command, timeout=30):
+    """The old execute_command"""
+    try:
+        result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=timeout)
+        output = f"Exit code: {result.returncode}\n"
+        if result.stdout:
+            output += f"Output:\n{result.stdout}\n"
+        if result.stderr:
+            output += f"Errors:\n{result.stderr}\n"
+        return output
+    except subprocess.TimeoutExpired:
+        return f"❌ Command timed out ({timeout}s limit)"
+
+
+def timed(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"⏱️ {label:44s} {elapsed * 1000:9.1f} ms {peak / 1e6:9.1f} MB peak")
+    return result
+
+
+def first_line(job):
+    while "compiling" not in job.stdout.read()[0]:
+        time.sleep(0.01)
+
+
+runner = get_job_runner()
+print(f"📜 {MEGABYTES} MB of output, job buffers of {JOB_BUFFER_KB} KB per stream")
+old = timed("subprocess.run, chatty command", lambda: old_execute_command(CHATTY, timeout=120))
+new = timed("job runner, chatty command", lambda: system_control.execute_command(CHATTY, timeout=120))
+print(f"   result sizes: {len(old) / 1e6:.1f} MB before, {len(new) / 1e3:.1f} KB now")
+
+timed("subprocess.run, first line of a slow command", lambda: old_execute_command(SLOW))
+slow = runner.start(SLOW)
+timed("job runner, first line of a slow command", lambda: first_line(slow))
+slow.wait()
+
+sleeper = f'{PYTHON} "import time; time.sleep(1)"'
+timed("3 x 1 s commands, one after another", lambda: [old_execute_command(sleeper) for _ in range(3)])
+timed("3 x 1 s commands as concurrent jobs", lambda: [job.wait() for job in [runner.start(sleeper) for _ in range(3)]])
+
+print(f"⏰ old on timeout: {old_execute_command(SLOW, timeout=1)!r}")
+print(f"⏰ now on timeout: {system_control.execute_command(SLOW, timeout=1)!r}")
@@ -0,0 +1,79 @@
+# benchmarks/bench_list_dir.py
+"""list_dir on a large folder: os.listdir + isdir vs the scandir listing.
+
+Creates one folder with (default) 100,000 files and 100 subfolders, then
+times the old list_dir (an os.path.isdir stat per entry, one unbounded
+list) against the new one: a cold scandir pass, a cached repeat, the
+next page via its cursor, sorting by size (which needs stats) and a
+filtered listing. The last row compares what the agent gets back from
+the list_dir tool.
+
+    python benchmarks/bench_list_dir.py [files]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.tools import file_tools
+
+
+def old_list_dir(path=".", show_hidden=False):
+    """The old list_dir"""
+    try:
+        items = []
+        for item in os.listdir(path):
+            if not show_hidden and item.startswith('.'):
+                continue
+            full_path = os.path.join(path, item)
+            if os.path.isdir(full_path):
+                items.append(f"📁 {item}/")
+            else:
+                items.append(f"📄 {item}")
+        return items
+    except Exception as e:
+        return [f"Error: {str(e)}"]
+
+
+def timed(label, fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"⏱️ {label:44s} {(time.perf_counter() - start) / repeat * 1000:9.2f} ms")
+    return result
+
+
+def next_cursor(page):
+    return page[-1].split("pass cursor ")[1].split(" for the next page")[0]
+
+
+folder = tempfile.mkdtemp(prefix="commandly-list-")
+try:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    for i in range(files):
+        with open(os.path.join(folder, f"event_{i:06d}.log"), "w") as out:
+            out.write("x" * (i % 4096))
+    for i in range(100):
+        os.mkdir(os.path.join(folder, f"shard_{i:03d}"))
+    print(f"📂 {files:,} files and 100 folders")
+    page_size = file_tools.LIST_PAGE_SIZE
+
+    old = timed("old list_dir", lambda: old_list_dir(folder))
+    timed("scandir, cold", lambda: file_tools.list_dir(folder, limit=page_size))
+    first = timed("scandir, cached (mtime check only)", lambda: file_tools.list_dir(folder, limit=page_size), 20)
+    timed("next page via cursor", lambda: file_tools.list_dir(folder, limit=page_size, cursor=next_cursor(first)), 20)
+    timed("sort by size + details, cold stats", lambda: file_tools.list_dir(folder, "size", limit=page_size,
+                                                                           details=True))
+    timed("sort by size + details, cached", lambda: file_tools.list_dir(folder, sort="size", limit=page_size,
+                                                                      details=True), 20)
+    timed("filter *_0999*.log", lambda: file_tools.list_dir(folder, pattern="*_0999*.log", limit=page_size), 20)
+    full = file_tools.list_dir(folder)
+    print(f"✅ same entries: {sorted(old) == sorted(full)}")
+    old_text = "\n".join(old)
+    new_text = "\n".join(file_tools.list_dir(folder, limit=page_size))
+    print(f"📉 tool output: {len(old_text):,} chars before, {len(new_text):,} per page now")
+finally:
+    shutil.rmtree(folder, ignore_errors=True)
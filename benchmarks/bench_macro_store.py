@@ -0,0 +1,62 @@
+# benchmarks/bench_macro_store.py
+"""Repeat agent tasks: full model dialogue vs replay from the macro store.
+
+A three-turn task (open two programs, then write a note, then reply) is run
+through run_agent against benchmarks/stub_openai_server.py (`LATENCY` per
+model turn). The first run is recorded; the repeat and a variant with other
+slot values ("open steam and paint ...") replay without any model turn.
+Tools are replaced by no-ops, so only the model round trips are measured.
+
+    python benchmarks/bench_macro_store.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stub_openai_server import StubServer
+
+LATENCY = 0.6  # seconds per model turn, a typical small-model round trip
+
+server = StubServer(latency=LATENCY).start()
+os.environ["COMMANDLY_API_BASE_URL"] = server.base_url
+os.environ["COMMANDLY_LLM_CACHE"] = "false"
+
+from modules import agent_core, agent_runtime
+from modules.macro_store import MacroStore
+
+store = MacroStore(path=os.path.join(tempfile.mkdtemp(), "macros.json"), enabled=True)
+agent_runtime.get_macro_store = lambda: store
+agent_core.execute_tool = lambda tool, args: f"✅ {tool} done"
+agent_runtime.ASYNC_TOOLS = {}  # launch programs through the no-op too
+
+
+def call(n, tool, **args):
+    return {"id": f"call_{n}", "type": "function", "function": {"name": tool, "arguments": json.dumps(args)}}
+
+
+def script(a, b):
+    return [{"tool_calls": [call(0, "open_application", name=a), call(1, "open_application", name=b)]},
+            {"tool_calls": [call(2, "write_file", path=f"notes/{a}.txt", content=f"{a} and {b} opened")]},
+            {"content": f"{a} and {b} are open and the note is saved."}]
+
+
+def timed(text, a, b):
+    server.script = script(a, b)
+    before = len(server.chat_requests)
+    start = time.perf_counter()
+    reply = agent_core.run_agent(text)
+    elapsed = time.perf_counter() - start
+    print(f"⏱️ {text!r}: {elapsed * 1000:8.1f} ms, {len(server.chat_requests) - before} model turns -> {reply!r}")
+    return elapsed
+
+
+first = timed("open spotify and discord and note it", "spotify", "discord")
+again = timed("open spotify and discord and note it", "spotify", "discord")
+other = timed("open steam and paint and note it", "steam", "paint")
+print(f"📼 {len(store.entries())} macro(s): {[e['key'] for e in store.entries()]}")
+print(f"⚡ Replay is {first / again:.0f}x faster than the recorded run")
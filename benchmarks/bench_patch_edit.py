@@ -0,0 +1,65 @@
+# benchmarks/bench_patch_edit.py
+"""Output size of an agent edit: whole-file write_file vs apply_patch.
+
+Changes one colour in a copy of modules/orb_animation.py three ways and
+reports the size of the JSON action the model would have to generate
+(~4 characters per token), plus the time to apply it. At a typical
+50-100 output tokens per second, output length is most of an agent
+step's latency.
+
+    python benchmarks/bench_patch_edit.py
+"""
+import difflib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.tools import file_tools
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE = os.path.join(ROOT, "modules", "orb_animation.py")
+OLD = '            "listening": "#3399ff",'
+NEW = '            "listening": "#00ffff",'
+TOKENS_PER_S = 60
+
+with open(SOURCE, encoding="utf-8") as f:
+    original = f.read()
+edited = original.replace(OLD, NEW)
+diff = "".join(difflib.unified_diff(original.splitlines(True), edited.splitlines(True),
+                                    "a/orb_animation.py", "b/orb_animation.py", n=2))
+line = original.split("\n").index(OLD) + 1
+
+actions = {
+    "write_file": {"tool": "write_file", "args": {"content": edited}},
+    "apply_patch (SEARCH/REPLACE)": {"tool": "apply_patch", "args": {
+        "patch": f"<<<<<<< SEARCH\n{OLD}\n=======\n{NEW}\n>>>>>>> REPLACE"}},
+    "apply_patch (unified diff)": {"tool": "apply_patch", "args": {"patch": diff}},
+    "edit_range": {"tool": "edit_range", "args": {"start": line, "end": line, "content": NEW}},
+}
+
+folder = tempfile.mkdtemp()
+try:
+    for name, action in actions.items():
+        path = os.path.join(folder, "orb_animation.py")
+        shutil.copyfile(SOURCE, path)
+        args = dict(action["args"], path=path)
+        start = time.perf_counter()
+        if action["tool"] == "write_file":
+            result = file_tools.write_text(path, args["content"])
+        elif action["tool"] == "apply_patch":
+            result = file_tools.apply_patch(path, args["patch"])
+        else:
+            result = file_tools.edit_range(path, args["start"], args["end"], args["content"])
+        elapsed = (time.perf_counter() - start) * 1000
+        with open(path, encoding="utf-8") as f:
+            ok = f.read() == edited
+        tokens = len(json.dumps(action)) // 4
+        print(f"📝 {name:30s} ~{tokens:5d} output tokens (~{tokens / TOKENS_PER_S:5.1f} s), "
+              f"applied in {elapsed:5.2f} ms, {'correct' if ok else 'WRONG: ' + result}")
+finally:
+    shutil.rmtree(folder)
@@ -0,0 +1,75 @@
+# benchmarks/bench_read_text.py
+"""Reading part of a large log: whole-file read_text vs mmap ranges.
+
+Writes a synthetic log (default 3,000,000 lines, ~300 MB), then reads
+lines 1,000,000-1,000,100 the old way (read everything, split, slice) and
+through the ranged read_text: the first ranged read builds the LineIndex,
+later ones only touch the range. The read_file windows before it (top,
+tail) never count the file's lines. Peak Python memory is from tracemalloc.
+The last rows append to the log and read its tail, which indexes only the
+new bytes.
+
+    python benchmarks/bench_read_text.py [lines]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.tools import file_tools
+
+LEVELS = ["INFO", "DEBUG", "WARN", "ERROR"]
+
+
+def make_log(path, lines):
+    with open(path, "w") as out:
+        for start in range(0, lines, 100_000):
+            out.write("".join(f"2024-05-01 12:{n // 60000 % 60:02d}:{n // 1000 % 60:02d}.{n % 1000:03d} "
+                              f"{LEVELS[n % 4]:5s} worker-{n % 16:02d} request {n} handled in {n % 997} ms\n"
+                              for n in range(start, min(start + 100_000, lines))))
+
+
+def timed(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"⏱️ {label:44s} {elapsed * 1000:9.1f} ms {peak / 1e6:9.1f} MB peak")
+    return result
+
+
+def whole_file(path, start, end):
+    """The old way: read_text(path) returned the whole file"""
+    return "\n".join(file_tools.read_text(path).split("\n")[start - 1:end]) + "\n"
+
+
+folder = tempfile.mkdtemp(prefix="commandly-read-")
+try:
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 3_000_000
+    path = os.path.join(folder, "service.log")
+    make_log(path, lines)
+    print(f"📜 {lines:,} lines, {os.path.getsize(path) / 1e6:.0f} MB")
+    start, end = lines // 3, lines // 3 + 100
+    old = timed(f"whole file, lines {start:,}-{end:,}", lambda: whole_file(path, start, end))
+    timed("ranged, first 100 lines (no index needed)", lambda: file_tools.read_text(path, head=100))
+    timed("read_file window, first lines (no index)", lambda: file_tools.read_numbered(path))
+    timed("read_file window, tail 50 (from the end)", lambda: file_tools.read_numbered(path, tail=50))
+    new = timed(f"ranged, lines {start:,}-{end:,} (builds index)",
+                lambda: file_tools.read_text(path, start=start, end=end))
+    timed(f"ranged, lines {start:,}-{end:,} again", lambda: file_tools.read_text(path, start=start, end=end))
+    timed(f"ranged, lines {2 * start:,}-{2 * start + 100:,}",
+          lambda: file_tools.read_text(path, start=2 * start, end=2 * start + 100))
+    timed("read_file tool output, tail 50 (indexed)", lambda: file_tools.read_numbered(path, tail=50))
+    with open(path, "a") as out:
+        out.write("2024-05-01 13:00:00.000 ERROR worker-03 request failed\n")
+    tail = timed("tail 1 after appending a line", lambda: file_tools.read_text(path, tail=1))
+    print(f"✅ same lines: {old == new}; tail: {tail.strip()!r}")
+    print(f"   {len(file_tools._line_index(path).checkpoints):,} checkpoints kept for the whole file")
+finally:
+    shutil.rmtree(folder, ignore_errors=True)
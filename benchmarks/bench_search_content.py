@@ -0,0 +1,74 @@
+# benchmarks/bench_search_content.py
+"""search_content: one process vs the worker pool, and its output vs reading files.
+
+Generates a synthetic source tree (default 20,000 files of ~8 KB), then
+searches it for a rare identifier, a common one and a regex. "inline" runs
+the same scan in this process; "pool" is what the agent tool does. The
+last line compares the tool's output with what read_file would return for
+every file that contains the rare identifier.
+
+    python benchmarks/bench_search_content.py [files]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.tools import file_tools
+
+WORDS = ["user", "order", "payment", "config", "handler", "service", "model", "view", "cache", "index"]
+
+
+def make_tree(root, files, rng):
+    for f in range(files):
+        folder = os.path.join(root, f"pkg{f // 500:02d}")
+        os.makedirs(folder, exist_ok=True)
+        a, b = rng.choice(WORDS, 2)
+        lines = [f"def {a}_{b}_{f}_{i}(value):\n    return value + {i}  # {rng.choice(WORDS)}\n\n" for i in range(90)]
+        if f % 997 == 0:
+            lines.insert(45, "def reconcile_ledger(entries):\n    return sum(entries)\n\n")
+        with open(os.path.join(folder, f"{a}_{b}_{f}.py"), "w") as out:
+            out.write("".join(lines))
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"⏱️ {label:44s} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    root = tempfile.mkdtemp(prefix="commandly-search-")
+    try:
+        make_tree(root, files, np.random.default_rng(0))
+        size = sum(os.path.getsize(os.path.join(d, n)) for d, _, names in os.walk(root) for n in names)
+        file_tools.SEARCH_WORKERS = max(2, file_tools.SEARCH_WORKERS)  # exercise the pool even on one core
+        print(f"🌳 {files} files, {size / 1e6:.0f} MB, {file_tools.SEARCH_WORKERS} workers on {os.cpu_count()} CPUs")
+        timed("pool start (first search only)", lambda: file_tools.search_content("warmup", root))
+        for label, pattern, regex in [("rare literal", "reconcile_ledger", False),
+                                      ("common literal", "payment", False),
+                                      ("regex", r"return value \+ 8\d\b", True)]:
+            inline = file_tools.SEARCH_INLINE_FILES
+            file_tools.SEARCH_INLINE_FILES = 10 ** 9
+            timed(f"{label}: inline", lambda: file_tools.search_content(pattern, root, regex=regex))
+            file_tools.SEARCH_INLINE_FILES = inline
+            result = timed(f"{label}: pool", lambda: file_tools.search_content(pattern, root, regex=regex))
+            print(f"   {result.splitlines()[0]}")
+        result = file_tools.search_content("reconcile_ledger", root)
+        containing = [os.path.join(d, n) for d, _, names in os.walk(root) for n in names
+                      if "reconcile_ledger" in open(os.path.join(d, n)).read()]
+        read_bytes = sum(os.path.getsize(p) for p in containing)
+        print(f"📏 one search_content call returns {len(result) / 1024:.1f} KB; read_file on the "
+              f"{len(containing)} files that match would return {read_bytes / 1024:.0f} KB in {len(containing)} calls")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()  # worker processes are spawned and re-import this file
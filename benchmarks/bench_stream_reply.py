@@ -0,0 +1,86 @@
+# benchmarks/bench_stream_reply.py
+"""Time to first word: whole chat completion vs token streaming.
+
+Runs against benchmarks/stub_openai_server.py, which generates the reply
+word by word at a fixed rate (a non-streamed request returns only once
+the whole reply is generated). For each mode it reports when the first
+text could be shown, when the first sentence reached speech synthesis
+and when the first audio bytes arrived.
+
+    python benchmarks/bench_stream_reply.py
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stub_openai_server import StubServer, REPLY
+
+FIRST_TOKEN_S = 0.4  # request latency before generation starts
+WORD_S = 0.03  # ~33 words per second
+RUNS = 5
+
+server = StubServer(latency=FIRST_TOKEN_S, reply=REPLY, token_delay=WORD_S).start()
+os.environ["COMMANDLY_API_BASE_URL"] = server.base_url
+
+from modules.api_client import get_client
+from modules.gpt_integration import chat_completion, chat_completion_stream
+from modules.sentences import split_sentences, stream_sentences
+from modules.tts_pipeline import SpeechPipeline
+
+MESSAGES = [{"role": "user", "content": "Explain Python collections briefly."}]
+
+
+def synthesize(text):
+    with get_client("speech").audio.speech.with_streaming_response.create(
+            model="tts-1", voice="nova", input=text, response_format="pcm") as response:
+        for chunk in response.iter_bytes(4800):
+            yield chunk
+
+
+def run(streaming):
+    marks = {}
+    start = time.perf_counter()
+
+    def mark(name):
+        marks.setdefault(name, time.perf_counter() - start)
+
+    if streaming:
+        def fragments():
+            for token in chat_completion_stream(MESSAGES):
+                mark("first text")
+                yield token
+
+        def sentences():
+            for sentence in stream_sentences(fragments()):
+                mark("first sentence")
+                yield sentence
+        source = sentences()
+    else:
+        text = chat_completion(MESSAGES)
+        mark("first text")
+        mark("first sentence")
+        source = split_sentences(text)
+
+    pipeline = SpeechPipeline(synthesize, lambda chunk: mark("first audio"), lookahead=2)
+    pipeline.run(source)
+    mark("done")
+    return marks
+
+
+def main():
+    print(f"stub: {FIRST_TOKEN_S * 1000:.0f} ms to first token, {WORD_S * 1000:.0f} ms per word, "
+          f"{len(REPLY.split())} words\n")
+    names = ("first text", "first sentence", "first audio", "done")
+    print(f"{'mode':<12}" + "".join(f"{n:>16}" for n in names))
+    for label, streaming in (("whole", False), ("streaming", True)):
+        runs = [run(streaming) for _ in range(RUNS)]
+        print(f"{label:<12}" + "".join(f"{np.median([r[n] for r in runs]) * 1000:>13.0f} ms" for n in names))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
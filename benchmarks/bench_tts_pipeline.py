@@ -0,0 +1,106 @@
+# benchmarks/bench_tts_pipeline.py
+"""Time-to-first-audio: whole-reply TTS vs the sentence pipeline.
+
+Uses a local stub of the speech endpoint whose latency model is: a fixed
+request overhead, time-to-first-byte that grows with input length, then
+24 kHz PCM streamed faster than real time. A simulated player consumes the
+audio in real time and records gaps where it ran dry.
+
+    python benchmarks/bench_tts_pipeline.py
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.sentences import split_sentences
+from modules.tts_pipeline import SpeechPipeline
+
+PCM_RATE = 24000
+BYTES_PER_SECOND = PCM_RATE * 2
+SPEECH_SECONDS_PER_CHAR = 1 / 15.0  # roughly 15 characters per spoken second
+
+
+class StubSpeechEndpoint:
+    """Stand-in for client.audio.speech: latency grows with input length"""
+
+    def __init__(self, overhead=0.25, per_char=0.0015, stream_speedup=4.0, scale=0.1):
+        self.overhead = overhead
+        self.per_char = per_char
+        self.stream_speedup = stream_speedup
+        self.scale = scale  # shrink every delay so the benchmark runs quickly
+
+    def synthesize(self, text):
+        time.sleep((self.overhead + self.per_char * len(text)) * self.scale)
+        total = int(len(text) * SPEECH_SECONDS_PER_CHAR * BYTES_PER_SECOND) & ~1
+        chunk = 4800
+        for offset in range(0, total, chunk):
+            n = min(chunk, total - offset)
+            time.sleep(n / BYTES_PER_SECOND / self.stream_speedup * self.scale)
+            yield b"\0" * n
+
+
+class RealtimePlayer:
+    """Simulated output device: audio plays at 1x from the moment it arrives"""
+
+    def __init__(self, scale):
+        self.scale = scale
+        self.started = None
+        self.play_until = None
+        self.gaps = 0.0
+
+    def feed(self, chunk):
+        now = time.perf_counter()
+        if self.started is None:
+            self.started = now
+            self.play_until = now
+        if now > self.play_until:
+            self.gaps += now - self.play_until
+            self.play_until = now
+        self.play_until += len(chunk) / BYTES_PER_SECOND * self.scale
+
+    def finished_at(self):
+        return self.play_until
+
+
+def run_whole(endpoint, text):
+    started = time.perf_counter()
+    player = RealtimePlayer(endpoint.scale)
+    audio = b"".join(endpoint.synthesize(text[:4000]))  # old path waits for the full file
+    player.feed(audio)
+    return player.started - started, player.finished_at() - started, player.gaps
+
+
+def run_pipelined(endpoint, text, lookahead=2):
+    started = time.perf_counter()
+    player = RealtimePlayer(endpoint.scale)
+    stats = SpeechPipeline(endpoint.synthesize, player.feed, lookahead=lookahead).run(split_sentences(text))
+    return stats["time_to_first_audio"], player.finished_at() - started, player.gaps
+
+
+REPLIES = {
+    "short": "Done. Notepad is open.",
+    "medium": "I opened the project folder and found three Python files. "
+              "The main entry point is commandly.py, which starts the orb interface. "
+              "Voice handling lives in modules/voice_openai.py. Would you like me to open one of them?",
+    "long": " ".join(
+        f"Step {i}: the agent reads the file, applies the requested change, and verifies the result before moving on."
+        for i in range(1, 16)
+    ),
+}
+
+
+def main():
+    endpoint = StubSpeechEndpoint()
+    scale = endpoint.scale
+    print(f"Stub delays are scaled by {scale:g} to run quickly; times below are unscaled seconds.")
+    print(f"{'reply':>7} {'chars':>6} | {'mode':>9} | {'first audio s':>13} {'done s':>7} {'gaps s':>7}")
+    for name, text in REPLIES.items():
+        for mode, runner in (("whole", run_whole), ("pipelined", run_pipelined)):
+            first, done, gaps = runner(endpoint, text)
+            print(f"{name:>7} {len(text):>6} | {mode:>9} | {first / scale:>13.2f} {done / scale:>7.2f} {gaps / scale:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
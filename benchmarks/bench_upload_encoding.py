@@ -0,0 +1,66 @@
+# benchmarks/bench_upload_encoding.py
+"""Upload size and encode time for the transcription request, per format.
+
+Encodes the bundled user_input.wav (44.1 kHz 16-bit mono) the way the old
+code did and with each upload format, then estimates how long the upload
+takes on a few uplink speeds. FLAC and Opus need ffmpeg; they are reported
+as skipped when it is not installed.
+
+    python benchmarks/bench_upload_encoding.py [path/to/recording.wav]
+"""
+import os
+import sys
+import time
+import wave
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.audio_encoding import pcm_to_wav, encode_for_upload, ffmpeg_available
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UPLINKS_KBPS = (128, 512, 2000)
+REPEATS = 5
+
+
+def load(path):
+    with wave.open(path, 'rb') as wf:
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16), wf.getframerate()
+
+
+def timed(encode):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        upload = encode()
+        best = min(best, time.perf_counter() - start)
+    return upload.getbuffer().nbytes, best
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "user_input.wav")
+    samples, rate = load(path)
+    print(f"{os.path.basename(path)}: {len(samples) / rate:.2f} s at {rate} Hz\n")
+
+    candidates = [
+        (f"wav {rate // 1000} kHz (before)", lambda: pcm_to_wav(samples, rate)),
+        ("wav 16 kHz", lambda: encode_for_upload(samples, rate, "wav")),
+        ("flac 16 kHz", lambda: encode_for_upload(samples, rate, "flac")),
+        ("opus 16 kHz", lambda: encode_for_upload(samples, rate, "opus")),
+    ]
+    header = f"{'format':<22}{'bytes':>9}{'ratio':>8}{'encode':>10}" + "".join(f"{f'@{k} kbps':>13}" for k in UPLINKS_KBPS)
+    print(header)
+    print("-" * len(header))
+    baseline = None
+    for label, encode in candidates:
+        if label.split()[0] in ("flac", "opus") and not ffmpeg_available():
+            print(f"{label:<22}{'skipped (ffmpeg not installed)':>40}")
+            continue
+        size, seconds = timed(encode)
+        baseline = baseline or size
+        uploads = "".join(f"{size * 8 / (k * 1000) * 1000:>10.0f} ms" for k in UPLINKS_KBPS)
+        print(f"{label:<22}{size:>9}{baseline / size:>7.1f}x{seconds * 1000:>7.1f} ms{uploads}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# benchmarks/bench_vad.py
+"""Endpointing benchmark: legacy fixed-threshold detector vs modules.vad.
+
+Runs both detectors over the bundled user_input.wav embedded in synthetic
+background noise at several SNRs and reports onset clipping, end-of-speech
+latency and processing speed.
+
+    python benchmarks/bench_vad.py [path/to/recording.wav]
+"""
+import os
+import sys
+import time
+import wave
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.vad import VoiceActivityDetector, frame_features
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RATE = 44100
+CHUNK = 1024
+LEAD_S = 1.0
+TAIL_S = 2.5
+
+
+def load(path):
+    with wave.open(path, 'rb') as wf:
+        assert wf.getsampwidth() == 2 and wf.getnchannels() == 1
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16), wf.getframerate()
+
+
+def reference_bounds(clean, rate):
+    """True speech extent: first/last 10 ms frame within 25 dB of the peak"""
+    energy, _ = frame_features(clean, rate // 100)
+    active = np.flatnonzero(energy > energy.max() - 25)
+    return active[0] * (rate // 100), (active[-1] + 1) * (rate // 100)
+
+
+def make_noise(kind, n, rng):
+    if kind == "white":
+        noise = rng.standard_normal(n)
+    elif kind == "pink":
+        spectrum = np.fft.rfft(rng.standard_normal(n))
+        spectrum /= np.sqrt(np.maximum(np.arange(len(spectrum)), 1))
+        noise = np.fft.irfft(spectrum, n)
+    elif kind == "hum":
+        t = np.arange(n) / RATE
+        noise = sum(np.sin(2 * np.pi * 60 * k * t) / k for k in (1, 2, 3, 5)) + 0.2 * rng.standard_normal(n)
+    else:
+        raise ValueError(kind)
+    return noise / np.sqrt(np.mean(noise ** 2))
+
+
+def scenario(clean, kind, snr_db, rng):
+    """Clean recording padded with noise on both sides; returns (mix, true_start, true_end)"""
+    start, end = reference_bounds(clean, RATE)
+    speech = clean.astype(np.float64)
+    padded = np.concatenate((np.zeros(int(LEAD_S * RATE)), speech, np.zeros(int(TAIL_S * RATE))))
+    speech_rms = np.sqrt(np.mean(speech[start:end] ** 2))
+    noise = make_noise(kind, len(padded), rng) * speech_rms / (10 ** (snr_db / 20))
+    mix = np.clip(padded + noise, -32768, 32767).astype(np.int16)
+    offset = int(LEAD_S * RATE)
+    return mix, offset + start, offset + end
+
+
+def legacy_detect(samples, silence_threshold=1000, duration=5):
+    """The original record_audio loop: mean |x| per chunk, 1.5 s silence, 5 s cap"""
+    max_silence = int(RATE / CHUNK * 1.5)
+    first = None
+    silence = 0
+    for i in range(int(RATE / CHUNK * duration)):
+        chunk = samples[i * CHUNK:(i + 1) * CHUNK]
+        if len(chunk) < CHUNK:
+            break
+        if np.abs(chunk).mean() > silence_threshold:
+            first = i * CHUNK if first is None else first
+            silence = 0
+        else:
+            silence += 1
+        if first is not None and silence > max_silence:
+            # Legacy kept everything from the start of recording
+            return 0, (i + 1) * CHUNK, (i + 1) * CHUNK
+    if first is None:
+        return None
+    return 0, min(len(samples), int(RATE * duration)), None
+
+
+def vad_detect(samples):
+    segments = VoiceActivityDetector(rate=RATE).detect(samples, block=CHUNK)
+    if not segments:
+        return None
+    # The recording holds one utterance; merge anything the detector split
+    return segments[0][0], segments[-1][1], segments[-1][2]
+
+
+def run(path):
+    clean, rate = load(path)
+    assert rate == RATE, f"expected {RATE} Hz, got {rate}"
+    rng = np.random.default_rng(1)
+    print(f"Recording: {os.path.relpath(path, ROOT)} ({len(clean) / RATE:.2f} s)")
+    print(f"{'noise':>6} {'snr':>4} | {'detector':>8} | {'onset clip ms':>13} {'end latency ms':>15} {'tail kept ms':>12} {'x realtime':>10}")
+    for kind in ("white", "pink", "hum"):
+        for snr in (30, 15, 5):
+            mix, true_start, true_end = scenario(clean, kind, snr, rng)
+            for name, detector in (("legacy", legacy_detect), ("vad", vad_detect)):
+                t0 = time.perf_counter()
+                result = detector(mix)
+                elapsed = time.perf_counter() - t0
+                speed = (len(mix) / RATE) / elapsed
+                if result is None:
+                    print(f"{kind:>6} {snr:>4} | {name:>8} | {'no speech':>13}")
+                    continue
+                start, end, decided = result
+                clip = max(0, start - true_start) / RATE * 1000
+                latency = "never" if decided is None else f"{(decided - true_end) / RATE * 1000:.0f}"
+                tail = (end - true_end) / RATE * 1000
+                print(f"{kind:>6} {snr:>4} | {name:>8} | {clip:>13.0f} {latency:>15} {tail:>12.0f} {speed:>10.0f}")
+
+    # Background only: any detection here is a false trigger
+    print()
+    print(f"{'noise':>6} {'level':>6} | {'detector':>8} | false triggers")
+    for kind in ("white", "pink", "hum"):
+        for level_db in (-50, -35):
+            noise = make_noise(kind, 6 * RATE, rng) * 32768 * 10 ** (level_db / 20)
+            noise = np.clip(noise, -32768, 32767).astype(np.int16)
+            legacy = legacy_detect(noise) is not None
+            vad = len(VoiceActivityDetector(rate=RATE).detect(noise, block=CHUNK))
+            print(f"{kind:>6} {level_db:>6} | {'legacy':>8} | {int(legacy)}")
+            print(f"{kind:>6} {level_db:>6} | {'vad':>8} | {vad}")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "user_input.wav"))
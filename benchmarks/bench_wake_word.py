@@ -0,0 +1,124 @@
+# benchmarks/bench_wake_word.py
+"""Wake-word precision/recall and CPU cost for modules.wake_word.
+
+There is no labelled keyword corpus in the repo, so trials are built from
+the bundled user_input.wav: one stretch of speech plays the wake word and
+the remaining stretches (plus a time-reversed copy of the keyword and
+plain noise) are the impostors. Every clip is speed-perturbed (which also
+shifts its pitch, a rough stand-in for another take or speaker), given a
+random gain and mixed with pink noise at several SNRs. Three perturbed
+takes are enrolled as templates; the test takes use different speeds.
+
+Each trial is streamed through the detector in capture-sized blocks, and
+the CPU time spent is reported as a real-time factor for one core.
+
+    python benchmarks/bench_wake_word.py [path/to/recording.wav]
+"""
+import os
+import sys
+import time
+import wave
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.audio_encoding import resample
+from modules.wake_word import WakeWordDetector, WAKE_WORD_THRESHOLD
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RATE = 44100
+CHUNK = 1024
+KEYWORD_S = (0.70, 1.25)  # stretch of user_input.wav used as the wake word
+IMPOSTORS_S = [(1.25, 1.80), (1.80, 2.50), (0.20, 0.70)]
+ENROLL_SPEEDS = (0.96, 1.0, 1.04)
+TEST_SPEEDS = (0.9, 0.94, 1.02, 1.08, 1.12)
+SNRS_DB = (20, 10, 5)
+THRESHOLDS = (0.25, 0.30, 0.35, 0.40, 0.45)
+
+
+def load(path):
+    with wave.open(path, 'rb') as wf:
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).astype(np.float64), wf.getframerate()
+
+
+def pink(n, rng):
+    spectrum = np.fft.rfft(rng.standard_normal(n))
+    spectrum /= np.sqrt(np.maximum(np.arange(len(spectrum)), 1))
+    noise = np.fft.irfft(spectrum, n)
+    return noise / np.sqrt(np.mean(noise ** 2))
+
+
+def speed(clip, factor):
+    """Play `clip` `factor` times faster (tempo and pitch both change)"""
+    return resample(np.clip(clip, -32768, 32767).astype(np.int16), RATE, int(round(RATE / factor / 10)) * 10).astype(np.float64)
+
+
+def take(clip, factor, snr_db, rng, lead_s=0.4, tail_s=0.6):
+    """One trial: perturbed clip in noise with some silence around it"""
+    speech = speed(clip, factor) * rng.uniform(0.3, 1.5)
+    mix = np.concatenate((np.zeros(int(lead_s * RATE)), speech, np.zeros(int(tail_s * RATE))))
+    rms = np.sqrt(np.mean(speech ** 2))
+    mix += pink(len(mix), rng) * rms / 10 ** (snr_db / 20)
+    return np.clip(mix, -32768, 32767).astype(np.int16)
+
+
+def stream(detector, audio):
+    """Best score seen while streaming `audio`, and CPU seconds spent"""
+    detector.reset(0)
+    detector.threshold = -np.inf  # never fire, so the whole trial is scored
+    best = np.inf
+    start = time.process_time()
+    for offset in range(0, len(audio), CHUNK):
+        detector.push(audio[offset:offset + CHUNK])
+        best = min(best, detector.last_score)
+    return best, time.process_time() - start
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "user_input.wav")
+    audio, rate = load(path)
+    assert rate == RATE, "expects a 44.1 kHz recording"
+    rng = np.random.default_rng(7)
+    cut = lambda span: audio[int(span[0] * RATE):int(span[1] * RATE)]
+    keyword = cut(KEYWORD_S)
+
+    detector = WakeWordDetector.from_audio([take(keyword, f, 30, rng, 0.1, 0.1) for f in ENROLL_SPEEDS], RATE)
+
+    impostors = [cut(span) for span in IMPOSTORS_S] + [keyword[::-1]]
+    positives, negatives = [], []
+    cpu = audio_s = 0.0
+    for snr in SNRS_DB:
+        for factor in TEST_SPEEDS:
+            trial = take(keyword, factor, snr, rng)
+            score, spent = stream(detector, trial)
+            positives.append((snr, score))
+            cpu += spent
+            audio_s += len(trial) / RATE
+            for clip in impostors:
+                trial = take(clip, factor, snr, rng)
+                score, spent = stream(detector, trial)
+                negatives.append((snr, score))
+                cpu += spent
+                audio_s += len(trial) / RATE
+        noise = (pink(RATE * 2, rng) * 3000).astype(np.int16)
+        negatives.append((snr, stream(detector, noise)[0]))
+
+    print(f"{len(detector.templates)} templates, {len(positives)} keyword trials, {len(negatives)} impostor trials\n")
+    print(f"{'threshold':>10}{'precision':>11}{'recall':>9}   recall by SNR")
+    for threshold in THRESHOLDS:
+        tp = sum(s <= threshold for _, s in positives)
+        fp = sum(s <= threshold for _, s in negatives)
+        precision = tp / (tp + fp) if tp + fp else 1.0
+        by_snr = "  ".join(
+            f"{snr} dB {np.mean([s <= threshold for n, s in positives if n == snr]):.2f}" for snr in SNRS_DB)
+        marker = "  <- default" if abs(threshold - WAKE_WORD_THRESHOLD) < 1e-9 else ""
+        print(f"{threshold:>10.2f}{precision:>11.2f}{tp / len(positives):>9.2f}   {by_snr}{marker}")
+
+    print(f"\nKeyword scores   {np.percentile([s for _, s in positives], [10, 50, 90]).round(3)} (p10/p50/p90)")
+    print(f"Impostor scores  {np.percentile([s for _, s in negatives], [10, 50, 90]).round(3)}")
+    print(f"\nCPU: {cpu / audio_s * 100:.1f}% of one core while scanning "
+          f"(real-time factor {cpu / audio_s:.3f}, {audio_s:.0f} s of audio)")
+
+
+if __name__ == "__main__":
+    main()
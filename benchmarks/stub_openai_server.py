@@ -0,0 +1,167 @@
+# benchmarks/stub_openai_server.py
+"""Local stand-in for the OpenAI endpoints Commandly uses.
+
+Serves /v1/chat/completions (plain, streamed token by token, or a
+scripted sequence of assistant messages such as tool calls),
+/v1/audio/transcriptions and /v1/audio/speech over HTTP/1.1 keep-alive
+with configurable latency, a per-connection setup cost (standing in for
+TCP + TLS handshakes), random 503s and hung requests.
+Run it and point the app at it:
+
+    python benchmarks/stub_openai_server.py --port 8765 --latency 0.2
+    COMMANDLY_API_BASE_URL=http://127.0.0.1:8765/v1 python commandly.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SPEECH_RATE = 24000
+REPLY = ("Sure, here is a quick overview. Python lists keep items in order and can grow as needed. "
+         "Tuples are similar but cannot be changed once created. Dictionaries map keys to values "
+         "and look them up quickly. Sets hold unique items and make membership tests fast. "
+         "Pick the one that matches how you will use the data.")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections open between requests
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.fresh = True
+        self.server.stats["connections"] += 1
+
+    def _reply(self, status, body, content_type="application/json", headers=None):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream_chat(self, request):
+        """Server-sent events, one word per chunk, `token_delay` apart"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = (self.server.reply or "Stub reply.").split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.server.token_delay)
+            event = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": request.get("model", "stub"),
+                     "choices": [{"index": 0, "finish_reason": None,
+                                  "delta": {"content": word if i == 0 else " " + word}}]}
+            self._chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with server.lock:
+            server.stats["requests"] += 1
+        if self.fresh:
+            time.sleep(server.handshake)
+            self.fresh = False
+        if random.random() < server.hang_rate:
+            time.sleep(server.hang)
+        if random.random() < server.fail_rate:
+            with server.lock:
+                server.stats["failures"] += 1
+            self._reply(503, {"error": {"message": "stub overloaded", "type": "server_error"}})
+            return
+        time.sleep(server.latency)
+
+        if self.path.endswith("/chat/completions"):
+            request = json.loads(body or b"{}")
+            last = request.get("messages", [{}])[-1].get("content", "")
+            with server.lock:
+                server.chat_requests.append(request)
+                scripted = server.script.pop(0) if server.script else None
+            if scripted is not None:
+                self._reply(200, {
+                    "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [{"index": 0, "message": dict({"role": "assistant", "content": None}, **scripted),
+                                 "finish_reason": "tool_calls" if scripted.get("tool_calls") else "stop"}],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                })
+                return
+            if request.get("stream"):
+                self._stream_chat(request)
+                return
+            time.sleep(server.token_delay * len(server.reply.split()))  # the whole reply is generated first
+            self._reply(200, {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant",
+                                         "content": server.reply or f"Stub reply to: {last}"}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            })
+        elif self.path.endswith("/audio/transcriptions"):
+            self._reply(200, {"text": server.transcript})
+        elif self.path.endswith("/audio/speech"):
+            request = json.loads(body or b"{}")
+            seconds = len(request.get("input", "")) / 15.0  # roughly 15 characters per second
+            self._reply(200, bytes(int(seconds * SPEECH_RATE) * 2), content_type="audio/pcm")
+        else:
+            self._reply(404, {"error": {"message": f"unknown path {self.path}"}})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.05, handshake=0.0, fail_rate=0.0, hang=0.0, hang_rate=0.0,
+                 transcript="open the calculator", reply="", token_delay=0.0, script=None):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.latency = latency
+        self.handshake = handshake
+        self.fail_rate = fail_rate
+        self.hang = hang
+        self.hang_rate = hang_rate
+        self.transcript = transcript
+        self.reply = reply  # empty: echo the last message
+        self.token_delay = token_delay
+        self.script = list(script or [])  # assistant messages returned in order before falling back to `reply`
+        self.chat_requests = []
+        self.lock = threading.Lock()
+        self.stats = {"connections": 0, "requests": 0, "failures": 0}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="stub-openai", daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds added to every request")
+    parser.add_argument("--handshake", type=float, default=0.0, help="seconds added to a new connection")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--token-delay", type=float, default=0.03, help="seconds per generated word")
+    args = parser.parse_args()
+    server = StubServer(args.port, args.latency, args.handshake, args.fail_rate,
+                        reply=REPLY, token_delay=args.token_delay)
+    print(f"🧪 Stub OpenAI server on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
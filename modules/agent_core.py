@@ -1,14 +1,16 @@
 # modules/agent_core.py
 import os
 import json
-import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
-from .voice_openai import speak_text
-from .gpt_integration import chat_completion_json
-from .tools import file_tools, system_control
+from .gpt_integration import chat_completion_tools
+from .conversation import ConversationManager, AGENT_CONTEXT_TOKENS
+from .tools import file_tools, job_runner, system_control
 
 ALLOW_WRITE = os.environ.get("COMMANDLY_ALLOW_WRITE", "true").lower() in {"1","true","yes"}
 FULL_CONTROL = os.environ.get("COMMANDLY_FULL_CONTROL", "false").lower() in {"1","true","yes"}
+TOOL_WORKERS = int(os.environ.get("COMMANDLY_TOOL_WORKERS", "4"))
 
 SYSTEM = """You are Commandly, an AUTONOMOUS AI with COMPLETE CONTROL over this system.
 
@@ -17,7 +19,7 @@ CRITICAL RULE: When modifying existing code files, you MUST preserve ALL existin
 APPROACH FOR CODE MODIFICATIONS:
 1. Read the existing file completely first
 2. Understand the current architecture and functionality  
-3. Make surgical changes that enhance without breaking
+3. Make surgical changes that enhance without breaking - use apply_patch or edit_range, never rewrite a whole existing file
 4. Preserve all imports, classes, methods, and core logic
 5. Only modify specific values/features as requested
 6. Test that the structure remains intact
@@ -37,107 +39,156 @@ YOU HAVE TOTAL FREEDOM TO:
 ✅ Enhance existing functionality
 ⚠️ BUT preserve existing core functionality when modifying files
 
-RESPONSE FORMAT (JSON ONLY):
-{"tool":"tool_name","args":{...},"comment":"what I'm doing"}
-{"done":true,"say":"Task completed successfully"}
+HOW TO WORK:
+- Act by calling tools. When several calls don't depend on each other (e.g. reading two files), make them in the same turn; they run in parallel.
+- To find where something is in the code, use search_content first, then read_file only what you need.
+- Edit existing files with apply_patch or edit_range; use write_file only for NEW files.
+- When the task is done, reply with one short sentence for the user, without calling a tool. It will be spoken aloud.
 
 You are AUTONOMOUS but PRESERVATIVE of existing functionality!"""
 
-def ask_agent(user_text: str, conversation_history: List[Dict] = None) -> Dict[str, Any]:
-    """Main agent function that processes user requests"""
-    messages = [{"role": "system", "content": SYSTEM}]
-    
-    if conversation_history:
-        messages.extend(conversation_history[-3:])
-    
-    messages.append({"role": "user", "content": user_text})
-    
-    response_text = chat_completion_json(messages)
-    print(f"🤖 Raw agent response: {response_text[:200]}...")
-    
+PATCH_HELP = ("SEARCH/REPLACE blocks, each SEARCH copied exactly from the file and unique in it:\n"
+              "<<<<<<< SEARCH\nold lines\n=======\nnew lines\n>>>>>>> REPLACE\n"
+              "or a unified diff (@@ -start,count +start,count @@ hunks with a few context lines)")
+
+def _params(required, **properties):
+    return {"type": "object", "properties": properties, "required": required}
+
+def _string(description):
+    return {"type": "string", "description": description}
+
+# Function-calling specs for the tools `execute_tool` handles: name -> (description, parameters, enabled)
+TOOLS = {
+    "read_file": ("Read a text file; lines come back numbered for edit_range. Large files are shown in windows: "
+                  "pass start/end for other lines, or tail for the last lines (e.g. of a log).",
+                  _params(["path"], path=_string("File path"),
+                          start={"type": "integer", "description": "First line (1-based)"},
+                          end={"type": "integer", "description": "Last line, inclusive"},
+                          tail={"type": "integer", "description": "Read the last n lines instead"}), True),
+    "write_file": ("Create a NEW file with the given content. Do not use it to change existing files.",
+                   _params(["path", "content"], path=_string("File path"), content=_string("Complete file content")),
+                   ALLOW_WRITE),
+    "apply_patch": ("Change an existing file with a patch. Costs output in proportion to the change.",
+                    _params(["path", "patch"], path=_string("File path"), patch=_string(PATCH_HELP)), ALLOW_WRITE),
+    "edit_range": ("Replace lines start..end (1-based, inclusive, as numbered by read_file) with new content; "
+                   "end = start - 1 inserts before line start.",
+                   _params(["path", "start", "end", "content"], path=_string("File path"),
+                           start={"type": "integer"}, end={"type": "integer"},
+                           content=_string("Replacement lines")), ALLOW_WRITE),
+    "list_dir": ("List a directory, folders first. Long listings come in pages; pass the cursor from the last line "
+                 "to get the next one.",
+                 _params(["path"], path=_string("Directory path"),
+                         pattern=_string("Only names matching this glob, e.g. *.log"),
+                         kind={"type": "string", "enum": ["file", "dir"]},
+                         sort={"type": "string", "enum": ["name", "size", "mtime"],
+                               "description": "size and mtime list the largest/newest first"},
+                         reverse={"type": "boolean"},
+                         details={"type": "boolean", "description": "Add size and modification time columns"},
+                         cursor=_string("Cursor from the previous page")), True),
+    "find_files": ("Find files whose name contains a query (close misspellings too), below a root folder; "
+                   "best matches first.",
+                   _params(["query"], root=_string("Folder to search (default: current)"),
+                           query=_string("Part of the file name")), True),
+    "search_content": ("Search the text of all files below a folder (in parallel) and get the best matching lines "
+                       "with line numbers and context. Use it to locate code instead of reading files one by one.",
+                       _params(["pattern"], pattern=_string("Text to look for, or a regular expression if regex"),
+                               root=_string("Folder to search (default: current)"),
+                               regex={"type": "boolean", "description": "Treat pattern as a Python regex"},
+                               include=_string("Only files whose name matches this glob, e.g. *.py"),
+                               case_sensitive={"type": "boolean"}), True),
+    "open_application": ("Open a program by name (e.g. notepad, calculator, chrome).",
+                         _params(["name"], name=_string("Program name")), True),
+    "search_web": ("Open a web search in the browser.", _params(["query"], query=_string("Search terms")), True),
+    "install_package": ("Install a Python package with pip.",
+                        _params(["name"], name=_string("Package name")), FULL_CONTROL),
+    "execute_command": ("Run a shell command and return its output. For long commands (builds, servers, log tails) "
+                        "set background and follow the job with poll_job / wait_job.",
+                        _params(["command"], command=_string("Command line"),
+                                background={"type": "boolean", "description": "Return a job id at once"}),
+                        FULL_CONTROL),
+    "poll_job": ("Status of a background job and the output it printed since the last poll; "
+                 "without job_id, the status of every job.",
+                 _params([], job_id=_string("Job id, e.g. job1")), FULL_CONTROL),
+    "wait_job": ("Wait for a background job to finish (up to timeout seconds), then poll it.",
+                 _params(["job_id"], job_id=_string("Job id"),
+                         timeout={"type": "number", "description": "Seconds, at most 60"}), FULL_CONTROL),
+    "kill_job": ("Stop a background job and everything it started.",
+                 _params(["job_id"], job_id=_string("Job id")), FULL_CONTROL),
+}
+
+def tool_schemas() -> List[Dict[str, Any]]:
+    """Function-calling schema of the tools allowed by the current permissions"""
+    return [
+        {"type": "function", "function": {"name": name, "description": description, "parameters": parameters}}
+        for name, (description, parameters, enabled) in TOOLS.items() if enabled
+    ]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_tool_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="agent-tool")
+        return _executor
+
+def call_arguments(call):
+    """(arguments, None) for a tool call, or (None, error message) when they aren't valid JSON"""
     try:
-        return json.loads(response_text)
-    except json.JSONDecodeError:
-        import re
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if json_match:
-            try:
-                return json.loads(json_match.group())
-            except:
-                pass
-        
-        return {
-            "tool": "say",
-            "args": {"text": "I'll help you with that request."},
-            "comment": "Processing request"
-        }
+        args = json.loads(call["function"]["arguments"] or "{}")
+    except json.JSONDecodeError as e:
+        return None, f"❌ Invalid arguments for {call['function']['name']}: {e}"
+    return args, None
+
+def tool_message(call, result) -> Dict[str, Any]:
+    return {"role": "tool", "tool_call_id": call["id"], "content": str(result)}
+
+def call_chains(calls) -> List[List[Any]]:
+    """Split one turn's tool calls into chains of (index, call) that may run concurrently.
+
+    Calls on the same path share a chain, in the order the model gave
+    them, so two edits of one file never race.
+    """
+    chains = {}
+    for index, call in enumerate(calls):
+        args, _ = call_arguments(call)
+        path = args.get("path") if isinstance(args, dict) else None
+        key = os.path.abspath(path) if isinstance(path, str) and path else index
+        chains.setdefault(key, []).append((index, call))
+    return list(chains.values())
+
+def new_conversation(user_text: str) -> ConversationManager:
+    """History for one task; steps beyond the token budget are summarised, the task itself is kept"""
+    conversation = ConversationManager(SYSTEM, budget=AGENT_CONTEXT_TOKENS, keep_first=True)
+    conversation.add("user", user_text)
+    return conversation
+
+def ask_agent(user_text: str, conversation: ConversationManager = None) -> Dict[str, Any]:
+    """One agent step: the assistant message, with `tool_calls` when the model wants to act"""
+    if conversation is None:
+        conversation = new_conversation(user_text)
+    return chat_completion_tools(conversation.messages(), tool_schemas())
 
 def run_agent(user_text: str) -> str:
-    """Run the agent and execute tools until completion"""
-    max_iterations = 15
-    iteration = 0
-    conversation_history = []
-    
-    print(f"🚀 Starting agent for: {user_text}")
-    
-    while iteration < max_iterations:
-        iteration += 1
-        print(f"🔄 Agent iteration {iteration}")
-        
-        try:
-            response = ask_agent(user_text, conversation_history)
-            print(f"📋 Agent response type: {type(response)}")
-            
-            if response.get("done"):
-                say_text = response.get("say", "Task completed.")
-                print(f"✅ Agent completed: {say_text}")
-                return say_text
-            
-            if "tool" in response:
-                tool_name = response["tool"]
-                args = response.get("args", {})
-                comment = response.get("comment", "")
-                
-                print(f"🔧 Executing tool: {tool_name} - {comment}")
-                
-                # Execute the tool
-                result = execute_tool(tool_name, args)
-                print(f"📋 Tool result preview: {str(result)[:100]}...")
-                
-                # Add to conversation history
-                conversation_history.append({
-                    "role": "assistant", 
-                    "content": json.dumps(response)
-                })
-                
-                # Provide feedback to continue or complete
-                if tool_name == "read_file":
-                    feedback = f"File read successfully. Content length: {len(result)} characters. Now modify it with your changes and write the complete file."
-                elif tool_name == "write_file":
-                    feedback = f"File written successfully: {result}. Task should be complete now."
-                else:
-                    feedback = f"Tool {tool_name} completed: {result}. Continue if needed or mark as done."
-                
-                conversation_history.append({
-                    "role": "user", 
-                    "content": feedback
-                })
-                
-                if tool_name == "say":
-                    return args.get("text", "Done.")
-                elif "✅" in result and tool_name == "write_file":
-                    return result
-            
-            if "error" in response:
-                print(f"❌ Agent error: {response['error']}")
-                return f"Error: {response['error']}"
-                
-        except Exception as e:
-            print(f"❌ Agent exception: {str(e)}")
-            return f"Agent error: {str(e)}"
-    
-    print("⏰ Agent reached max iterations")
-    return "Task completed (max iterations reached)."
+    """Run the agent and execute tools until completion (see modules/agent_runtime.py)"""
+    from .agent_runtime import get_agent_runtime
+    return get_agent_runtime().run(user_text)
+
+def app_name(args) -> str:
+    """Application name from open_application arguments"""
+    # Allow args to be passed as a raw string (agent may return just a string)
+    if isinstance(args, str):
+        return args
+    # Accept multiple possible argument keys the agent might send
+    return (
+        args.get("name")
+        or args.get("application")
+        or args.get("program")
+        or args.get("app")
+        or args.get("application_name")
+        or ""
+    )
 
 def execute_tool(tool_name: str, args: Dict[str, Any]) -> str:
     """Execute a tool with given arguments"""
@@ -145,8 +196,9 @@ def execute_tool(tool_name: str, args: Dict[str, Any]) -> str:
         print(f"🛠️ Executing: {tool_name}")
         
         if tool_name == "read_file":
-            result = file_tools.read_text(args.get("path", ""))
-            return result  # Return full content for agent to use
+            # Numbered so the agent can address lines with edit_range; never more than READ_MAX_LINES
+            return file_tools.read_numbered(args.get("path", ""), args.get("start"), args.get("end"),
+                                            args.get("tail"))
             
         elif tool_name == "write_file":
             if not ALLOW_WRITE:
@@ -160,31 +212,36 @@ def execute_tool(tool_name: str, args: Dict[str, Any]) -> str:
             
             return file_tools.write_text(path, content)
             
+        elif tool_name == "apply_patch":
+            if not ALLOW_WRITE:
+                return "❌ Write operations are disabled."
+            return file_tools.apply_patch(args.get("path", ""), args.get("patch", ""))
+            
+        elif tool_name == "edit_range":
+            if not ALLOW_WRITE:
+                return "❌ Write operations are disabled."
+            return file_tools.edit_range(args.get("path", ""), args.get("start", 0),
+                                         args.get("end", 0), args.get("content", ""))
+            
         elif tool_name == "list_dir":
-            items = file_tools.list_dir(args.get("path", "."))
+            items = file_tools.list_dir(args.get("path", "."), sort=args.get("sort") or "name",
+                                        reverse=bool(args.get("reverse", False)), pattern=args.get("pattern") or "",
+                                        kind=args.get("kind") or "", details=bool(args.get("details", False)),
+                                        limit=file_tools.LIST_PAGE_SIZE, cursor=args.get("cursor"))
             return "\n".join(items)
             
         elif tool_name == "find_files":
             files = file_tools.find_files(args.get("root", "."), args.get("query", ""))
             return "\n".join(files)
             
+        elif tool_name == "search_content":
+            return file_tools.search_content(args.get("pattern", ""), args.get("root", "."),
+                                             bool(args.get("regex", False)), args.get("include", ""),
+                                             bool(args.get("case_sensitive", False)))
+            
         elif tool_name in ("open_program", "open_application"):  # Accept both names
-            # Allow args to be passed as a raw string (agent may return just a string)
-            if isinstance(args, str):
-                app_name = args
-            else:
-                # Accept multiple possible argument keys the agent might send
-                app_name = (
-                    args.get("name")
-                    or args.get("application")
-                    or args.get("program")
-                    or args.get("app")
-                    or args.get("application_name")
-                    or ""
-                )
-
             # Use the more robust launcher which uses the Windows 'start' command
-            return system_control.open_application(app_name)
+            return system_control.open_application(app_name(args))
             
         elif tool_name == "search_web":
             return system_control.search_web(args.get("query", ""))
@@ -197,7 +254,16 @@ def execute_tool(tool_name: str, args: Dict[str, Any]) -> str:
         elif tool_name == "execute_command":
             if not FULL_CONTROL:
                 return "❌ Command execution requires FULL_CONTROL=true"
-            return system_control.execute_command(args.get("command", ""))
+            return system_control.execute_command(args.get("command", ""), background=bool(args.get("background")))
+            
+        elif tool_name in ("poll_job", "wait_job", "kill_job"):
+            if not FULL_CONTROL:
+                return "❌ Jobs require FULL_CONTROL=true"
+            if tool_name == "poll_job":
+                return job_runner.poll_job(args.get("job_id", ""))
+            if tool_name == "wait_job":
+                return job_runner.wait_job(args.get("job_id", ""), args.get("timeout", 30))
+            return job_runner.kill_job(args.get("job_id", ""))
             
         elif tool_name == "say":
             text = args.get("text", "")
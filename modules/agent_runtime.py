@@ -0,0 +1,337 @@
+# modules/agent_runtime.py
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from . import agent_core
+from .macro_store import failed, get_macro_store
+from .tools import system_control
+from .tools.job_runner import JOB_WAIT_MAX_S, PROCESS_GROUP, get_job_runner, kill_tree
+
+# Wall-clock budget for one agent task (model turns and tools together)
+AGENT_BUDGET_S = float(os.environ.get("COMMANDLY_AGENT_BUDGET_S", "120"))
+# Deadline for a single tool call; subprocess tools have their own below
+TOOL_TIMEOUT_S = float(os.environ.get("COMMANDLY_TOOL_TIMEOUT_S", "20"))
+COMMAND_TIMEOUT_S = float(os.environ.get("COMMANDLY_COMMAND_TIMEOUT_S", "30"))
+TOOL_TIMEOUTS_S = {
+    "execute_command": COMMAND_TIMEOUT_S,
+    "install_package": float(os.environ.get("COMMANDLY_INSTALL_TIMEOUT_S", "300")),
+    "open_application": 20.0,  # GUI launchers often don't return; see system_control.open_application
+    "wait_job": JOB_WAIT_MAX_S + 5,
+}
+
+
+async def run_process(command, timeout, shell=True):
+    """Run a subprocess without blocking the loop; (returncode, stdout, stderr).
+
+    On timeout or cancellation the process tree is killed before the
+    exception propagates, so an abandoned tool never keeps running.
+    """
+    pipes = {"stdout": asyncio.subprocess.PIPE, "stderr": asyncio.subprocess.PIPE}
+    if shell:
+        proc = await asyncio.create_subprocess_shell(command, **pipes, **PROCESS_GROUP)
+    else:
+        proc = await asyncio.create_subprocess_exec(*command, **pipes, **PROCESS_GROUP)
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except BaseException:
+        if proc.returncode is None:
+            kill_tree(proc)
+        await proc.wait()
+        raise
+    return (proc.returncode, stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"))
+
+
+# ---- async tool adapters ------------------------------------------------------
+# Same results as the blocking versions in tools/system_control.py.
+
+async def execute_command(args, timeout):
+    command = args.get("command", "")
+    if not agent_core.FULL_CONTROL:
+        return "❌ Command execution requires FULL_CONTROL=true"
+    if system_control.is_dangerous(command):
+        return f"❌ Dangerous command blocked: {command}"
+    if args.get("background"):
+        return system_control.execute_command(command, background=True)
+    try:
+        job = get_job_runner().start(command)
+    except Exception as e:
+        return f"❌ Command failed: {str(e)}"
+    try:
+        finished = await asyncio.to_thread(job.wait, timeout)
+    except BaseException:
+        job.kill()  # the task was cancelled
+        raise
+    if not finished:
+        job.kill()
+        await asyncio.to_thread(job.wait, 5)
+        return f"❌ Command timed out ({timeout:g}s limit)\n{job.report()}"
+    return job.report()
+
+
+async def install_package(args, timeout):
+    name = args.get("name", "")
+    if not agent_core.FULL_CONTROL:
+        return "❌ Package installation requires FULL_CONTROL=true"
+    try:
+        code, _, stderr = await run_process([sys.executable, "-m", "pip", "install", name], timeout, shell=False)
+    except asyncio.TimeoutError:
+        return f"❌ Installing {name} timed out ({timeout:g}s limit)"
+    if code == 0:
+        return f"✅ Successfully installed {name}"
+    return f"❌ Failed to install {name}: {stderr}"
+
+
+async def open_application(args, timeout):
+    name = agent_core.app_name(args)
+    command = system_control.app_command(name)
+    if command is None:
+        return "❌ Unsupported platform"
+    print(f"🚀 Executing: {command}")
+    # The app outlives the launcher and inherits its handles: no pipes for it
+    # to hold open, and stderr goes to a file we can read once the shell exits.
+    with tempfile.TemporaryFile() as errors:
+        proc = await asyncio.create_subprocess_shell(command, stdin=asyncio.subprocess.DEVNULL,
+                                                     stdout=asyncio.subprocess.DEVNULL, stderr=errors,
+                                                     **PROCESS_GROUP)
+        try:
+            code = await asyncio.wait_for(proc.wait(), timeout)
+        except BaseException as e:
+            if proc.returncode is None:
+                proc.kill()  # only the launcher shell; the app it started is left running
+            await proc.wait()
+            if isinstance(e, asyncio.TimeoutError):
+                # Many GUI 'start' commands are not expected to return quickly; treat timeout as a likely success
+                return f"✅ Launched {name} (process did not return within timeout)"
+            raise
+        errors.seek(0)
+        stderr = errors.read().decode("utf-8", errors="replace")
+    if code == 0:
+        return f"✅ Successfully opened {name}"
+    return f"❌ Failed to open {name}. Error: {stderr}"
+
+
+ASYNC_TOOLS = {
+    "execute_command": execute_command,
+    "install_package": install_package,
+    "open_application": open_application,
+    "open_program": open_application,
+}
+
+
+class AgentRuntime:
+    """Runs agent tasks on a private asyncio loop so they can be timed out and cancelled.
+
+    `run` blocks the calling thread until the task ends; `cancel` may be
+    called from any thread (barge-in, the Escape key) and stops the task
+    at its next await: running subprocesses are killed and in-flight
+    model or file calls are abandoned. Tool calls from one model turn run
+    concurrently, each under its own deadline, and the whole task under
+    `budget` seconds, which replaces a fixed iteration cap.
+    """
+
+    def __init__(self, budget=AGENT_BUDGET_S, tool_timeout=TOOL_TIMEOUT_S, tool_timeouts=None):
+        self.budget = budget
+        self.tool_timeout = tool_timeout
+        self.tool_timeouts = dict(TOOL_TIMEOUTS_S if tool_timeouts is None else tool_timeouts)
+        self.loop = asyncio.new_event_loop()
+        self._task = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+        threading.Thread(target=self.loop.run_forever, name="agent-runtime", daemon=True).start()
+
+    def timeout_for(self, name):
+        return self.tool_timeouts.get(name, self.tool_timeout)
+
+    @property
+    def running(self):
+        with self._lock:
+            return self._task is not None
+
+    def run(self, user_text, budget=None):
+        """Run one task to completion and return what to say"""
+        future = asyncio.run_coroutine_threadsafe(self._run_task(user_text, budget or self.budget), self.loop)
+        return future.result()
+
+    def run_tool(self, name, args):
+        """Run one tool call outside an agent task, under the same deadline and cancellation; its result"""
+        call = {"id": "direct", "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+        return asyncio.run_coroutine_threadsafe(self._run_tool_task(call), self.loop).result()
+
+    def cancel(self):
+        """Stop the running task, if any; True when there was one"""
+        with self._lock:
+            task = self._task
+            if task is None:
+                return False
+            self._cancelled = True
+        self.loop.call_soon_threadsafe(task.cancel)
+        return True
+
+    async def _run_task(self, user_text, budget):
+        with self._lock:
+            self._task = asyncio.current_task()
+            self._cancelled = False
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(self.agent_loop(user_text, started + budget), budget)
+        except asyncio.TimeoutError:
+            print(f"⏰ Agent ran out of its {budget:g} s budget")
+            return f"I stopped because the task took longer than {budget:g} seconds."
+        except asyncio.CancelledError:
+            with self._lock:
+                if not self._cancelled:
+                    raise
+            print("🛑 Agent task cancelled")
+            return "Task cancelled."
+        except Exception as e:
+            print(f"❌ Agent exception: {str(e)}")
+            return f"Agent error: {str(e)}"
+        finally:
+            with self._lock:
+                self._task = None
+
+    async def _run_tool_task(self, call):
+        with self._lock:
+            self._task = asyncio.current_task()
+            self._cancelled = False
+        try:
+            return await self.run_call(call)
+        except asyncio.CancelledError:
+            with self._lock:
+                if not self._cancelled:
+                    raise
+            print(f"🛑 {call['function']['name']} cancelled")
+            return "🛑 Cancelled"
+        finally:
+            with self._lock:
+                self._task = None
+
+    async def agent_loop(self, user_text, deadline):
+        conversation = agent_core.new_conversation(user_text)
+        print(f"🚀 Starting agent for: {user_text}")
+        turns = []  # successful (name, args) calls of each turn, recorded as a macro at the end
+        macros = get_macro_store()
+        macro = macros.match(user_text)
+        if macro is not None:
+            say_text = await self.replay(macro, conversation, turns)
+            if say_text is not None:
+                return say_text
+        step = 0
+        while True:
+            step += 1
+            print(f"🔄 Agent step {step} ({deadline - time.perf_counter():.0f} s left)")
+            message = await asyncio.to_thread(agent_core.ask_agent, user_text, conversation)
+
+            if "error" in message:
+                print(f"❌ Agent error: {message['error']}")
+                return f"Error: {message['error']}"
+
+            calls = message.get("tool_calls")
+            if not calls:
+                say_text = (message.get("content") or "").strip() or "Task completed."
+                print(f"✅ Agent completed: {say_text}")
+                if macros.record(user_text, turns, say_text) is not None:
+                    print(f"📼 Recorded macro for: {user_text}")
+                return say_text
+
+            if message.get("content"):
+                print(f"💭 {message['content']}")
+            print(f"🧰 {len(calls)} tool call(s): {', '.join(c['function']['name'] for c in calls)}")
+            # All results of this turn go back to the model together
+            results = await self.run_tool_calls(calls)
+            conversation.extend([message] + results)
+            turns.append(succeeded(calls, results))
+
+    async def replay(self, macro, conversation, turns):
+        """Run a recorded macro; its reply, or None when a step failed and the model should take over.
+
+        Replayed turns go into `conversation` as if the model had made
+        them, so the model continues from the failure instead of redoing
+        the steps that worked.
+        """
+        print(f"📼 Replaying macro {macro.key!r} {list(macro.slots)}")
+        for n, steps in enumerate(macro.turns):
+            calls = [{"id": f"macro_{n}_{i}", "type": "function",
+                      "function": {"name": step["name"], "arguments": json.dumps(step["args"])}}
+                     for i, step in enumerate(steps)]
+            results = await self.run_tool_calls(calls)
+            conversation.extend([{"role": "assistant", "content": None, "tool_calls": calls}] + results)
+            turns.append(succeeded(calls, results))
+            if len(turns[-1]) < len(calls):
+                print("⚠️ Macro step failed; handing over to the model")
+                # A macro that fails with the values it was recorded with is stale
+                if macro.recorded:
+                    get_macro_store().invalidate(macro.key)
+                return None
+        get_macro_store().used(macro)
+        print(f"✅ Macro replayed: {macro.reply}")
+        return macro.reply
+
+    async def run_tool_calls(self, calls):
+        """Run one turn's tool calls concurrently (same-path calls in order); results in call order"""
+        results = [None] * len(calls)
+
+        async def run_chain(chain):
+            for index, call in chain:
+                results[index] = agent_core.tool_message(call, await self.run_call(call))
+
+        await asyncio.gather(*(run_chain(chain) for chain in agent_core.call_chains(calls)))
+        return results
+
+    async def run_call(self, call):
+        name = call["function"]["name"]
+        args, error = agent_core.call_arguments(call)
+        if error:
+            return error
+        timeout = self.timeout_for(name)
+        print(f"🔧 Executing tool: {name}")
+        started = time.perf_counter()
+        try:
+            if name in ASYNC_TOOLS:
+                # Subprocess tools enforce their deadline themselves and report it their own way
+                result = await ASYNC_TOOLS[name](args, timeout)
+            else:
+                result = await asyncio.wait_for(
+                    self.loop.run_in_executor(agent_core.get_tool_executor(), agent_core.execute_tool, name, args),
+                    timeout)
+        except asyncio.TimeoutError:
+            result = f"❌ {name} timed out after {timeout:g}s"
+        except Exception as e:  # e.g. an OSError spawning a subprocess tool
+            result = f"❌ Tool error: {str(e)}"
+        print(f"📋 {name} finished in {time.perf_counter() - started:.2f}s: {str(result)[:100]}...")
+        return result
+
+
+def succeeded(calls, results):
+    """(name, args) of the calls that worked"""
+    done = []
+    for call, result in zip(calls, results):
+        args, error = agent_core.call_arguments(call)
+        if error is None and not failed(result["content"]):
+            done.append((call["function"]["name"], args))
+    return done
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_agent_runtime():
+    """Process-wide agent runtime shared by the pipeline and the UI"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AgentRuntime()
+        return _runtime
+
+
+def cancel_agent():
+    """Cancel the running agent task without starting a runtime just to do so"""
+    with _runtime_lock:
+        runtime = _runtime
+    return runtime.cancel() if runtime is not None else False
@@ -0,0 +1,130 @@
+# modules/api_client.py
+import os
+import random
+import threading
+import time
+import openai
+from dotenv import load_dotenv
+
+try:
+    import httpx2 as httpx  # newer openai releases run on the httpx2 fork
+except ImportError:
+    import httpx
+
+load_dotenv()
+
+# Point everything at a local stand-in server with e.g. http://127.0.0.1:8765/v1
+API_BASE_URL = os.environ.get("COMMANDLY_API_BASE_URL") or os.environ.get("OPENAI_BASE_URL") or None
+API_RETRIES = int(os.environ.get("COMMANDLY_API_RETRIES", "2"))
+API_BACKOFF_S = float(os.environ.get("COMMANDLY_API_BACKOFF_S", "0.25"))
+API_MAX_BACKOFF_S = float(os.environ.get("COMMANDLY_API_MAX_BACKOFF_S", "4"))
+API_MAX_CONNECTIONS = int(os.environ.get("COMMANDLY_API_MAX_CONNECTIONS", "8"))
+CONNECT_TIMEOUT_S = float(os.environ.get("COMMANDLY_API_CONNECT_TIMEOUT_S", "5"))
+# Idle connections stay open this long, so the next turn skips the TCP/TLS handshake
+KEEPALIVE_S = float(os.environ.get("COMMANDLY_API_KEEPALIVE_S", "60"))
+
+# Read timeout per call type: how long we wait for the server before giving up
+TIMEOUTS_S = {
+    "chat": float(os.environ.get("COMMANDLY_TIMEOUT_CHAT_S", "45")),
+    "transcription": float(os.environ.get("COMMANDLY_TIMEOUT_TRANSCRIPTION_S", "20")),
+    "speech": float(os.environ.get("COMMANDLY_TIMEOUT_SPEECH_S", "20")),
+}
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# Failures where the request never reached the model, so resending is safe.
+# RemoteProtocolError is typically a pooled connection the server already closed.
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, httpx.RemoteProtocolError)
+
+
+def backoff_delay(attempt, base=API_BACKOFF_S, cap=API_MAX_BACKOFF_S):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]"""
+    return random.uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+def _retry_after(response):
+    value = response.headers.get("retry-after")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RetryTransport(httpx.HTTPTransport):
+    """Keep-alive connection pool that resends failed requests with jittered backoff.
+
+    Retries happen below the SDK, so they cover every call type including
+    streamed speech (a streamed response is only returned once its status
+    is known). Read timeouts are not retried: the per-call timeout is the
+    caller's upper bound on waiting.
+    """
+
+    def __init__(self, retries=API_RETRIES, backoff=API_BACKOFF_S, max_backoff=API_MAX_BACKOFF_S,
+                 sleep=time.sleep, **kwargs):
+        super().__init__(**kwargs)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.retried = 0
+
+    def handle_request(self, request):
+        request.read()  # buffer the body so it can be sent again
+        attempt = 0
+        while True:
+            try:
+                response = super().handle_request(request)
+            except RETRY_ERRORS as e:
+                if attempt >= self.retries:
+                    raise
+                reason, delay = type(e).__name__, None
+            else:
+                if response.status_code not in RETRY_STATUS or attempt >= self.retries:
+                    return response
+                reason, delay = f"HTTP {response.status_code}", _retry_after(response)
+                response.close()
+            if delay is None:
+                delay = backoff_delay(attempt, self.backoff, self.max_backoff)
+            delay = min(delay, self.max_backoff)
+            attempt += 1
+            self.retried += 1
+            print(f"🔁 {request.url.path}: {reason}, retry {attempt}/{self.retries} in {delay:.2f}s")
+            self.sleep(delay)
+
+
+def timeout_for(kind):
+    return httpx.Timeout(TIMEOUTS_S[kind], connect=CONNECT_TIMEOUT_S)
+
+
+def make_client(base_url=API_BASE_URL, api_key=None, retries=API_RETRIES, max_connections=API_MAX_CONNECTIONS,
+                keepalive=KEEPALIVE_S):
+    """Build an OpenAI client on a pooled, retrying transport"""
+    transport = RetryTransport(
+        retries=retries,
+        limits=httpx.Limits(max_connections=max_connections,
+                            max_keepalive_connections=max_connections,
+                            keepalive_expiry=keepalive),
+    )
+    http_client = httpx.Client(transport=transport, timeout=timeout_for("chat"), follow_redirects=True)
+    # A local stand-in server does not need a real key
+    api_key = api_key or os.getenv("OPENAI_API_KEY") or ("local" if base_url else None)
+    return openai.OpenAI(api_key=api_key, base_url=base_url, http_client=http_client,
+                         max_retries=0, timeout=timeout_for("chat"))
+
+
+_client = None
+_views = {}
+_client_lock = threading.Lock()
+
+
+def get_client(kind="chat"):
+    """Process-wide OpenAI client for a call type ("chat", "transcription", "speech").
+
+    All call types share one connection pool; they differ only in timeout.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = make_client()
+        if kind not in _views:
+            _views[kind] = _client.with_options(timeout=timeout_for(kind))
+        return _views[kind]
@@ -0,0 +1,290 @@
+# modules/assistant_pipeline.py
+import os
+import queue
+import threading
+import time
+from .gpt_integration import ask_gpt_stream, decide_mode
+from .llm_cache import get_llm_cache
+from .agent_core import run_agent
+from .agent_runtime import cancel_agent
+from .command_parser import parse_command, run_command
+from .macro_store import get_macro_store
+from .voice_openai import listen_utterances, transcribe_audio, speak_text, stop_speaking, wait_for_speech
+
+BARGE_IN = os.environ.get("COMMANDLY_BARGE_IN", "true").lower() in {"1","true","yes"}
+QUEUE_SIZE = int(os.environ.get("COMMANDLY_PIPELINE_QUEUE", "2"))
+DISPLAY_INTERVAL_S = 0.05  # redraw a streaming reply at most this often
+
+EXIT_COMMANDS = ["exit", "quit", "stop", "goodbye", "bye", "close", "shut down", "end"]
+
+
+def _put_latest(q, item):
+    """Put into a bounded queue, dropping the oldest entry instead of blocking"""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+class AssistantPipeline:
+    """The assistant loop as four stages joined by bounded queues.
+
+    listen -> transcribe -> respond -> speak each run on their own thread, so
+    the microphone keeps capturing while we transcribe, think and talk.
+    Every utterance starts a new turn; when the user starts speaking during
+    an earlier turn (barge-in) that turn's playback is cancelled and any of
+    its results still in flight are dropped when they arrive.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.stop_event = threading.Event()
+        self.transcripts = queue.Queue(maxsize=QUEUE_SIZE)
+        self.utterances = queue.Queue(maxsize=QUEUE_SIZE)
+        self.replies = queue.Queue(maxsize=QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self.turn = 0
+        self.busy_turn = None  # turn currently being answered or spoken
+        self.speaking = False
+
+    # ---- turn bookkeeping -------------------------------------------------
+
+    def _new_turn(self):
+        with self._lock:
+            self.turn += 1
+            return self.turn
+
+    def _current(self, turn):
+        with self._lock:
+            return turn == self.turn
+
+    def on_speech_start(self):
+        """Called by the listen stage the moment a new utterance begins"""
+        with self._lock:
+            interrupting = self.busy_turn is not None
+        if interrupting and BARGE_IN:
+            print("✋ Barge-in: cancelling the current reply")
+            self.interrupt()
+        self.app.set_mode("listening")
+        self.app.update_status("🎙️ Listening...")
+
+    def interrupt(self):
+        """Abandon the current turn: stop speech and any running agent task, drop its pending results"""
+        self._new_turn()
+        stop_speaking()
+        if cancel_agent():
+            print("🛑 Cancelled the running agent task")
+
+    def cancel(self):
+        """User pressed Escape: abandon the current turn and go back to idle"""
+        self.interrupt()
+        self.app.set_mode("idle")
+        self.app.update_status("🛑 Cancelled")
+
+    def _finish_turn(self, turn):
+        with self._lock:
+            if self.busy_turn == turn:
+                self.busy_turn = None
+            current = turn == self.turn
+        if current:
+            self.app.set_mode("idle")
+            self.app.update_status("✅ Ready")
+
+    # ---- stages ------------------------------------------------------------
+
+    def listen_stage(self):
+        try:
+            for audio in listen_utterances(self.stop_event, on_speech_start=self.on_speech_start,
+                                           is_speaking=lambda: self.speaking):
+                with self._lock:
+                    busy = self.busy_turn is not None
+                if busy and not BARGE_IN:
+                    continue  # without barge-in the mic ignores speech while we answer
+                turn = self._new_turn()
+                _put_latest(self.utterances, (turn, audio, time.perf_counter()))
+        except Exception as e:
+            if self.stop_event.is_set():
+                return
+            self.app.update_status("⚠️ Voice input failed. Type instead.")
+            print(f"⚠️ Voice input unavailable ({e}). Please type your input.")
+            self.typed_input_stage()
+
+    def typed_input_stage(self):
+        while not self.stop_event.is_set():
+            try:
+                user_input = input("You: ")
+            except (EOFError, KeyboardInterrupt):
+                print("👋 Goodbye!")
+                self.shutdown()
+                return
+            turn = self._new_turn()
+            self.transcripts.put((turn, user_input, time.perf_counter(), time.perf_counter()))
+
+    def transcribe_stage(self):
+        while not self.stop_event.is_set():
+            turn, audio, heard_at = self.utterances.get()
+            if not self._current(turn):
+                continue
+            with self._lock:
+                self.busy_turn = turn
+            self.app.set_mode("thinking")
+            self.app.update_status("🧠 Transcribing...")
+            user_input = transcribe_audio(audio)
+            if not user_input or len(user_input.strip()) < 2:
+                print("🔇 No meaningful input detected, continuing to listen...")
+                self._finish_turn(turn)
+                continue
+            if self._current(turn):
+                self.transcripts.put((turn, user_input, heard_at, time.perf_counter()))
+            else:
+                self._finish_turn(turn)  # interrupted while transcribing
+
+    def respond_stage(self):
+        while not self.stop_event.is_set():
+            turn, user_input, heard_at, transcribed_at = self.transcripts.get()
+            if not self._current(turn):
+                self._finish_turn(turn)
+                continue
+            with self._lock:
+                self.busy_turn = turn
+
+            if any(cmd in user_input.lower() for cmd in EXIT_COMMANDS):
+                self.app.set_mode("speaking")
+                self.app.update_status("👋 Exiting...")
+                try:
+                    speak_text("Goodbye!")
+                except Exception:
+                    pass
+                print("👋 Goodbye!")
+                self.shutdown()
+                return
+
+            print(f"🗣️ Processing: '{user_input}'")
+            self.app.set_mode("thinking")
+            # Simple commands run directly; the LLM only sees what the parser doesn't handle
+            reply = None
+            command = parse_command(user_input)
+            if command is not None:
+                self.app.set_mode("agent")
+                self.app.update_status(f"⚡ {command.say}")
+                reply = run_command(command)
+            # A request the agent has done before is replayed by it without asking the model
+            if reply is None and (get_macro_store().match(user_input) or decide_mode(user_input) == "agent"):
+                self.app.set_mode("agent")
+                self.app.update_status("🔧 Agent mode - Executing...")
+                try:
+                    reply = run_agent(user_input)
+                except Exception as e:
+                    reply = f"Agent error: {str(e)}"
+            elif reply is None:
+                self.app.update_status("🤖 Thinking...")
+                self.stream_reply(turn, user_input, heard_at, transcribed_at)
+                continue
+
+            if not self._current(turn):
+                print(f"⏭️ Dropping reply to interrupted turn {turn}")
+                self._finish_turn(turn)
+                continue
+            # Keep the outcome in the chat history so follow-up questions can refer to it
+            self.app.conversation.extend([{"role": "user", "content": user_input},
+                                          {"role": "assistant", "content": reply}])
+            print("Commandly:", reply)
+            self.app.update_text(user_input, reply)
+            replied_at = time.perf_counter()
+            print(f"⏱️ Turn {turn}: transcribe {(transcribed_at - heard_at) * 1000:.0f} ms, "
+                  f"respond {(replied_at - transcribed_at) * 1000:.0f} ms")
+            self.replies.put((turn, reply, heard_at))
+
+    def stream_reply(self, turn, user_input, heard_at, transcribed_at):
+        """Answer in chat mode, showing tokens as they arrive and speaking each finished sentence
+
+        The speak stage receives a generator of fragments with the first
+        token, so speech synthesis starts as soon as the first sentence closes
+        while the rest of the reply is still being generated.
+        """
+        fragments = queue.Queue()
+
+        def spoken():
+            while True:
+                fragment = fragments.get()
+                if fragment is None:
+                    return
+                yield fragment
+
+        reply = ""
+        first_token = None
+        shown = 0.0
+        try:
+            for token in ask_gpt_stream(self.app.conversation.messages([{"role": "user", "content": user_input}])):
+                if not self._current(turn):
+                    break
+                if first_token is None:
+                    first_token = time.perf_counter()
+                    self.replies.put((turn, spoken(), heard_at))
+                reply += token
+                fragments.put(token)
+                now = time.perf_counter()
+                if now - shown >= DISPLAY_INTERVAL_S:
+                    self.app.update_text(user_input, reply)
+                    shown = now
+        finally:
+            fragments.put(None)
+
+        if not self._current(turn):
+            print(f"⏭️ Dropping reply to interrupted turn {turn}")
+            self._finish_turn(turn)
+            return
+        if first_token is None:
+            self.replies.put((turn, reply, heard_at))  # nothing streamed; let the speak stage close the turn
+        self.app.conversation.extend([{"role": "user", "content": user_input},
+                                      {"role": "assistant", "content": reply}])
+        print("Commandly:", reply)
+        self.app.update_text(user_input, reply)
+        replied_at = time.perf_counter()
+        first_ms = ((first_token or replied_at) - transcribed_at) * 1000
+        print(f"⏱️ Turn {turn}: transcribe {(transcribed_at - heard_at) * 1000:.0f} ms, "
+              f"first token {first_ms:.0f} ms, respond {(replied_at - transcribed_at) * 1000:.0f} ms")
+
+    def speak_stage(self):
+        while not self.stop_event.is_set():
+            turn, reply, heard_at = self.replies.get()
+            if not self._current(turn):
+                self._finish_turn(turn)
+                continue
+            self.app.set_mode("speaking")
+            self.app.update_status("💬 Speaking...")
+            self.speaking = True
+            try:
+                speak_text(reply, wait=False)
+                wait_for_speech()
+            except Exception as e:
+                print(f"⚠️ Voice output unavailable ({e}).")
+                if isinstance(reply, str):
+                    print("Commandly (text):", reply)
+            finally:
+                self.speaking = False
+            print(f"⏱️ Turn {turn}: {time.perf_counter() - heard_at:.2f} s from end of speech to end of reply")
+            self._finish_turn(turn)
+
+    # ---- lifecycle ---------------------------------------------------------
+
+    def shutdown(self):
+        self.stop_event.set()
+        stop_speaking()
+        stats = get_llm_cache().stats()
+        print(f"💾 LLM cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['bypassed']} bypassed, {stats['entries']} replies stored")
+        self.app.destroy()
+
+    def run(self):
+        """Start the worker stages and run the listen stage on this thread"""
+        for stage in (self.transcribe_stage, self.respond_stage, self.speak_stage):
+            threading.Thread(target=stage, name=stage.__name__, daemon=True).start()
+        self.app.set_mode("idle")
+        self.app.update_status("🎤 Ready to listen...")
+        self.listen_stage()
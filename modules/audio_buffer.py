@@ -0,0 +1,60 @@
+# modules/audio_buffer.py
+import threading
+import numpy as np
+
+
+class RingBuffer:
+    """Preallocated sample ring addressed by absolute sample index.
+
+    The writer (usually an audio callback) appends samples; readers ask for
+    any [start, end) range that is still held in the ring. `written` counts
+    every sample ever written, so indices stay valid across wrap-arounds.
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        self.capacity = int(capacity)
+        self.data = np.zeros(self.capacity, dtype=dtype)
+        self.written = 0
+        self.cond = threading.Condition()
+
+    def write(self, samples):
+        """Append samples, overwriting the oldest data when full"""
+        samples = np.asarray(samples, dtype=self.data.dtype).ravel()
+        n = len(samples)
+        if n == 0:
+            return
+        with self.cond:
+            skipped = 0
+            if n > self.capacity:
+                skipped = n - self.capacity
+                samples = samples[skipped:]
+            pos = (self.written + skipped) % self.capacity
+            first = min(len(samples), self.capacity - pos)
+            self.data[pos:pos + first] = samples[:first]
+            if first < len(samples):
+                self.data[:len(samples) - first] = samples[first:]
+            self.written += n
+            self.cond.notify_all()
+
+    def oldest(self):
+        """Absolute index of the oldest sample still available"""
+        with self.cond:
+            return max(0, self.written - self.capacity)
+
+    def read(self, start, end=None):
+        """Copy samples [start, end) out of the ring (clamped to what is held)"""
+        with self.cond:
+            end = self.written if end is None else min(int(end), self.written)
+            start = max(int(start), self.written - self.capacity, 0)
+            if end <= start:
+                return np.zeros(0, dtype=self.data.dtype)
+            a = start % self.capacity
+            b = a + (end - start)
+            if b <= self.capacity:
+                return self.data[a:b].copy()
+            return np.concatenate((self.data[a:], self.data[:b - self.capacity]))
+
+    def wait_for(self, index, timeout=None):
+        """Block until at least `index` samples have been written"""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.written >= index, timeout)
@@ -0,0 +1,107 @@
+# modules/audio_capture.py
+import threading
+import pyaudio
+import numpy as np
+from .audio_buffer import RingBuffer
+
+FORMAT = pyaudio.paInt16
+CHANNELS = 1
+RATE = 44100
+CHUNK = 1024
+BUFFER_SECONDS = 60
+
+
+class CaptureEngine:
+    """Microphone stream that stays open and fills a ring buffer in callback mode.
+
+    Opening and closing a PyAudio device costs hundreds of milliseconds, so
+    the stream is opened once and left running. Consumers never talk to the
+    device; they remember a sample index and slice audio out of `buffer`.
+    """
+
+    def __init__(self, rate=RATE, chunk=CHUNK, buffer_seconds=BUFFER_SECONDS, device_index=None):
+        self.rate = rate
+        self.chunk = chunk
+        self.device_index = device_index
+        self.buffer = RingBuffer(int(rate * buffer_seconds))
+        self.sample_width = pyaudio.get_sample_size(FORMAT)
+        self._pa = None
+        self._stream = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._stream is not None and self._stream.is_active()
+
+    def start(self):
+        """Open the input device once in non-blocking callback mode"""
+        with self._lock:
+            if self._stream is not None:
+                return
+            self._pa = pyaudio.PyAudio()
+            try:
+                self._stream = self._pa.open(
+                    format=FORMAT,
+                    channels=CHANNELS,
+                    rate=self.rate,
+                    input=True,
+                    input_device_index=self.device_index,
+                    frames_per_buffer=self.chunk,
+                    stream_callback=self._callback,
+                )
+            except Exception:
+                self._pa.terminate()
+                self._pa = None
+                raise
+            self._stream.start_stream()
+            print(f"🎙️ Capture engine started ({self.rate} Hz, {self.chunk}-frame blocks)")
+
+    def stop(self):
+        """Close the stream and release the device"""
+        with self._lock:
+            if self._stream is not None:
+                try:
+                    self._stream.stop_stream()
+                    self._stream.close()
+                finally:
+                    self._stream = None
+            if self._pa is not None:
+                self._pa.terminate()
+                self._pa = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        self.buffer.write(np.frombuffer(in_data, dtype=np.int16))
+        return (None, pyaudio.paContinue)
+
+    def position(self):
+        """Absolute index of the next sample the device will write"""
+        return self.buffer.written
+
+    def wait_for(self, index, timeout=None):
+        return self.buffer.wait_for(index, timeout)
+
+    def read(self, start, end=None):
+        return self.buffer.read(start, end)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_capture_engine():
+    """Return the process-wide capture engine, starting it on first use"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            engine = CaptureEngine()
+            engine.start()
+            _engine = engine
+        return _engine
+
+
+def shutdown_capture_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.stop()
+            _engine = None
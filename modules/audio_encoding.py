@@ -0,0 +1,117 @@
+# modules/audio_encoding.py
+import io
+import os
+import threading
+import wave
+from math import gcd
+import numpy as np
+
+# Speech recognition works on 16 kHz audio; anything above that is wasted uplink.
+UPLOAD_RATE = int(os.environ.get("COMMANDLY_UPLOAD_RATE", "16000"))
+# "wav" needs nothing extra; "flac" (lossless) and "opus" need ffmpeg for pydub.
+UPLOAD_FORMAT = os.environ.get("COMMANDLY_UPLOAD_FORMAT", "flac").lower()
+OPUS_BITRATE = os.environ.get("COMMANDLY_OPUS_BITRATE", "24k")
+
+# pydub export settings and upload file name per format
+FORMATS = {
+    "flac": ("flac", None, "speech.flac"),
+    "opus": ("ogg", "libopus", "speech.ogg"),
+}
+
+_filters = {}
+_ffmpeg = None
+_ffmpeg_lock = threading.Lock()
+
+
+def pcm_to_wav(samples, rate, name="speech.wav"):
+    """Wrap int16 mono PCM in an in-memory WAV file the API client can upload"""
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.asarray(samples, dtype=np.int16).tobytes())
+    buf.name = name  # the SDK infers the upload format from the name
+    buf.seek(0)
+    return buf
+
+
+def _polyphase_filter(up, down, zeros=16, rolloff=0.94, beta=8.0):
+    """Kaiser-windowed sinc taps for every output phase of an up/down resampler.
+
+    Row p holds the weights applied to the input samples around output
+    sample p (mod `up`); rows are normalised for unity gain at DC.
+    """
+    key = (up, down)
+    if key not in _filters:
+        cutoff = 0.5 * min(1.0, up / down) * rolloff  # cycles per input sample
+        half = int(np.ceil(zeros / (2 * cutoff)))
+        offsets = np.arange(-half + 1, half + 1)
+        frac = (np.arange(up) * down % up) / up
+        t = frac[:, None] - offsets[None, :]
+        window = np.i0(beta * np.sqrt(np.clip(1 - (t / half) ** 2, 0, None))) / np.i0(beta)
+        taps = 2 * cutoff * np.sinc(2 * cutoff * t) * window
+        taps /= taps.sum(axis=1, keepdims=True)
+        _filters[key] = (taps.astype(np.float32), half)
+    return _filters[key]
+
+
+def resample(samples, rate, target_rate=UPLOAD_RATE, block=16384):
+    """Band-limited rational resampling of int16 mono PCM (e.g. 44.1 kHz -> 16 kHz)"""
+    samples = np.asarray(samples, dtype=np.int16)
+    if rate == target_rate or len(samples) == 0:
+        return samples
+    g = gcd(rate, target_rate)
+    up, down = target_rate // g, rate // g
+    taps, half = _polyphase_filter(up, down)
+    x = np.concatenate((np.zeros(half, np.float32), samples.astype(np.float32), np.zeros(half + 1, np.float32)))
+    n_out = (len(samples) * up) // down
+    out = np.empty(n_out, dtype=np.float32)
+    width = taps.shape[1]
+    for start in range(0, n_out, block):
+        n = np.arange(start, min(start + block, n_out))
+        base = n * down // up  # input sample at or just before each output sample
+        window = x[base[:, None] + np.arange(width)[None, :] + 1]
+        out[start:start + len(n)] = np.einsum("ij,ij->i", window, taps[n % up])
+    return np.clip(np.round(out), -32768, 32767).astype(np.int16)
+
+
+def ffmpeg_available():
+    """pydub needs ffmpeg (or avconv) to write FLAC/Opus; checked once"""
+    global _ffmpeg
+    with _ffmpeg_lock:
+        if _ffmpeg is None:
+            from pydub.utils import which
+            _ffmpeg = bool(which("ffmpeg") or which("avconv"))
+        return _ffmpeg
+
+
+def encode_for_upload(samples, rate, fmt=None, target_rate=UPLOAD_RATE):
+    """Resample captured PCM and encode it compactly for the transcription API.
+
+    Falls back to 16-bit WAV at `target_rate` when the requested codec
+    cannot be used, so a missing ffmpeg never costs a turn.
+    """
+    global _ffmpeg
+    fmt = (fmt or UPLOAD_FORMAT).lower()
+    samples = resample(samples, rate, target_rate)
+    if fmt in FORMATS and ffmpeg_available():
+        from pydub import AudioSegment
+        container, codec, name = FORMATS[fmt]
+        try:
+            segment = AudioSegment(samples.tobytes(), frame_rate=target_rate, sample_width=2, channels=1)
+            buf = io.BytesIO()
+            if codec:
+                segment.export(buf, format=container, codec=codec, bitrate=OPUS_BITRATE)
+            else:
+                segment.export(buf, format=container)
+            buf.name = name
+            buf.seek(0)
+            return buf
+        except Exception as e:
+            print(f"⚠️ {fmt} encoding failed ({e}); uploading WAV instead")
+            with _ffmpeg_lock:
+                _ffmpeg = False
+    elif fmt != "wav" and fmt not in FORMATS:
+        print(f"⚠️ Unknown upload format '{fmt}'; uploading WAV instead")
+    return pcm_to_wav(samples, target_rate)
@@ -0,0 +1,167 @@
+# modules/audio_output.py
+import io
+import queue
+import threading
+import time
+import pygame
+
+OUTPUT_RATE = 24000  # matches the speech endpoint's raw PCM output
+MIN_BLOCK_BYTES = OUTPUT_RATE * 2 // 10  # coalesce streamed PCM into >=100 ms Sounds
+
+
+class PlaybackWorker(threading.Thread):
+    """Dedicated audio-output thread that owns pygame.mixer for the whole process.
+
+    Other threads hand it audio with `enqueue` and never touch the mixer.
+    `cancel` drops everything queued and stops the current sound; `wait`
+    blocks on an event until the queue has drained and playback finished.
+    The worker knows each Sound's length, so it sleeps until the exact
+    moment the channel frees up instead of polling `get_busy()`.
+    """
+
+    def __init__(self, rate=OUTPUT_RATE):
+        super().__init__(name="playback", daemon=True)
+        self.rate = rate
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._interrupt = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._ready = threading.Event()
+        self._error = None
+        self._held = None
+        self.channel = None
+
+    def start(self):
+        super().start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def enqueue(self, data, fmt="pcm"):
+        """Queue PCM (16-bit mono at `rate`) or an encoded file (e.g. "mp3") for playback"""
+        if not data:
+            return
+        with self._lock:
+            self._idle.clear()
+            self._queue.put((self._generation, data, fmt))
+
+    def cancel(self):
+        """Stop the current sound and discard everything queued"""
+        with self._lock:
+            self._generation += 1
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._interrupt.set()
+            if self.channel is not None:
+                self.channel.stop()
+            self._idle.set()
+
+    def wait(self, timeout=None):
+        """Block until everything queued so far has finished playing"""
+        return self._idle.wait(timeout)
+
+    @property
+    def busy(self):
+        return not self._idle.is_set()
+
+    def _sound(self, data, fmt):
+        if fmt == "pcm":
+            return pygame.mixer.Sound(buffer=data[:len(data) & ~1])
+        return pygame.mixer.Sound(file=io.BytesIO(data))
+
+    def _next_block(self, first):
+        """Merge consecutive PCM chunks that are already waiting into one block"""
+        generation, data, fmt = first
+        if fmt != "pcm":
+            return generation, data, fmt
+        parts = [data]
+        size = len(data)
+        while size < MIN_BLOCK_BYTES:
+            try:
+                item = self._queue.get(timeout=max(0.0, (MIN_BLOCK_BYTES - size) / (2 * self.rate) / 4))
+            except queue.Empty:
+                break
+            if item[0] != generation or item[2] != "pcm":
+                self._held = item  # different reply or format: handle on the next pass
+                break
+            parts.append(item[1])
+            size += len(item[1])
+        return generation, b"".join(parts), fmt
+
+    def run(self):
+        try:
+            pygame.mixer.init(frequency=self.rate, size=-16, channels=1)
+            self.channel = pygame.mixer.Channel(0)
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        ends = []  # scheduled end times of sounds handed to the channel
+        while True:
+            now = time.monotonic()
+            ends = [t for t in ends if t > now]
+            if self._held is not None:
+                item, self._held = self._held, None
+            else:
+                if not ends:
+                    with self._lock:
+                        if self._queue.empty():
+                            self._idle.set()
+                try:
+                    item = self._queue.get(timeout=(ends[-1] - now) if ends else None)
+                except queue.Empty:
+                    continue
+
+            if self._interrupt.is_set():
+                self._interrupt.clear()
+                ends = []
+            generation, data, fmt = self._next_block(item)
+            if generation != self._generation:
+                continue
+            try:
+                sound = self._sound(data, fmt)
+            except Exception as e:
+                print(f"Speech error: {str(e)}")
+                continue
+
+            # The channel holds one playing and one queued sound, so wait
+            # (interruptibly) until the sound before the last one has ended.
+            if len(ends) >= 2:
+                self._interrupt.wait(max(0.0, ends[-2] - time.monotonic()))
+            if self._interrupt.is_set():
+                self._interrupt.clear()
+                ends = []
+                continue
+            while self.channel.get_queue() is not None:
+                time.sleep(0.002)  # rare: the device runs slightly behind our clock
+
+            now = time.monotonic()
+            if self.channel.get_busy():
+                self.channel.queue(sound)
+                start = ends[-1] if ends else now
+            else:
+                self.channel.play(sound)
+                start = now
+            ends.append(max(start, now) + sound.get_length())
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_playback_worker():
+    """Return the process-wide playback worker, starting it (and the mixer) once"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            worker = PlaybackWorker()
+            worker.start()
+            _worker = worker
+        return _worker
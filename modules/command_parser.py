@@ -0,0 +1,101 @@
+# modules/command_parser.py
+import os
+import re
+import sys
+import time
+from typing import NamedTuple
+
+FAST_COMMANDS = os.environ.get("COMMANDLY_FAST_COMMANDS", "true").lower() in {"1","true","yes"}
+
+# Spoken name -> name system_control.open_application understands
+APPS = {
+    "notepad": "notepad",
+    "calculator": "calculator", "calc": "calculator",
+    "chrome": "chrome", "google chrome": "chrome", "browser": "browser",
+    "firefox": "firefox",
+    "word": "word", "microsoft word": "word",
+    "excel": "excel", "microsoft excel": "excel",
+    "outlook": "outlook", "paint": "mspaint", "ms paint": "mspaint",
+    "file explorer": "explorer", "explorer": "explorer", "windows explorer": "explorer",
+    "task manager": "taskmgr",
+    "command prompt": "cmd", "cmd": "cmd", "terminal": "cmd", "powershell": "powershell",
+    "vs code": "code", "visual studio code": "code", "code": "code",
+    "spotify": "spotify", "discord": "discord", "steam": "steam",
+    "settings": "ms-settings:", "control panel": "control",
+}
+
+# Politeness and addressing that don't change the command
+PREFIX = re.compile(r"^(?:(?:hey|ok|okay)\s+)?(?:commandly[,\s]+)?"
+                    r"(?:(?:can|could|would|will)\s+you\s+|please\s+|i\s+want\s+you\s+to\s+|go\s+ahead\s+and\s+)*")
+SUFFIX = re.compile(r"(?:\s+(?:for\s+me|please|now|right\s+now|thanks|thank\s+you))+$")
+
+OPEN_VERBS = r"(?:open|launch|start|run|fire\s+up|bring\s+up|load)"
+APP_NAMES = "|".join(sorted((re.escape(name).replace(r"\ ", r"\s+") for name in APPS), key=len, reverse=True))
+OPEN = re.compile(rf"^{OPEN_VERBS}\s+(?:up\s+)?(?:the\s+|my\s+)?(?P<app>{APP_NAMES})(?:\s+(?:app|application|program|window))?$")
+# Web searches need the web named (or "google"), so "search the code for x" stays with the agent
+WEB = r"(?:the\s+)?(?:web|internet|online|google)"
+SEARCHES = [
+    re.compile(rf"^(?:search|look\s+up|find|check)\s+(?:on\s+)?{WEB}\s+(?:for\s+)?(?P<query>.+)$"),
+    re.compile(r"^(?:search\s+for|search|look\s+up|find)\s+(?P<query>.+?)\s+(?:online|on\s+the\s+(?:web|internet)|on\s+google)$"),
+    re.compile(r"^google\s+(?:for\s+)?(?P<query>.+)$"),
+]
+
+
+class Command(NamedTuple):
+    tool: str
+    args: dict
+    say: str  # what to tell the user once it has run
+
+
+def normalize(text):
+    """Lower-case, drop punctuation, politeness and addressing"""
+    text = re.sub(r"[^\w\s.:'-]", " ", text.lower())
+    text = re.sub(r"\s+", " ", text).strip().rstrip(".")
+    text = PREFIX.sub("", text)
+    return SUFFIX.sub("", text).strip()
+
+
+def parse_command(text):
+    """Map a simple, unambiguous request onto a tool call, or None to let the LLM handle it"""
+    if not FAST_COMMANDS:
+        return None
+    text = normalize(text)
+    match = OPEN.match(text)
+    if match:
+        spoken = re.sub(r"\s+", " ", match.group("app"))
+        return Command("open_application", {"name": APPS[spoken]}, f"Opening {spoken}.")
+    for pattern in SEARCHES:
+        match = pattern.match(text)
+        if match:
+            query = match.group("query").strip()
+            return Command("search_web", {"query": query}, f"Searching the web for {query}.")
+    return None
+
+
+def run_command(command):
+    """Execute a parsed command; returns the reply, or None when it failed and the agent should take over.
+
+    It runs on the agent runtime, so it gets the tool's deadline and barge-in
+    or Escape cancel it like an agent task.
+    """
+    from .agent_runtime import get_agent_runtime  # agent_runtime -> macro_store imports this module
+    start = time.perf_counter()
+    result = get_agent_runtime().run_tool(command.tool, command.args)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if result.startswith("🛑"):
+        return "Task cancelled."
+    if result.startswith(("❌", "Error")):
+        print(f"⚠️ Fast path {command.tool} failed in {elapsed_ms:.0f} ms ({result}); handing over to the agent")
+        return None
+    print(f"⚡ Fast path {command.tool}{command.args} in {elapsed_ms:.0f} ms: {result}")
+    return command.say
+
+
+def main(argv):
+    """python -m modules.command_parser "utterance" ... (parses only, runs nothing)"""
+    for text in argv:
+        print(f"{text!r} -> {parse_command(text)}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
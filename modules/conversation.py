@@ -0,0 +1,159 @@
+# modules/conversation.py
+import json
+import os
+import threading
+import time
+from .gpt_integration import cached_completion
+
+# Prompt budget for the chat history; older turns are summarised to stay under it.
+CONTEXT_TOKENS = int(os.environ.get("COMMANDLY_CONTEXT_TOKENS", "3000"))
+AGENT_CONTEXT_TOKENS = int(os.environ.get("COMMANDLY_AGENT_CONTEXT_TOKENS", "6000"))
+SUMMARY_TOKENS = int(os.environ.get("COMMANDLY_SUMMARY_TOKENS", "250"))
+# After going over budget, evict down to this fraction so compaction isn't needed every turn
+LOW_WATER = 0.75
+MESSAGE_OVERHEAD = 4  # role and separators the API adds per message
+# A batch whose summary fails is retried this many times, then again when a message is added
+SUMMARY_ATTEMPTS = 3
+SUMMARY_RETRY_S = 0.5  # pause before the first retry, doubled for each one after it
+
+SUMMARY_PROMPT = ("You maintain the memory of a voice assistant's conversation. Merge the earlier "
+                  "summary and the new messages into one short summary. Keep names, file paths, "
+                  "decisions, open tasks and user preferences; drop small talk. Reply with the summary only.")
+
+
+def estimate_tokens(message):
+    """Rough token count of a chat message (about 4 characters per token)"""
+    text = message.get("content") or ""
+    if not isinstance(text, str):
+        text = json.dumps(text, ensure_ascii=False)
+    if message.get("tool_calls"):
+        text += json.dumps(message["tool_calls"], ensure_ascii=False, default=str)
+    return MESSAGE_OVERHEAD + (len(text) + 3) // 4
+
+
+def summarize_messages(summary, messages, max_tokens=SUMMARY_TOKENS):
+    """Fold evicted messages into the running summary with one cheap completion"""
+    lines = [f"{m['role']}: {m.get('content') or ''}" for m in messages]
+    prompt = f"Earlier summary:\n{summary or '(none)'}\n\nNew messages:\n" + "\n".join(lines)
+    return cached_completion([{"role": "system", "content": SUMMARY_PROMPT},
+                              {"role": "user", "content": prompt}],
+                             "gpt-4o-mini", temperature=0, max_tokens=max_tokens)
+
+
+class ConversationManager:
+    """Chat history kept under a token budget, with older turns summarised.
+
+    Messages are grouped into turns: a user message starts a turn and so
+    does an assistant message that calls tools; tool results join the turn
+    of the call they answer and a plain reply joins its question. A turn is
+    kept or evicted whole, so the API never sees a tool result without its
+    call. When the history exceeds `budget`, the oldest turns are evicted
+    (never the latest, nor the first when `keep_first` is set, e.g. an
+    agent's task) and folded into a running summary on a background
+    thread; the summary is sent as a second system message. Building a
+    request never waits for summarisation, so its cost stays flat however
+    long the session runs. Turns whose summary failed are sent as they are
+    until a retry folds them in, so none is lost to an API error.
+    """
+
+    def __init__(self, system_prompt, budget=CONTEXT_TOKENS, summarize=summarize_messages, keep_first=False):
+        self.system = {"role": "system", "content": system_prompt}
+        self.budget = budget
+        self.keep_first = keep_first
+        self.summarize = summarize
+        self.summary = ""
+        self.evicted = 0
+        self._turns = []  # [[message, ...], ...]
+        self._sizes = []  # estimated tokens per turn
+        self._tokens = 0
+        self._pending = []  # evicted messages waiting to be summarised
+        self._unsummarised = []  # evicted messages whose summary failed; still sent
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._summarizing = False
+
+    def _summary_message(self):
+        if not self.summary:
+            return []
+        return [{"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"}]
+
+    def messages(self, extra=()):
+        """Request messages: system prompt, summary, the kept turns, then `extra`"""
+        with self._lock:
+            first = 1 if self.keep_first and self._turns else 0
+            kept = [m for turn in self._turns[:first] for m in turn]
+            history = [m for turn in self._turns[first:] for m in turn]
+            return [self.system] + self._summary_message() + kept + self._unsummarised + history + list(extra)
+
+    def tokens(self):
+        """Estimated prompt tokens of the system prompt, summary and kept history"""
+        with self._lock:
+            fixed = sum(estimate_tokens(m) for m in [self.system] + self._summary_message() + self._unsummarised)
+            return fixed + self._tokens
+
+    def add(self, role, content, **fields):
+        self.extend([dict(role=role, content=content, **fields)])
+
+    def extend(self, messages):
+        """Append messages, then compact if the history is over budget"""
+        with self._lock:
+            for message in messages:
+                starts_turn = message["role"] == "user" or (message["role"] == "assistant" and message.get("tool_calls"))
+                if starts_turn or not self._turns:
+                    self._turns.append([])
+                    self._sizes.append(0)
+                self._turns[-1].append(message)
+                size = estimate_tokens(message)
+                self._sizes[-1] += size
+                self._tokens += size
+            self._compact()
+
+    def _compact(self):
+        if self._tokens > self.budget:
+            target = self.budget * LOW_WATER
+            first = 1 if self.keep_first else 0
+            while len(self._turns) > first + 1 and self._tokens > target:
+                self._pending.extend(self._turns.pop(first))
+                self._tokens -= self._sizes.pop(first)
+                self.evicted += 1
+        if self._pending and not self._summarizing:
+            self._summarizing = True
+            threading.Thread(target=self._summarize_pending, name="conversation-summary", daemon=True).start()
+
+    def _summarize_pending(self):
+        failures = 0
+        while True:
+            with self._lock:
+                if not self._pending or failures == SUMMARY_ATTEMPTS:
+                    self._summarizing = False  # what failed waits for the next message
+                    self._idle.notify_all()
+                    return
+                batch, self._pending = self._pending, []
+                summary = self.summary
+            try:
+                summary = self.summarize(summary, batch).strip()
+            except Exception as e:
+                failures += 1
+                print(f"⚠️ Could not summarise earlier conversation (attempt {failures}/{SUMMARY_ATTEMPTS}): {e}")
+                with self._lock:
+                    # Earlier failures lead every batch, so this one holds all of them
+                    self._pending = batch + self._pending
+                    self._unsummarised = batch
+                if failures < SUMMARY_ATTEMPTS:
+                    time.sleep(SUMMARY_RETRY_S * 2 ** (failures - 1))
+                continue
+            failures = 0
+            with self._lock:
+                self.summary = summary
+                self._unsummarised = []
+
+    def wait(self, timeout=None):
+        """Block until evicted turns have been summarised; False on timeout"""
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._summarizing, timeout)
+
+    def clear(self):
+        with self._lock:
+            self._turns, self._sizes, self._tokens = [], [], 0
+            self._pending, self._unsummarised = [], []
+            self.summary = ""
@@ -1,62 +1,144 @@
 # modules/gpt_integration.py
-import openai
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+import json
+from .api_client import get_client
+from .llm_cache import chat_context, get_llm_cache, plan_request, request_key
+from .intent_router import get_intent_router
 
 BASIC_SYSTEM = "You are Commandly. Be concise, helpful, and friendly."
 
+def _cache_key(model, temperature, max_tokens, messages, policy=False, **params):
+    """Reply-cache key for a request, or None when the cache must be bypassed"""
+    cache = get_llm_cache()
+    if not cache.cacheable(temperature, policy):
+        cache.bypassed += 1
+        return None
+    return request_key(model, temperature, messages, max_tokens=max_tokens, **params)
+
+def _chat_key(model, temperature, max_tokens, messages):
+    """Chat replies are keyed on a bounded context, so a repeated question hits in a long conversation"""
+    context = chat_context(messages)
+    if context is None:
+        return _cache_key(model, temperature, max_tokens, messages)
+    return _cache_key(model, temperature, max_tokens, context, policy=True)
+
+def cached_completion(messages, model, temperature, max_tokens, chat=False):
+    """Chat completion text, served from the reply cache when the same request was seen"""
+    cache = get_llm_cache()
+    key = (_chat_key if chat else _cache_key)(model, temperature, max_tokens, messages)
+    if key is not None:
+        reply = cache.get(key)
+        if reply is not None:
+            print("💾 LLM cache hit")
+            return reply
+    response = get_client("chat").chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+    reply = response.choices[0].message.content.strip()
+    if key is not None:
+        cache.put(key, reply)
+    return reply
+
 def chat_completion(messages, model="gpt-4o-mini"):
     """Basic chat completion function"""
     try:
-        response = client.chat.completions.create(
-            model=model, 
-            messages=messages, 
-            temperature=0.7, 
-            max_tokens=500
-        )
-        return response.choices[0].message.content.strip()
+        return cached_completion(messages, model, temperature=0.7, max_tokens=500, chat=True)
     except Exception as e:
         return f"Error: {str(e)}"
 
+def chat_completion_stream(messages, model="gpt-4o-mini"):
+    """Streaming chat completion: yields the reply text piece by piece as tokens arrive"""
+    cache = get_llm_cache()
+    key = _chat_key(model, 0.7, 500, messages)
+    if key is not None:
+        reply = cache.get(key)
+        if reply is not None:
+            print("💾 LLM cache hit")
+            yield reply
+            return
+    try:
+        stream = get_client("chat").chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.7,
+            max_tokens=500,
+            stream=True
+        )
+    except Exception as e:
+        yield f"Error: {str(e)}"
+        return
+    parts = []
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield parts[-1]
+    except Exception as e:
+        yield f" Error: {str(e)}"
+        return
+    finally:
+        stream.close()  # also stops the request when the caller abandons the reply
+    if key is not None:
+        cache.put(key, "".join(parts).strip())
+
+def chat_completion_tools(messages, tools, model="gpt-4o-mini", temperature=0.2, max_tokens=600):
+    """One model turn with native function calling.
+
+    Returns the assistant message as a dict ready to append to the history:
+    {"role": "assistant", "content": ..., "tool_calls": [...]} (no
+    "tool_calls" key when the model answered in text), or {"error": ...}.
+    """
+    cache = get_llm_cache()
+    key = _cache_key(model, temperature, max_tokens, messages, policy=plan_request(messages), tools=tools)
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            print("💾 LLM cache hit")
+            return json.loads(cached)
+    try:
+        response = get_client("chat").chat.completions.create(
+            model=model,
+            messages=messages,
+            tools=tools,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+    except Exception as e:
+        return {"error": str(e)}
+    reply = response.choices[0].message
+    message = {"role": "assistant", "content": reply.content}
+    if reply.tool_calls:
+        message["tool_calls"] = [
+            {"id": call.id, "type": "function",
+             "function": {"name": call.function.name, "arguments": call.function.arguments}}
+            for call in reply.tool_calls
+        ]
+    if key is not None:
+        cache.put(key, json.dumps(message))
+    return message
+
 def ask_gpt(messages) -> str:
     return chat_completion(messages)
 
+def ask_gpt_stream(messages):
+    return chat_completion_stream(messages)
+
 def decide_mode(user_text: str) -> str:
     """Decide whether to use agent mode or chat mode"""
-    t = user_text.lower()
-    
-    # Agent mode triggers - commands that require action
-    agent_triggers = [
-        "open", "launch", "start", "run", "execute", "install", "create", "make", 
-        "build", "add", "write", "modify", "change", "fix", "update", "improve",
-        "delete", "remove", "search web", "browse", "download", "upload", "save",
-        "file", "folder", "program", "application", "notepad", "calculator", 
-        "explorer", "chrome", "firefox", "code", "visual studio", "cmd", "powershell",
-        "restart", "shutdown", "reboot", "kill process", "task manager",
-        "appearance", "color", "design", "interface", "gui", "animation"
-    ]
-    
-    # Check if any agent triggers are present
-    if any(trigger in t for trigger in agent_triggers):
-        print(f"🔧 Agent mode triggered by: {[trigger for trigger in agent_triggers if trigger in t]}")
+    route = get_intent_router().route(user_text)
+    if route.mode == "agent":
+        print(f"🔧 Agent mode ({route.source}, {route.confidence:.2f}) triggers: {list(route.triggers)}")
         return "agent"
     
     # Default to chat mode for general conversation
-    print("💬 Chat mode - general conversation")
+    print(f"💬 Chat mode - general conversation ({route.source}, {route.confidence:.2f})")
     return "chat"
 
 def chat_completion_json(messages, model="gpt-4o-mini"):
     """Return raw text from the model; intended to be JSON-only according to system prompt."""
     try:
-        response = client.chat.completions.create(
-            model=model, 
-            messages=messages, 
-            temperature=0.2, 
-            max_tokens=600
-        )
-        return response.choices[0].message.content.strip()
+        return cached_completion(messages, model, temperature=0.2, max_tokens=600)
     except Exception as e:
         return f'{{ "error": "{str(e)}" }}'
\ No newline at end of file
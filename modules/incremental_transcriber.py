@@ -0,0 +1,116 @@
+# modules/incremental_transcriber.py
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .audio_encoding import encode_for_upload
+
+INCREMENTAL_TRANSCRIPTION = os.environ.get("COMMANDLY_INCREMENTAL_TRANSCRIPTION", "true").lower() in {"1","true","yes"}
+TRANSCRIBE_WORKERS = int(os.environ.get("COMMANDLY_TRANSCRIBE_WORKERS", "3"))
+# Whisper tends to hallucinate on very short clips, so tiny segments are
+# carried over and sent together with the next one.
+MIN_SEGMENT_S = float(os.environ.get("COMMANDLY_MIN_SEGMENT_S", "1.0"))
+MIN_TAIL_S = 0.3
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_transcription_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=TRANSCRIBE_WORKERS, thread_name_prefix="transcribe")
+        return _executor
+
+
+def client_transcriber(client, model="whisper-1", language="en", fmt=None):
+    """Build a transcribe(samples, rate) -> text function for an OpenAI-style client.
+
+    Any object exposing `audio.transcriptions.create(model=, file=, language=)`
+    works, including a local stand-in for the transcription endpoint.
+    """
+    def transcribe(samples, rate):
+        transcript = client.audio.transcriptions.create(
+            model=model,
+            file=encode_for_upload(samples, rate, fmt),
+            language=language
+        )
+        return transcript.text.strip()
+    return transcribe
+
+
+def stitch(parts):
+    """Join per-segment transcripts into one sentence-like string"""
+    text = ""
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        if text and part[0].islower():
+            # The segment boundary was a pause, not a sentence end
+            text = re.sub(r'[.…]+$', '', text)
+        text = f"{text} {part}" if text else part
+    return text
+
+
+class IncrementalTranscriber:
+    """Transcribes finished segments of an utterance while it is still being spoken.
+
+    The capture loop calls `add_segment` each time the VAD reports a pause
+    and `finish` with the remaining audio when the utterance ends; segments
+    go to a shared thread pool straight away, so by the time the speaker
+    stops only the last segment is still outstanding. `result` returns the
+    stitched transcript in speaking order.
+    """
+
+    def __init__(self, transcribe, rate, executor=None, min_segment_s=MIN_SEGMENT_S):
+        self.transcribe = transcribe
+        self.rate = rate
+        self.executor = executor or get_transcription_executor()
+        self.min_samples = int(rate * min_segment_s)
+        self.futures = []
+        self._carry = np.zeros(0, dtype=np.int16)
+        self.finished = False
+
+    def _submit(self, samples):
+        self.futures.append(self.executor.submit(self._safe_transcribe, samples))
+
+    def _safe_transcribe(self, samples):
+        try:
+            return self.transcribe(samples, self.rate)
+        except Exception as e:
+            print(f"❌ Transcription error: {e}")
+            return ""
+
+    def add_segment(self, samples):
+        samples = np.concatenate((self._carry, np.asarray(samples, dtype=np.int16)))
+        if len(samples) < self.min_samples:
+            self._carry = samples
+            return
+        self._carry = np.zeros(0, dtype=np.int16)
+        self._submit(samples)
+
+    def finish(self, tail=None):
+        """Submit whatever audio is left after the last pause.
+
+        The VAD reports a pause before every normal end of speech, so the
+        tail is usually just the trailing pad; it is only sent on its own
+        when it is long enough to hold speech (e.g. the utterance was capped).
+        """
+        tail = np.zeros(0, dtype=np.int16) if tail is None else np.asarray(tail, dtype=np.int16)
+        samples = np.concatenate((self._carry, tail))
+        self._carry = np.zeros(0, dtype=np.int16)
+        if len(samples) and (len(samples) > len(tail) or len(tail) >= self.rate * MIN_TAIL_S or not self.futures):
+            self._submit(samples)
+        self.finished = True
+
+    @property
+    def segments(self):
+        return len(self.futures)
+
+    def result(self, timeout=None):
+        if not self.finished:
+            self.finish()
+        return stitch(f.result(timeout=timeout) for f in self.futures)
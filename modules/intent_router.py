@@ -0,0 +1,216 @@
+# modules/intent_router.py
+import math
+import os
+import re
+import sys
+import threading
+import time
+from typing import NamedTuple
+import numpy as np
+
+# "model": classifier first, keywords when it is unsure; "keywords": word-boundary triggers only
+INTENT_ROUTER = os.environ.get("COMMANDLY_INTENT_ROUTER", "model").lower()
+INTENT_DATA = os.environ.get("COMMANDLY_INTENT_DATA",
+                             os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intents.tsv"))
+# Classifier probability of "agent" at or above which we act / at or below which we chat;
+# anything in between is decided by the trigger words.
+INTENT_AGENT_THRESHOLD = float(os.environ.get("COMMANDLY_INTENT_AGENT_THRESHOLD", "0.65"))
+INTENT_CHAT_THRESHOLD = float(os.environ.get("COMMANDLY_INTENT_CHAT_THRESHOLD", "0.35"))
+
+# Words and phrases that suggest a request needs tools
+TRIGGERS = [
+    "open", "launch", "start", "run", "execute", "install", "create", "make",
+    "build", "add", "write", "modify", "change", "fix", "update", "improve",
+    "delete", "remove", "search web", "browse", "download", "upload", "save",
+    "file", "folder", "program", "application", "notepad", "calculator",
+    "explorer", "chrome", "firefox", "code", "visual studio", "cmd", "powershell",
+    "restart", "shutdown", "reboot", "kill process", "task manager",
+    "appearance", "color", "design", "interface", "gui", "animation"
+]
+
+WORD = re.compile(r"[a-z0-9_']+(?:\.[a-z0-9_]+)*")
+
+
+def compile_triggers(triggers):
+    """One regex matching any trigger as whole words (plurals and -ed/-ing forms too).
+
+    Longest triggers come first so "visual studio" wins over a shorter
+    overlapping trigger; "code" no longer matches "decode", nor "run" "brunch".
+    """
+    alternatives = sorted({t.lower() for t in triggers}, key=len, reverse=True)
+    body = "|".join(r"\s+".join(map(re.escape, t.split())) for t in alternatives)
+    return re.compile(rf"\b(?:{body})(?:s|es|ed|d|ing)?\b")
+
+
+class KeywordMatcher:
+    def __init__(self, triggers=TRIGGERS):
+        self.pattern = compile_triggers(triggers)
+
+    def match(self, text):
+        """Triggers found in `text`, in order of appearance"""
+        return self.pattern.findall(text.lower())
+
+
+def tokens(text):
+    return WORD.findall(text.lower())
+
+
+def features(text):
+    """Word unigrams and bigrams plus character 3-grams of each word (catches inflections)"""
+    words = tokens(text)
+    feats = list(words)
+    feats += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"<{w}>"
+        feats += [f"#{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return feats
+
+
+class IntentClassifier:
+    """TF-IDF features with binary logistic regression, in NumPy.
+
+    `predict` looks each feature up in the vocabulary and takes a sparse
+    dot product with the weights, so a call costs microseconds and never
+    builds a dense vector.
+    """
+
+    def __init__(self, vocabulary, idf, weights, bias, positive="agent", negative="chat"):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.positive = positive
+        self.negative = negative
+
+    @staticmethod
+    def _tfidf(feats, vocabulary, idf):
+        counts = {}
+        for f in feats:
+            j = vocabulary.get(f)
+            if j is not None:
+                counts[j] = counts.get(j, 0) + 1
+        if not counts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        values = (1.0 + np.log(tf)) * idf[idx]  # sublinear tf
+        return idx, values / np.linalg.norm(values)
+
+    @classmethod
+    def fit(cls, texts, labels, positive="agent", l2=1e-3, epochs=400, lr=4.0):
+        """Train by full-batch gradient descent with class-balanced weights"""
+        docs = [features(t) for t in texts]
+        vocabulary = {}
+        for feats in docs:
+            for f in feats:
+                vocabulary.setdefault(f, len(vocabulary))
+        df = np.zeros(len(vocabulary), dtype=np.float32)
+        for feats in docs:
+            df[[vocabulary[f] for f in set(feats)]] += 1
+        idf = (np.log((1 + len(docs)) / (1 + df)) + 1).astype(np.float32)
+
+        X = np.zeros((len(docs), len(vocabulary)), dtype=np.float32)
+        for i, feats in enumerate(docs):
+            idx, values = cls._tfidf(feats, vocabulary, idf)
+            X[i, idx] = values
+        y = np.array([label == positive for label in labels], dtype=np.float32)
+        n_pos = max(y.sum(), 1.0)
+        n_neg = max(len(y) - y.sum(), 1.0)
+        sample_weight = np.where(y == 1, len(y) / (2 * n_pos), len(y) / (2 * n_neg)).astype(np.float32)
+
+        w = np.zeros(len(vocabulary), dtype=np.float32)
+        b = 0.0
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-(X @ w + b)))
+            g = (p - y) * sample_weight / len(y)
+            w -= lr * (X.T @ g + l2 * w)
+            b -= lr * float(g.sum())
+        negative = next((label for label in labels if label != positive), "chat")
+        return cls(vocabulary, idf, w, b, positive, negative)
+
+    def probability(self, text):
+        """P(positive label | text)"""
+        idx, values = self._tfidf(features(text), self.vocabulary, self.idf)
+        z = float(self.weights[idx] @ values) + self.bias
+        return 1.0 / (1.0 + math.exp(-z))
+
+
+def load_examples(path=INTENT_DATA):
+    """(texts, labels) from a `label<TAB>utterance` file; # starts a comment"""
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            label, text = line.split("\t", 1)
+            labels.append(label.strip())
+            texts.append(text.strip())
+    return texts, labels
+
+
+class Route(NamedTuple):
+    mode: str  # "agent" or "chat"
+    confidence: float  # probability of the chosen mode (1.0 for a keyword decision)
+    source: str  # "model" or "keywords"
+    triggers: tuple = ()
+
+
+class IntentRouter:
+    """Decides between chat and agent mode for an utterance.
+
+    The classifier decides when it is confident; otherwise whole-word
+    triggers do (any trigger means agent mode).
+    """
+
+    def __init__(self, classifier=None, matcher=None, agent_threshold=INTENT_AGENT_THRESHOLD,
+                 chat_threshold=INTENT_CHAT_THRESHOLD):
+        self.classifier = classifier
+        self.matcher = matcher or KeywordMatcher()
+        self.agent_threshold = agent_threshold
+        self.chat_threshold = chat_threshold
+
+    def route(self, text):
+        triggers = tuple(self.matcher.match(text))
+        if self.classifier is not None:
+            p = self.classifier.probability(text)
+            if p >= self.agent_threshold:
+                return Route("agent", p, "model", triggers)
+            if p <= self.chat_threshold:
+                return Route("chat", 1.0 - p, "model", triggers)
+        return Route("agent" if triggers else "chat", 1.0, "keywords", triggers)
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_intent_router():
+    """Process-wide router; the classifier is trained from INTENT_DATA on first use"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            classifier = None
+            if INTENT_ROUTER == "model":
+                try:
+                    start = time.perf_counter()
+                    texts, labels = load_examples()
+                    classifier = IntentClassifier.fit(texts, labels)
+                    print(f"🧭 Intent model trained on {len(texts)} examples in "
+                          f"{(time.perf_counter() - start) * 1000:.0f} ms")
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Intent model unavailable ({e}); routing by keywords only")
+            _router = IntentRouter(classifier)
+        return _router
+
+
+def main(argv):
+    """python -m modules.intent_router "utterance" ..."""
+    router = get_intent_router()
+    for text in argv:
+        route = router.route(text)
+        print(f"{route.mode:5s} {route.confidence:.2f} ({route.source}) {text!r} triggers={list(route.triggers)}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,173 @@
+# modules/llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from .tts_cache import CACHE_DIR
+
+LLM_CACHE = os.environ.get("COMMANDLY_LLM_CACHE", "true").lower() in {"1","true","yes"}
+LLM_CACHE_TTL_S = float(os.environ.get("COMMANDLY_LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+LLM_CACHE_MB = float(os.environ.get("COMMANDLY_LLM_CACHE_MB", "16"))
+# Sampling with temperature > 0 gives a different answer each time; such
+# replies are only cached under the two policies below, or for every
+# request when explicitly asked to.
+LLM_CACHE_NONDETERMINISTIC = os.environ.get("COMMANDLY_LLM_CACHE_NONDETERMINISTIC", "false").lower() in {"1","true","yes"}
+# Agent plans: the first model turn for a command (system prompt and the
+# command, no tool results yet) is reused when the same command comes again.
+LLM_CACHE_PLANS = os.environ.get("COMMANDLY_LLM_CACHE_PLANS", "true").lower() in {"1","true","yes"}
+# Chat: a reply is keyed on the system prompt and the last this many
+# messages, not the whole transcript; 0 leaves chat uncached.
+LLM_CACHE_CHAT_MESSAGES = int(os.environ.get("COMMANDLY_LLM_CACHE_CHAT_MESSAGES", "2"))
+
+
+def request_key(model, temperature, messages, **params):
+    """Canonical hash of a chat request: same request, same key, regardless of dict order"""
+    canonical = json.dumps(
+        {"model": model, "temperature": float(temperature), "messages": messages, "params": params},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def plan_request(messages):
+    """Whether a tools request is an agent's first turn for a command (LLM_CACHE_PLANS)"""
+    return LLM_CACHE_PLANS and [m["role"] for m in messages if m["role"] != "system"] == ["user"]
+
+
+def chat_context(messages, size=None):
+    """The messages a chat reply is keyed on: the system prompt and the last `size`, or None when chat isn't cached"""
+    size = LLM_CACHE_CHAT_MESSAGES if size is None else size
+    if size <= 0:
+        return None
+    head = messages[:1] if messages and messages[0]["role"] == "system" else []
+    return head + [m for m in messages[len(head):] if m["role"] != "system"][-size:]
+
+
+class LLMCache:
+    """SQLite-backed cache of chat completion replies with a TTL and an LRU size cap.
+
+    Each row stores the reply text, its size and when it was created and
+    last used. Entries older than `ttl` are misses; when the total size
+    exceeds `max_bytes` the least recently used rows are deleted.
+    """
+
+    def __init__(self, path=None, ttl=LLM_CACHE_TTL_S, max_bytes=None,
+                 enabled=LLM_CACHE, nondeterministic=LLM_CACHE_NONDETERMINISTIC):
+        self.path = path or os.path.join(CACHE_DIR, "llm.sqlite3")
+        self.ttl = ttl
+        self.max_bytes = int(LLM_CACHE_MB * 1024 * 1024) if max_bytes is None else max_bytes
+        self.enabled = enabled
+        self.nondeterministic = nondeterministic
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if enabled:
+            self._open()
+
+    def _open(self):
+        try:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS replies ("
+                "key TEXT PRIMARY KEY, reply TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, last_used REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS replies_last_used ON replies (last_used)")
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM cache unavailable: {e}")
+            self._db = None
+
+    def cacheable(self, temperature, policy=False):
+        """Whether a request may be served from / stored in the cache; `policy` for a sampled one a policy allows"""
+        return self._db is not None and (temperature == 0 or policy or self.nondeterministic)
+
+    def get(self, key):
+        """Return the cached reply for a request key, or None"""
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._db.execute("SELECT reply, created FROM replies WHERE key = ?", (key,)).fetchone()
+                if row is not None and now - row[1] > self.ttl:
+                    self._db.execute("DELETE FROM replies WHERE key = ?", (key,))
+                    row = None
+                if row is None:
+                    self.misses += 1
+                    return None
+                self._db.execute("UPDATE replies SET last_used = ? WHERE key = ?", (now, key))
+            except sqlite3.Error as e:
+                print(f"⚠️ LLM cache read failed: {e}")
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, reply):
+        """Store a reply, then evict least recently used rows over the size cap"""
+        size = len(reply.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.execute("INSERT OR REPLACE INTO replies VALUES (?, ?, ?, ?, ?)", (key, reply, size, now, now))
+                self._db.execute("DELETE FROM replies WHERE created < ?", (now - self.ttl,))
+                total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM replies").fetchone()[0]
+                if total > self.max_bytes:
+                    evict, freed = [], 0
+                    for old, old_size in self._db.execute("SELECT key, size FROM replies ORDER BY last_used"):
+                        if total - freed <= self.max_bytes:
+                            break
+                        evict.append((old,))
+                        freed += old_size
+                    self._db.executemany("DELETE FROM replies WHERE key = ?", evict)
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not write LLM cache entry: {e}")
+
+    def clear(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM replies")
+
+    def stats(self):
+        entries = size = 0
+        with self._lock:
+            if self._db is not None:
+                entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM replies").fetchone()
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "bypassed": self.bypassed,
+                    "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "entries": entries, "bytes": size}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Process-wide reply cache shared by the chat and agent paths"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+def main(argv):
+    """python -m modules.llm_cache stats | clear"""
+    cache = LLMCache(enabled=True)
+    if argv and argv[0] == "clear":
+        cache.clear()
+        print("🗑️ LLM cache cleared")
+    stats = cache.stats()
+    print(f"📂 {cache.path}: {stats['entries']} replies, {stats['bytes'] / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,282 @@
+# modules/macro_store.py
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from typing import NamedTuple
+from .command_parser import normalize
+from .tts_cache import CACHE_DIR
+
+MACROS = os.environ.get("COMMANDLY_MACROS", "true").lower() in {"1","true","yes"}
+MACRO_MAX = int(os.environ.get("COMMANDLY_MACRO_MAX", "200"))
+
+# Tools whose effect is the whole point of the task. A task that read files,
+# listed folders or ran commands answered from what it saw, so replaying only
+# its calls would repeat a stale answer; those tasks are not recorded.
+MACRO_TOOLS = {"open_application", "open_program", "search_web", "install_package", "write_file"}
+# Words never turned into slots, so "search for the x" keeps its shape
+FIXED_WORDS = {"the", "and", "for", "with", "from", "into", "then", "called", "named", "file", "folder"}
+# {slot0} / {Slot0} / {SLOT0}: slot 0 in the letter case the recorded value had there
+SLOT = re.compile(r"\{(slot|Slot|SLOT)(\d+)\}")
+
+
+def failed(result):
+    """Whether a tool result reports a failure"""
+    return str(result).startswith(("❌", "Error"))
+
+
+class Match(NamedTuple):
+    key: str  # the utterance template, e.g. "open {slot0} and {slot1}"
+    turns: list  # [[{"name": ..., "args": {...}}, ...], ...] with the slots filled in
+    reply: str
+    slots: tuple  # values taken from this utterance
+    recorded: bool  # same slot values as when it was recorded
+
+
+def _slot_pattern(word):
+    return re.compile(rf"(?<![a-z0-9_]){re.escape(word)}(?![a-z0-9_])", re.IGNORECASE)
+
+
+def _marker(n, found):
+    if len(found) > 1 and found.isupper():
+        return f"{{SLOT{n}}}"
+    return f"{{Slot{n}}}" if found[0].isupper() else f"{{slot{n}}}"
+
+
+def _cased(style, value):
+    return value.upper() if style == "SLOT" else value[:1].upper() + value[1:] if style == "Slot" else value
+
+
+def _template(value, slots):
+    """Replace every slot word in a string / list / dict of tool arguments by its marker"""
+    if isinstance(value, str):
+        for n, word in enumerate(slots):
+            value = _slot_pattern(word).sub(lambda m: _marker(n, m.group()), value)
+        return value
+    if isinstance(value, list):
+        return [_template(v, slots) for v in value]
+    if isinstance(value, dict):
+        return {k: _template(v, slots) for k, v in value.items()}
+    return value
+
+
+def _fill(value, slots):
+    if isinstance(value, str):
+        return SLOT.sub(lambda m: _cased(m.group(1), slots[int(m.group(2))]), value)
+    if isinstance(value, list):
+        return [_fill(v, slots) for v in value]
+    if isinstance(value, dict):
+        return {k: _fill(v, slots) for k, v in value.items()}
+    return value
+
+
+def _mentions(value, word):
+    if isinstance(value, str):
+        return _slot_pattern(word).search(value) is not None
+    if isinstance(value, list):
+        return any(_mentions(v, word) for v in value)
+    if isinstance(value, dict):
+        return any(_mentions(v, word) for v in value.values())
+    return False
+
+
+def make_macro(user_text, turns, reply):
+    """Macro entry for a finished task, or None when it can't be replayed.
+
+    `turns` holds the successful calls of each model turn as (name, args).
+    Words of the utterance that reappear in the arguments (an app name, a
+    file name, a package) become slots, so "open spotify" also serves
+    "open discord".
+    """
+    turns = [turn for turn in turns if turn]
+    if not turns or any(name not in MACRO_TOOLS for turn in turns for name, _ in turn):
+        return None
+    text = normalize(user_text)
+    words = text.split()
+    slots = []
+    for word in words:
+        if (len(word) >= 3 and word not in FIXED_WORDS and word not in slots
+                and any(_mentions(args, word) for turn in turns for _, args in turn)):
+            slots.append(word)
+    if all(w in slots for w in words):
+        return None  # a template of slots alone would match any utterance of that length
+    key = " ".join(f"{{slot{slots.index(w)}}}" if w in slots else w for w in words)
+    now = time.time()
+    turns = [[{"name": name, "args": _template(args, slots)} for name, args in turn] for turn in turns]
+    return {"key": key, "utterance": text, "slots": slots, "turns": turns,
+            "reply": _template(reply, slots), "created": now, "last_used": now, "hits": 0}
+
+
+def _key_pattern(key):
+    """Regex matching utterances of a template; each slot is one word (group sN)"""
+    parts, seen = [], set()
+    for word in key.split():
+        slot = SLOT.fullmatch(word)
+        if slot is None:
+            parts.append(re.escape(word))
+        elif slot.group(2) in seen:
+            parts.append(f"(?P=s{slot.group(2)})")
+        else:
+            seen.add(slot.group(2))
+            parts.append(rf"(?P<s{slot.group(2)}>\S+)")
+    return re.compile(" ".join(parts))
+
+
+class MacroStore:
+    """Tool sequences of successful agent tasks, replayed for matching requests.
+
+    Entries are keyed on the normalised utterance with slot words replaced
+    by markers and kept in a JSON file in the cache folder. When there are
+    more than `max_entries` the least recently used ones are dropped.
+    """
+
+    def __init__(self, path=None, max_entries=MACRO_MAX, enabled=MACROS):
+        self.path = path or os.path.join(CACHE_DIR, "macros.json")
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries = None
+        self._patterns = {}
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._entries = {entry["key"]: entry for entry in json.load(f)}
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"⚠️ Macro store unreadable ({e}); starting empty")
+                self._entries = {}
+        return self._entries
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(list(self._entries.values()), f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️ Could not save macros: {e}")
+
+    def match(self, user_text):
+        """The macro for an utterance with its slots filled in, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry, values = self._find(normalize(user_text))
+            if entry is None:
+                return None
+            return Match(entry["key"], _fill(entry["turns"], values), _fill(entry["reply"], values),
+                         values, values == tuple(entry["slots"]))
+
+    def _find(self, text):
+        """(entry, slot values) for a normalised utterance, or (None, ())"""
+        entries = self._load()
+        for entry in entries.values():
+            if entry["utterance"] == text:
+                return entry, tuple(entry["slots"])
+        # Fewest slots first: the most specific template wins
+        for key in sorted(entries, key=lambda k: len(entries[k]["slots"])):
+            pattern = self._patterns.get(key)
+            if pattern is None:
+                pattern = self._patterns[key] = _key_pattern(key)
+            found = pattern.fullmatch(text)
+            if found:
+                slots = entries[key]["slots"]
+                return entries[key], tuple(found.group(f"s{n}") for n in range(len(slots)))
+        return None, ()
+
+    def record(self, user_text, turns, reply):
+        """Store a finished task; returns the entry, or None when it isn't replayable"""
+        if not self.enabled:
+            return None
+        entry = make_macro(user_text, turns, reply)
+        if entry is None:
+            return None
+        with self._lock:
+            entries = self._load()
+            old = entries.pop(entry["key"], None)
+            if old is not None:
+                entry["hits"] = old["hits"]
+            entries[entry["key"]] = entry
+            self._patterns.pop(entry["key"], None)
+            if len(entries) > self.max_entries:
+                for key in sorted(entries, key=lambda k: entries[k]["last_used"])[:len(entries) - self.max_entries]:
+                    del entries[key]
+                    self._patterns.pop(key, None)
+            self._save()
+        return entry
+
+    def used(self, match):
+        """Note a successful replay (keeps the entry away from eviction)"""
+        with self._lock:
+            entry = self._load().get(match.key)
+            if entry is not None:
+                entry["last_used"] = time.time()
+                entry["hits"] += 1
+                self._save()
+
+    def invalidate(self, key):
+        """Forget one macro by its key or by an utterance it matches; True when one was removed"""
+        with self._lock:
+            entries = self._load()
+            if key not in entries:
+                entry, _ = self._find(normalize(key))
+                if entry is None:
+                    return False
+                key = entry["key"]
+            del entries[key]
+            self._patterns.pop(key, None)
+            self._save()
+            return True
+
+    def entries(self):
+        """All macros, most recently used first"""
+        with self._lock:
+            return sorted(self._load().values(), key=lambda e: e["last_used"], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._patterns.clear()
+            self._save()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_macro_store():
+    """Process-wide macro store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MacroStore()
+        return _store
+
+
+def main(argv):
+    """python -m modules.macro_store list | forget <utterance or key> | clear"""
+    store = MacroStore(enabled=True)
+    command = argv[0] if argv else "list"
+    if command == "clear":
+        store.clear()
+        print("🗑️ Macros cleared")
+    elif command == "forget" and len(argv) > 1:
+        text = " ".join(argv[1:])
+        print(f"🗑️ Forgot {text!r}" if store.invalidate(text) else f"❌ No macro matches {text!r}")
+    else:
+        entries = store.entries()
+        print(f"📂 {store.path}: {len(entries)} macros")
+        for entry in entries:
+            steps = ", ".join(step["name"] for turn in entry["turns"] for step in turn)
+            print(f"   {entry['key']!r} ({entry['hits']} replays): {steps}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -6,7 +6,6 @@ import matplotlib.animation as animation
 import numpy as np
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import threading
-import time
 import sys
 import os
 import pyaudio # Add this import for testing audio devices
@@ -14,9 +13,10 @@ import pyaudio # Add this import for testing audio devices
 # Add the parent directory to the path so we can import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from modules.gpt_integration import ask_gpt, decide_mode
-from modules.agent_core import run_agent
-from modules.voice_openai import record_audio, transcribe_audio, speak_text
+from modules.voice_openai import warm_tts_cache
+from modules.assistant_pipeline import AssistantPipeline
+from modules.conversation import ConversationManager
+from modules.intent_router import get_intent_router
 
 class OrbApp(tk.Tk):
     ###############################################################################
@@ -44,6 +44,8 @@ class OrbApp(tk.Tk):
         # Dragging functionality key binding.
         self.bind("<ButtonPress-1>", self.start_move)#<--
         self.bind("<B1-Motion>", self.do_move)#<--
+        # Escape cancels the current reply or agent task.
+        self.bind("<Escape>", self.cancel_task)
 
         ###############################################################################
         #### end main frame ####
@@ -88,7 +90,8 @@ class OrbApp(tk.Tk):
         
 
         self.system_prompt = self.load_system_prompt() # <--
-        self.conversation = [{"role": "system", "content": self.system_prompt}]
+        # Token-budgeted history; older turns are summarised in the background
+        self.conversation = ConversationManager(self.system_prompt)
 
         # Initialize mode and lock thread.
         self.mode = "idle"
@@ -96,6 +99,11 @@ class OrbApp(tk.Tk):
 
         threading.Thread(target=self.assistant_loop, daemon=True).start()#<--
 
+        # Pre-synthesise stock replies so they play without an API round trip.
+        threading.Thread(target=warm_tts_cache, daemon=True).start()
+        # Train the intent router now rather than on the first request.
+        threading.Thread(target=get_intent_router, daemon=True).start()
+
         # Test audio devices - Add this test to your code temporarily
         self.test_audio_devices()
 
@@ -125,6 +133,12 @@ class OrbApp(tk.Tk):
         y = self.winfo_y() + event.y - self._drag_start_y
         self.geometry(f"+{x}+{y}")
 
+    # Cancel the running task (Escape key).
+    def cancel_task(self, event=None):
+        pipeline = getattr(self, "pipeline", None)
+        if pipeline is not None:
+            pipeline.cancel()
+
 
 
 
@@ -265,83 +279,10 @@ class OrbApp(tk.Tk):
 
     def assistant_loop(self):
         print("🧠 Assistant is running with Orb UI.")
-        while True:
-            try:
-                self.set_mode("listening")
-                self.update_status("🎙️ Listening...")
-                
-                has_audio = record_audio()
-                
-                if not has_audio:
-                    print("🔇 No audio detected, continuing to listen...")
-                    time.sleep(0.5)
-                    continue
-
-                self.set_mode("thinking")
-                self.update_status("🧠 Transcribing...")
-                user_input = transcribe_audio()
-                
-            except Exception as e:
-                self.update_status("⚠️ Voice input failed. Type instead.")
-                print(f"⚠️ Voice input unavailable ({e}). Please type your input.")
-                try:
-                    user_input = input("You: ")
-                except (EOFError, KeyboardInterrupt):
-                    print("👋 Goodbye!")
-                    self.destroy()
-                    break
-                self.set_mode("thinking")
-
-            if not user_input or len(user_input.strip()) < 2:
-                print("🔇 No meaningful input detected, continuing to listen...")
-                self.set_mode("idle")
-                self.update_status("🎤 Ready to listen...")
-                time.sleep(0.5)
-                continue
-
-            exit_commands = ["exit", "quit", "stop", "goodbye", "bye", "close", "shut down", "end"]
-            if any(cmd in user_input.lower() for cmd in exit_commands):
-                try:
-                    self.set_mode("speaking")
-                    self.update_status("👋 Exiting...")
-                    speak_text("Goodbye!")
-                    print("👋 Goodbye!")
-                except:
-                    print("👋 Goodbye!")
-                self.destroy()
-                break
-
-            print(f"🗣️ Processing: '{user_input}'")
-            
-            mode = decide_mode(user_input)
-            
-            if mode == "agent":
-                self.set_mode("agent")
-                self.update_status("🔧 Agent mode - Executing...")
-                try:
-                    reply = run_agent(user_input)
-                except Exception as e:
-                    reply = f"Agent error: {str(e)}"
-            else:
-                self.conversation.append({"role": "user", "content": user_input})
-                self.update_status("🤖 Thinking...")
-                reply = ask_gpt(self.conversation)
-                self.conversation.append({"role": "assistant", "content": reply})
-
-            print("Commandly:", reply)
-            self.update_text(user_input, reply)
-
-            try:
-                self.set_mode("speaking")
-                self.update_status("💬 Speaking...")
-                speak_text(reply)
-            except Exception as e:
-                print(f"⚠️ Voice output unavailable ({e}).")
-                print("Commandly (text):", reply)
-
-            self.set_mode("idle")
-            self.update_status("✅ Ready")
-            time.sleep(0.1)
+        # Listening, transcription, thinking and speaking run as overlapping
+        # stages; see modules/assistant_pipeline.py.
+        self.pipeline = AssistantPipeline(self)
+        self.pipeline.run()
 
 if __name__ == "__main__":
     app = OrbApp()
@@ -0,0 +1,93 @@
+# modules/sentences.py
+import re
+
+# The speech endpoint accepts up to 4096 characters per request.
+MAX_CHUNK_CHARS = 4000
+
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "no", "fig"}
+_BOUNDARY = re.compile(r'([.!?…]+["\')\]]*)(\s+)|(\n\s*\n|\n(?=\s*[-*•\d]))')
+
+
+def _is_abbreviation(text, end):
+    """True if the period ending at `end` belongs to an abbreviation or number"""
+    word = re.search(r'(\S+)$', text[:end])
+    if not word:
+        return False
+    token = word.group(1).rstrip('.').lower()
+    return token in _ABBREVIATIONS or (len(token) == 1 and token.isalpha())
+
+
+def _split_long(sentence, max_chars):
+    """Break an over-long sentence at clause punctuation, then at spaces"""
+    pieces = []
+    while len(sentence) > max_chars:
+        window = sentence[:max_chars]
+        cut = max(window.rfind(p) for p in (", ", "; ", ": ", " - "))
+        if cut <= max_chars // 4:
+            cut = window.rfind(" ")
+        if cut <= 0:
+            cut = max_chars - 1
+        pieces.append(sentence[:cut + 1].strip())
+        sentence = sentence[cut + 1:].strip()
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+
+def _boundaries(text):
+    """Yield end offsets of complete sentences in `text`"""
+    for match in _BOUNDARY.finditer(text):
+        if match.group(1) and match.group(1).startswith('.') and _is_abbreviation(text, match.start(1)):
+            continue
+        yield match.end()
+
+
+def split_sentences(text, max_chars=MAX_CHUNK_CHARS):
+    """Split a reply into speakable sentences, none longer than `max_chars`"""
+    sentences = []
+    start = 0
+    for end in _boundaries(text):
+        sentences.extend(_split_long(text[start:end].strip(), max_chars))
+        start = end
+    sentences.extend(_split_long(text[start:].strip(), max_chars))
+    return [s for s in sentences if s]
+
+
+class SentenceBuffer:
+    """Accumulates streamed text and releases sentences as soon as they close.
+
+    A sentence counts as closed once its terminator is followed by
+    whitespace, so "3." is held back until we know it is not "3.5".
+    """
+
+    def __init__(self, max_chars=MAX_CHUNK_CHARS):
+        self.max_chars = max_chars
+        self.text = ""
+
+    def feed(self, fragment):
+        self.text += fragment
+        ready = []
+        start = 0
+        for end in _boundaries(self.text):
+            ready.extend(_split_long(self.text[start:end].strip(), self.max_chars))
+            start = end
+        self.text = self.text[start:]
+        # Don't let a run-on sentence grow past what one request can take
+        if len(self.text) > self.max_chars:
+            pieces = _split_long(self.text, self.max_chars)
+            ready.extend(pieces[:-1])
+            self.text = pieces[-1]
+        return [s for s in ready if s]
+
+    def flush(self):
+        rest = _split_long(self.text.strip(), self.max_chars)
+        self.text = ""
+        return [s for s in rest if s]
+
+
+def stream_sentences(fragments, max_chars=MAX_CHUNK_CHARS):
+    """Turn a stream of text fragments (e.g. chat tokens) into a stream of sentences"""
+    buffer = SentenceBuffer(max_chars)
+    for fragment in fragments:
+        yield from buffer.feed(fragment)
+    yield from buffer.flush()
@@ -0,0 +1,355 @@
+# modules/tools/file_index.py
+import fnmatch
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from typing import NamedTuple
+import numpy as np
+from ..tts_cache import CACHE_DIR
+
+FILE_INDEX = os.environ.get("COMMANDLY_FILE_INDEX", "true").lower() in {"1","true","yes"}
+# A refresh within this many seconds of the last one is skipped
+FILE_INDEX_REFRESH_S = float(os.environ.get("COMMANDLY_FILE_INDEX_REFRESH_S", "2"))
+# Never descended into (hidden folders, whose names start with ".", are skipped too, as glob did)
+IGNORED_DIRS = {"__pycache__", "node_modules"}
+# Fuzzy matches must share this fraction of the query's trigrams
+FUZZY_SHARE = 0.6
+# A directory modified this recently may change again within the same mtime tick; rescan it next time
+RACY_NS = 2_000_000_000
+SEPARATOR = 10  # "\n" between names in the trigram buffer
+# Files of changed folders are searched linearly; past this many (or this share of the index) it is rebuilt
+REBUILD_MIN_FILES = 5000
+REBUILD_SHARE = 0.05
+WILDCARDS = "*?["  # a query with any of these is a glob pattern
+
+
+def _trigrams(data):
+    """Trigram codes of a byte string"""
+    b = np.frombuffer(data, dtype=np.uint8).astype(np.int64)
+    return np.unique((b[:-2] << 16) | (b[1:-1] << 8) | b[2:]) if len(b) >= 3 else np.zeros(0, np.int64)
+
+
+def build_trigrams(names):
+    """CSR trigram index over lower-cased names: (trigram codes, offsets, file ids).
+
+    Built in NumPy over all names at once: the names are joined into one
+    byte buffer, every 3-byte window that doesn't cross a separator gives a
+    (trigram, file) pair, and sorting the pairs yields the posting lists.
+    """
+    data = "\n".join(n.replace("\n", " ") for n in names).encode("utf-8", "surrogateescape")
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if len(buf) < 3:
+        return np.zeros(0, np.int64), np.zeros(1, np.int64), np.zeros(0, np.int32)
+    sep = buf == SEPARATOR
+    file_of = np.cumsum(sep)[:-2]  # file id of each window start
+    valid = ~(sep[:-2] | sep[1:-1] | sep[2:])
+    b = buf.astype(np.int64)
+    codes = ((b[:-2] << 16) | (b[1:-1] << 8) | b[2:])[valid]
+    # Sort and dedupe by hand: np.unique may pick a hash-based path that is far slower here
+    pairs = np.sort(codes * len(names) + file_of[valid])
+    pairs = pairs[np.append(True, pairs[1:] != pairs[:-1])]
+    codes, ids = np.divmod(pairs, len(names))
+    offsets = np.flatnonzero(np.append(True, codes[1:] != codes[:-1]))
+    return codes[offsets], np.append(offsets, len(ids)), ids.astype(np.int32)
+
+
+class _Names(NamedTuple):
+    """File names as of the last rebuild, with their trigram index"""
+    dir_names: list
+    dir_index: dict  # folder -> position in dir_names
+    names: list
+    lower: list
+    dir_of: np.ndarray  # folder position of each file
+    order: np.ndarray  # file ids, shortest name first, then shallowest folder
+    position: np.ndarray  # inverse of order
+    trigrams: np.ndarray
+    offsets: np.ndarray
+    ids: np.ndarray
+
+
+class FileIndex:
+    """File names below a root folder, kept up to date by directory mtime.
+
+    `dirs` maps each folder (relative to the root) to its mtime and the
+    names of its subfolders and files. A refresh stats every folder but
+    only rescans, with os.scandir, the ones whose mtime changed, since
+    adding, removing or renaming an entry updates its parent's mtime.
+    The folder table is saved in the cache folder, so a restart starts warm.
+    Name queries go through a trigram index of the lower-cased file names;
+    files of folders changed since it was built are checked one by one
+    until there are enough of them to rebuild it.
+    """
+
+    def __init__(self, root, path=None, refresh_s=FILE_INDEX_REFRESH_S):
+        self.root = os.path.abspath(root)
+        digest = hashlib.sha1(self.root.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+        self.path = path or os.path.join(CACHE_DIR, "file_index", f"{digest}.json")
+        self.refresh_s = refresh_s
+        self.dirs = {}
+        self.rescanned = 0  # folders read by the last refresh
+        self._checked = None
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._saver = None
+        self._load()
+        self._build()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("root") == self.root:
+                self.dirs = {rel: (mtime, subdirs, files) for rel, (mtime, subdirs, files) in saved["dirs"].items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ File index unreadable ({e}); rebuilding")
+
+    def _save(self, dirs):
+        """Write the folder table (runs on a background thread after each refresh that changed it)"""
+        with self._save_lock:
+            if dirs is not self.dirs:
+                return  # a newer refresh saves its own
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"root": self.root, "dirs": dirs}, f, separators=(",", ":"))
+                os.replace(tmp, self.path)
+            except OSError as e:
+                print(f"⚠️ Could not save file index: {e}")
+
+    @staticmethod
+    def _scan(full):
+        subdirs, files = [], []
+        with os.scandir(full) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in IGNORED_DIRS:
+                            subdirs.append(entry.name)
+                    elif entry.is_file():
+                        files.append(entry.name)
+                except OSError:
+                    continue
+        return subdirs, files
+
+    def refresh(self, force=False):
+        """Bring the index up to date; True when something changed"""
+        with self._lock:
+            if not force and self._checked is not None and time.monotonic() - self._checked < self.refresh_s:
+                return False
+            old, new = self.dirs, {}
+            now = time.time_ns()
+            rescanned, changed = 0, set()
+            stack = [""]
+            while stack:
+                rel = stack.pop()
+                full = os.path.join(self.root, rel) if rel else self.root
+                try:
+                    mtime = os.stat(full).st_mtime_ns
+                except OSError:
+                    continue
+                entry = old.get(rel)
+                if entry is None or entry[0] != mtime:
+                    try:
+                        subdirs, files = self._scan(full)
+                    except OSError:
+                        continue
+                    rescanned += 1
+                    # A racy folder (mtime -1) is read again each time, but only counts as changed when it did
+                    if entry is None or (entry[1], entry[2]) != (subdirs, files):
+                        changed.add(rel)
+                    entry = (-1 if now - mtime < RACY_NS else mtime, subdirs, files)
+                new[rel] = entry
+                stack.extend(os.path.join(rel, d) if rel else d for d in entry[1])
+            changed |= old.keys() - new.keys()
+            self.dirs = new
+            self.rescanned = rescanned
+            self._checked = time.monotonic()
+            if not changed:
+                return False
+            self._update(changed)
+            self._saver = threading.Thread(target=self._save, args=(new,), daemon=True)
+            self._saver.start()
+            return True
+
+    def flush(self):
+        """Wait until the last refresh has been saved"""
+        if self._saver is not None:
+            self._saver.join()
+
+    def _build(self):
+        dir_names, names, dir_of = [], [], []
+        for rel, (_, _, files) in self.dirs.items():
+            dir_of.extend([len(dir_names)] * len(files))
+            dir_names.append(rel)
+            names.extend(files)
+        lower = [n.lower() for n in names]
+        dir_of = np.array(dir_of, dtype=np.int32)
+        depth = np.array([rel.count(os.sep) for rel in dir_names], dtype=np.int32)[dir_of]
+        order = np.lexsort((depth, np.fromiter(map(len, lower), dtype=np.int32, count=len(lower))))
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+        base = _Names(dir_names, {rel: k for k, rel in enumerate(dir_names)}, names, lower, dir_of,
+                      order, position, *build_trigrams(lower))
+        self._stale = set()
+        # Swapped in together so a concurrent search sees one consistent snapshot
+        self._snapshot = (base, np.ones(len(names), dtype=bool), [])
+
+    def _update(self, changed):
+        """Take changed folders out of the trigram index; their files are searched linearly until a rebuild"""
+        base = self._snapshot[0]
+        stale = self._stale | changed
+        delta = [(name.lower(), rel, name) for rel in stale if rel in self.dirs for name in self.dirs[rel][2]]
+        if len(delta) > max(REBUILD_MIN_FILES, REBUILD_SHARE * len(base.names)):
+            self._build()
+            return
+        alive = ~np.isin(base.dir_of, [base.dir_index[rel] for rel in stale if rel in base.dir_index])
+        self._stale = stale
+        self._snapshot = (base, alive, delta)
+
+    def __len__(self):
+        _, alive, delta = self._snapshot
+        return int(alive.sum()) + len(delta)
+
+    def search(self, query, limit=20):
+        """Paths of files whose name contains `query` (case-insensitive), best first.
+
+        Ranking: exact name, then name without extension, then prefix, then
+        any substring, shorter and shallower paths first. When fewer than
+        `limit` names contain the query, names sharing most of its
+        trigrams (misspellings) fill the rest. A query with wildcards is a
+        glob pattern matched anywhere in the name, as glob("**/*query*") did.
+        """
+        self.refresh()
+        base, alive, delta = self._snapshot
+        q = query.lower().strip()
+        if any(c in q for c in WILDCARDS):
+            return self._glob(q, limit)
+        if not q:
+            found = [(None, base.dir_names[base.dir_of[i]], base.names[i]) for i in np.flatnonzero(alive)[:limit]]
+            return [self._path(item) for item in (found + delta)[:limit]]
+
+        codes = _trigrams(q.encode("utf-8", "surrogateescape"))
+        postings = []
+        for code in codes:
+            k = np.searchsorted(base.trigrams, code)
+            known = k < len(base.trigrams) and base.trigrams[k] == code
+            postings.append(base.ids[base.offsets[k]:base.offsets[k + 1]] if known else base.ids[:0])
+        if len(codes):
+            # Intersect shortest lists first and stop as soon as nothing is left
+            postings.sort(key=len)
+            candidates = postings[0]
+            for posting in postings[1:]:
+                if not len(candidates):
+                    break
+                candidates = np.intersect1d(candidates, posting, assume_unique=True)
+            candidates = candidates[np.argsort(base.position[candidates])]
+        else:
+            candidates = base.order  # one- or two-letter query: scan the names
+        candidates = candidates[alive[candidates]].tolist()
+
+        # Candidates come shortest and shallowest first, so of the names that start
+        # with / merely contain the query only the first `limit` can make the cut
+        lower = base.lower
+        found, prefixed = [], 0
+        for i in candidates:
+            name = lower[i]
+            if name.startswith(q):
+                if name == q or os.path.splitext(name)[0] == q:
+                    found.append(i)
+                elif prefixed < limit:
+                    found.append(i)
+                    prefixed += 1
+        if len(found) < limit:
+            inside = (i for i in candidates if q in lower[i] and not lower[i].startswith(q))
+            found += itertools.islice(inside, limit)
+
+        def rank(item):
+            name, rel, _ = item
+            tier = 0 if name == q else 1 if os.path.splitext(name)[0] == q else 2 if name.startswith(q) else 3
+            return tier, len(name), rel.count(os.sep)
+
+        matches = [(lower[i], base.dir_names[base.dir_of[i]], base.names[i]) for i in found]
+        hits = heapq.nsmallest(limit, matches + [item for item in delta if q in item[0]], key=rank)
+        if len(hits) < limit and len(codes) >= 2:
+            need = max(2, int(np.ceil(FUZZY_SHARE * len(codes))))
+            shared, counts = np.unique(np.concatenate(postings), return_counts=True)
+            keep = (counts >= need) & alive[shared]
+            fuzzy = [(-int(c), base.lower[i], base.dir_names[base.dir_of[i]], base.names[i])
+                     for i, c in zip(shared[keep], counts[keep])]
+            grams = {q[k:k + 3] for k in range(len(q) - 2)}
+            for name, rel, original in delta:
+                c = sum(g in name for g in grams)
+                if c >= need:
+                    fuzzy.append((-c, name, rel, original))
+            seen = set(hits)
+            ranked = heapq.nsmallest(limit, fuzzy, key=lambda f: (f[0], len(f[1]), f[2], f[3]))
+            hits += [f[1:] for f in ranked if f[1:] not in seen][:limit - len(hits)]
+        return [self._path(item) for item in hits]
+
+    def _glob(self, pattern, limit):
+        """Files whose lower-cased name matches *pattern*, shortest and shallowest first"""
+        match = re.compile(fnmatch.translate(f"*{pattern}*")).match
+        base, alive, delta = self._snapshot
+        lower = base.lower
+        found = itertools.islice((i for i in base.order.tolist() if alive[i] and match(lower[i])), limit)
+        matches = [(lower[i], base.dir_names[base.dir_of[i]], base.names[i]) for i in found]
+        matches += [item for item in delta if match(item[0])]
+        hits = heapq.nsmallest(limit, matches, key=lambda item: (len(item[0]), item[1].count(os.sep)))
+        return [self._path(item) for item in hits]
+
+    def paths(self):
+        """Every indexed file, refreshed first"""
+        self.refresh()
+        base, alive, delta = self._snapshot
+        found = [(None, base.dir_names[base.dir_of[i]], base.names[i]) for i in np.flatnonzero(alive)]
+        return [self._path(item) for item in found + delta]
+
+    def _path(self, item):
+        _, rel, name = item
+        return os.path.join(self.root, rel, name) if rel else os.path.join(self.root, name)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_file_index(root="."):
+    """Process-wide index for a root folder, created (from its saved state, if any) on first use"""
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = FileIndex(root)
+        return index
+
+
+def main(argv):
+    """python -m modules.tools.file_index <root> [query ...]"""
+    root = argv[0] if argv else "."
+    start = time.perf_counter()
+    index = get_file_index(root)
+    index.refresh(force=True)
+    print(f"📂 {index.root}: {len(index)} files in {len(index.dirs)} folders "
+          f"({index.rescanned} rescanned) in {(time.perf_counter() - start) * 1000:.0f} ms")
+    for query in argv[1:]:
+        start = time.perf_counter()
+        hits = index.search(query)
+        print(f"🔎 {query!r}: {len(hits)} hits in {(time.perf_counter() - start) * 1000:.1f} ms")
+        for path in hits:
+            print(f"   {path}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,7 +1,52 @@
 # modules/tools/file_tools.py
 import os
+import re
 import glob
+import fnmatch
+import heapq
+import itertools
+import mmap
+import multiprocessing
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+import numpy as np
+from .file_index import FILE_INDEX, IGNORED_DIRS, get_file_index
+
+SEARCH_WORKERS = int(os.environ.get("COMMANDLY_SEARCH_WORKERS", str(min(8, os.cpu_count() or 1))))
+SEARCH_MAX_FILE_MB = float(os.environ.get("COMMANDLY_SEARCH_MAX_FILE_MB", "4"))
+# Up to this many files are searched in-process; handing them to worker processes would cost more
+SEARCH_INLINE_FILES = 200
+SEARCH_PER_FILE = 5  # best hits kept per file
+SEARCH_SCAN_PER_FILE = 50  # matching lines looked at per file; the count becomes "N+" beyond
+SEARCH_LINE_CHARS = 200
+# Never text; skipped without being opened
+BINARY_SUFFIXES = {
+    ".pyc", ".pyo", ".so", ".dll", ".exe", ".bin", ".o", ".a", ".lib", ".class", ".jar", ".zip", ".gz",
+    ".tgz", ".bz2", ".xz", ".7z", ".rar", ".png", ".jpg", ".jpeg", ".gif", ".bmp", ".ico", ".webp",
+    ".pdf", ".mp3", ".wav", ".flac", ".ogg", ".mp4", ".mov", ".avi", ".ttf", ".woff", ".woff2",
+    ".sqlite3", ".db", ".npy", ".npz", ".pkl",
+}
+# Lines that define something rank above lines that merely use it
+DEFINITION = re.compile(r"^\s*(?:async\s+def|def|class|function|func|fn|const|let|var|interface|struct|enum|type)\b")
+
+LIST_PAGE_SIZE = int(os.environ.get("COMMANDLY_LIST_PAGE_SIZE", "200"))
+LIST_CACHE_S = float(os.environ.get("COMMANDLY_LIST_CACHE_S", "5"))
+LIST_CACHE_DIRS = 32
+LIST_SORTS = ("name", "size", "mtime")
+READ_MAX_LINES = int(os.environ.get("COMMANDLY_READ_MAX_LINES", "400"))
+READ_LINE_CHARS = 500  # longer lines (minified code, data) are cut when shown to the agent
+LINE_INDEX_STEP = 1024  # a LineIndex checkpoint every this many lines
+LINE_INDEX_FILES = 16
+INDEX_CHUNK = 1 << 24  # bytes scanned per numpy pass while indexing
+LINE_COUNT_MAX_BYTES = INDEX_CHUNK  # files up to this size are indexed (lines counted) on any read
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+SEARCH_BLOCK = re.compile(r"<<<<<<< SEARCH\n(.*?)^=======\n(.*?)^>>>>>>> REPLACE", re.DOTALL | re.MULTILINE)
 
 def _inside_sandbox(p: Path) -> bool:
     try:
@@ -16,27 +61,330 @@ def norm(path: str) -> Path:
         raise PermissionError(f"Path outside sandbox: {p}")
     return p
 
-def list_dir(path=".", show_hidden=False):
-    """List directory contents"""
+class _Listing:
+    """One os.scandir pass over a folder, plus the sorted views asked of it so far"""
+
+    def __init__(self, path, mtime_ns):
+        self.mtime_ns = mtime_ns
+        self.loaded = time.monotonic()
+        self.names, self.dirs, self.entries = [], [], []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()  # from d_type; no stat on most filesystems
+                except OSError:
+                    is_dir = False
+                self.names.append(entry.name)
+                self.dirs.append(is_dir)
+                self.entries.append(entry)
+        self.lower = [name.lower() for name in self.names]
+        self.stats = None
+        self.views = {}
+
+    def stat(self):
+        """(size, mtime_ns) per entry: free on Windows, where the scan returns them, one stat each elsewhere"""
+        if self.stats is None:
+            stats = []
+            for entry, is_dir in zip(self.entries, self.dirs):
+                try:
+                    st = entry.stat()
+                    stats.append((0 if is_dir else st.st_size, st.st_mtime_ns))
+                except OSError:
+                    stats.append((0, 0))
+            self.stats = stats
+        return self.stats
+
+    def ranks(self, sort):
+        """First sort key per entry: folders first by name, largest or newest first by size or mtime"""
+        if sort == "name":
+            return [int(not is_dir) for is_dir in self.dirs]
+        column = 0 if sort == "size" else 1
+        return [-stat[column] for stat in self.stat()]
+
+    def view(self, sort, show_hidden, pattern, kind):
+        """(ranks, entry indexes in ascending (rank, lower-case name, name) order) of the matching entries"""
+        key = (sort, show_hidden, pattern.lower(), kind)
+        if key not in self.views:
+            order = range(len(self.names))
+            if not show_hidden:
+                order = [i for i in order if not self.names[i].startswith('.')]
+            if kind:
+                order = [i for i in order if self.dirs[i] == (kind == "dir")]
+            if pattern:
+                match = re.compile(fnmatch.translate(key[2])).match
+                order = [i for i in order if match(self.lower[i])]
+            # Stable sorts from the last key to the first; much cheaper than building a tuple per entry
+            ranks = self.ranks(sort)
+            order = sorted(order, key=self.names.__getitem__)
+            order.sort(key=self.lower.__getitem__)
+            order.sort(key=ranks.__getitem__)
+            self.views[key] = (ranks, order)
+        return self.views[key]
+
+    def position(self, ranks, order, after, right):
+        """bisect for the sort key `after` in a view (bisect has no key= before Python 3.10)"""
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = order[mid]
+            key = (ranks[i], self.lower[i], self.names[i])
+            if (after < key) if right else (after <= key):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+_listings = OrderedDict()
+_listings_lock = threading.Lock()
+
+def _listing(path):
+    """The folder's _Listing, rescanned once it is LIST_CACHE_S old or the folder's mtime changed"""
+    key = os.path.abspath(path)
+    mtime_ns = os.stat(key).st_mtime_ns
+    with _listings_lock:
+        listing = _listings.get(key)
+        if listing is not None and listing.mtime_ns == mtime_ns and time.monotonic() - listing.loaded < LIST_CACHE_S:
+            _listings.move_to_end(key)
+            return listing
+    listing = _Listing(key, mtime_ns)
+    with _listings_lock:
+        _listings[key] = listing
+        while len(_listings) > LIST_CACHE_DIRS:
+            _listings.popitem(last=False)
+    return listing
+
+def _size_text(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def list_dir(path=".", show_hidden=False, sort="name", reverse=False, pattern="", kind="", details=False,
+             limit=None, cursor=None):
+    """List directory contents, folders first.
+
+    sort="size" or "mtime" puts the largest or newest first (reverse flips
+    any order); pattern is a glob on names and kind "file" or "dir". details
+    adds size and mtime columns. After `limit` entries a last line gives the
+    cursor to pass for the next page. Listings come from a short-lived cache
+    that a change to the folder's mtime invalidates.
+    """
     try:
+        if sort not in LIST_SORTS:
+            return [f"Error: sort must be one of {', '.join(LIST_SORTS)}"]
+        listing = _listing(path)
+        ranks, order = listing.view(sort, show_hidden, pattern, kind)
+        position = len(order) if reverse else 0
+        if cursor:
+            try:
+                rank, _, name = str(cursor).partition("/")
+                after = (int(rank), name.lower(), name)
+            except ValueError:
+                return [f"Error: invalid cursor {cursor!r}"]
+            position = listing.position(ranks, order, after, right=not reverse)
+        if reverse:
+            end = 0 if limit is None else max(position - int(limit), 0)
+            page, remaining = range(position - 1, end - 1, -1), end
+        else:
+            end = len(order) if limit is None else min(position + int(limit), len(order))
+            page, remaining = range(position, end), len(order) - end
+        stats = listing.stat() if details else None
         items = []
-        for item in os.listdir(path):
-            if not show_hidden and item.startswith('.'):
-                continue
-            full_path = os.path.join(path, item)
-            if os.path.isdir(full_path):
-                items.append(f"📁 {item}/")
-            else:
-                items.append(f"📄 {item}")
+        for k in page:
+            i = order[k]
+            name = listing.names[i]
+            item = f"📁 {name}/" if listing.dirs[i] else f"📄 {name}"
+            if details:
+                size, mtime_ns = stats[i]
+                modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime_ns / 1e9))
+                item = f"{item:<42} {'-' if listing.dirs[i] else _size_text(size):>9}  {modified}"
+            items.append(item)
+        if remaining and page:
+            last = order[page[-1]]
+            items.append(f"… {remaining:,} more; pass cursor {ranks[last]}/{listing.names[last]} for the next page")
         return items
     except Exception as e:
         return [f"Error: {str(e)}"]
 
-def read_text(path):
-    """Read text file contents"""
+class LineIndex:
+    """Where every LINE_INDEX_STEP-th line of a file starts, found in one pass over an mmap.
+
+    Line n is then reached by jumping to the checkpoint before it and skipping
+    at most LINE_INDEX_STEP - 1 lines, so a range costs O(range) however deep
+    into the file it is. A file that only grew (a log) is indexed from where
+    the last pass stopped.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.ident = None
+        self.size = 0
+        self.mtime_ns = None
+        self.newlines = 0
+        self.sample = b""  # the bytes before self.size, to tell an append from a rewrite
+        self.checkpoints = np.zeros(1, dtype=np.int64)  # checkpoints[k]: offset of line k * LINE_INDEX_STEP
+
+    def current(self, mm, st):
+        return (st.st_dev, st.st_ino) == self.ident and len(mm) == self.size and st.st_mtime_ns == self.mtime_ns
+
+    def appended(self, mm, st):
+        """Whether the file is the one indexed, unchanged or only grown since: a refresh reads just the new bytes"""
+        return ((st.st_dev, st.st_ino) == self.ident and len(mm) >= self.size
+                and mm[self.size - len(self.sample):self.size] == self.sample)
+
+    def refresh(self, mm, st):
+        """Bring the index up to date with the mapped file"""
+        with self.lock:
+            if self.current(mm, st):
+                return
+            size = len(mm)
+            if ((st.st_dev, st.st_ino) != self.ident or size < self.size
+                    or mm[self.size - len(self.sample):self.size] != self.sample):
+                self._reset()
+            parts, newlines = [self.checkpoints], self.newlines
+            for lo in range(self.size, size, INDEX_CHUNK):
+                chunk = np.frombuffer(mm, dtype=np.uint8, count=min(INDEX_CHUNK, size - lo), offset=lo)
+                ends = np.flatnonzero(chunk == 10)
+                del chunk  # the mmap can't close while a view of it exists
+                # Newline number newlines + 1 + i ends the line before a checkpoint if it's a multiple of the step
+                parts.append(ends[(-newlines - 1) % LINE_INDEX_STEP::LINE_INDEX_STEP] + (lo + 1))
+                newlines += len(ends)
+            self.checkpoints, self.newlines = np.concatenate(parts), newlines
+            self.ident, self.size, self.mtime_ns = (st.st_dev, st.st_ino), size, st.st_mtime_ns
+            self.sample = mm[max(0, size - 64):size]
+
+    @property
+    def lines(self):
+        return self.newlines + (1 if self.size and not self.sample.endswith(b"\n") else 0)
+
+    def offset(self, mm, line):
+        """Byte offset where 0-based `line` starts (the file size past the last line)"""
+        k = min(line // LINE_INDEX_STEP, len(self.checkpoints) - 1)
+        return _skip_lines(mm, int(self.checkpoints[k]), line - k * LINE_INDEX_STEP)
+
+_line_indexes = OrderedDict()
+_line_indexes_lock = threading.Lock()
+
+def _line_index(path):
+    """The LineIndex kept for a path; only the most recently read LINE_INDEX_FILES are kept"""
+    key = os.path.abspath(path)
+    with _line_indexes_lock:
+        index = _line_indexes.pop(key, None) or LineIndex()
+        _line_indexes[key] = index
+        while len(_line_indexes) > LINE_INDEX_FILES:
+            _line_indexes.popitem(last=False)
+        return index
+
+def _skip_lines(mm, pos, count):
+    for _ in range(count):
+        end = mm.find(b"\n", pos)
+        if end < 0:
+            return len(mm)
+        pos = end + 1
+    return pos
+
+def _tail_offset(mm, count):
+    """Where the last `count` lines start, found by scanning back from the end"""
+    pos = len(mm) - 1 if mm[len(mm) - 1:] == b"\n" else len(mm)
+    for _ in range(count):
+        pos = mm.rfind(b"\n", 0, pos)
+        if pos < 0:
+            return 0
+    return min(pos + 1, len(mm))
+
+def _read_mapped(path, start=None, end=None, head=None, tail=None, byte_start=None, byte_end=None, stats=False):
+    """(text, first line number or None, size, line count or None) for part of a file, read through mmap.
+
+    Lines are only counted when `stats` asks for it, the file is small, or
+    it is already indexed; a tail of a large unindexed file is found from
+    the end and comes back without a first line number.
+    """
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        if st.st_size == 0:
+            return "", 1, 0, 0  # empty files can't be mapped
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            index = _line_index(path)
+            size, first = len(mm), None
+            if stats or size <= LINE_COUNT_MAX_BYTES or index.appended(mm, st):
+                index.refresh(mm, st)
+            if byte_start is not None or byte_end is not None:
+                lo = min(max(int(byte_start or 0), 0), size)
+                hi = size if byte_end is None else min(max(int(byte_end), lo), size)
+                data = mm[lo:hi]
+            elif tail is not None and not index.current(mm, st):
+                data = mm[_tail_offset(mm, int(tail)):]  # line numbers unknown without counting every line
+            else:
+                if tail is not None:
+                    first, count = max(index.lines - int(tail), 0), None
+                else:
+                    first = max(int(start or 1) - 1, 0)
+                    count = int(head) if head is not None else None if end is None else max(int(end) - first, 0)
+                if first >= LINE_INDEX_STEP:
+                    index.refresh(mm, st)
+                    lo = index.offset(mm, first)
+                else:
+                    lo = _skip_lines(mm, 0, first)  # near the top; no need to index the whole file
+                data = mm[lo:] if count is None else mm[lo:_skip_lines(mm, lo, count)]
+                first += 1
+            lines = index.lines if index.current(mm, st) else None
+    return data.decode('utf-8', errors='replace').replace("\r\n", "\n"), first, size, lines
+
+def read_text(path, start=None, end=None, head=None, tail=None, byte_start=None, byte_end=None):
+    """Read text file contents, or only part of them.
+
+    start/end select lines (1-based, inclusive), head/tail the first/last n
+    lines and byte_start/byte_end a byte range (end exclusive). Partial reads
+    go through mmap and a cached LineIndex, so the rest of the file is never
+    loaded; a byte range that splits a character gets U+FFFD in its place.
+    """
+    try:
+        if all(v is None for v in (start, end, head, tail, byte_start, byte_end)):
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        return _read_mapped(path, start, end, head, tail, byte_start, byte_end)[0]
+    except Exception as e:
+        return f"Error reading file: {str(e)}"
+
+def text_stats(path):
+    """{"size": bytes, "lines": line count} of a file; counting lines indexes it for later ranged reads"""
+    try:
+        _, _, size, lines = _read_mapped(path, head=0, stats=True)
+        return {"size": size, "lines": lines}
+    except Exception as e:
+        return f"Error reading file: {str(e)}"
+
+def read_numbered(path, start=None, end=None, tail=None, max_lines=None):
+    """Lines numbered for edit_range, at most `max_lines` (READ_MAX_LINES) of them.
+
+    A partial view starts with a line saying which lines of how many are shown;
+    the total is left out for a large file that hasn't been indexed, and the
+    tail of one is shown without line numbers rather than counting them all.
+    """
+    max_lines = max_lines or READ_MAX_LINES
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
+        if tail is not None:
+            tail = min(int(tail), max_lines)
+        elif end is None or int(end) - int(start or 1) >= max_lines:
+            end = int(start or 1) + max_lines - 1
+        text, first, size, lines = _read_mapped(path, start, end, tail=tail)
+        rows = text.split("\n")
+        if rows[-1] == "":
+            rows.pop()  # the newline ending the last line shown
+        rows = [row if len(row) <= READ_LINE_CHARS else row[:READ_LINE_CHARS] + ' …' for row in rows]
+        if first is None:
+            return "\n".join([f"[{path}: last {len(rows)} lines ({size:,} bytes); "
+                               f"pass start/end to read numbered lines]"] + [f"   …| {row}" for row in rows])
+        out = [f"{n:4d}| {row}" for n, row in enumerate(rows, first)]
+        if first > 1 or lines is None or first + len(rows) - 1 < lines:
+            shown = f"lines {first}-{first + len(rows) - 1}" if rows else "no lines"
+            total = "" if lines is None else f" of {lines}"
+            out.insert(0, f"[{path}: {shown}{total} ({size:,} bytes); "
+                          f"pass start/end or tail to read other lines]")
+        return "\n".join(out)
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
@@ -58,13 +406,407 @@ def ensure_dirs(path):
     except Exception as e:
         return f"Error creating directory: {str(e)}"
 
-def find_files(root=".", query=""):
-    """Find files matching query"""
+def find_files(root=".", query="", limit=20):
+    """Find files whose name contains query (or matches it, with wildcards), best matches first (see file_index.py)"""
     try:
+        if FILE_INDEX:
+            return get_file_index(root).search(query, limit)
         matches = []
-        for file_path in glob.glob(f"{root}/**/*{query}*", recursive=True):
+        for file_path in glob.iglob(f"{root}/**/*{query}*", recursive=True):
             if os.path.isfile(file_path):
                 matches.append(file_path)
-        return matches[:20]  # Limit results
+                if len(matches) == limit:
+                    break
+        return matches
+    except Exception as e:
+        return [f"Error: {str(e)}"]
+
+def _gitignore(root):
+    """(name regex, path regex) from the root .gitignore; negations are not supported"""
+    try:
+        with open(os.path.join(root, ".gitignore"), encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+    except OSError:
+        return None, None
+    names, paths = [], []
+    for line in lines:
+        if not line or line.startswith(("#", "!")):
+            continue
+        pattern = line.rstrip("/")
+        if "/" in pattern:  # anchored at the root
+            paths.append(fnmatch.translate(pattern.lstrip("/")))
+            paths.append(fnmatch.translate(pattern.lstrip("/") + "/*"))
+        else:
+            names.append(fnmatch.translate(pattern))
+    compile_any = lambda patterns: re.compile("|".join(patterns)) if patterns else None
+    return compile_any(names), compile_any(paths)
+
+def _searchable_files(root, include=""):
+    """Files below root worth opening: not hidden, ignored, binary by extension or excluded by `include`"""
+    if FILE_INDEX:
+        files = get_file_index(root).paths()
+    else:
+        files = []
+        for folder, subdirs, names in os.walk(root):
+            subdirs[:] = [d for d in subdirs if not d.startswith(".") and d not in IGNORED_DIRS]
+            files.extend(os.path.join(folder, n) for n in names if not n.startswith("."))
+    names, paths = _gitignore(root)
+    base = os.path.abspath(root)
+    ignored_dirs = {}
+
+    def ignored_dir(folder):
+        if folder not in ignored_dirs:
+            rel = os.path.relpath(folder, base).replace(os.sep, "/")
+            parent = os.path.dirname(folder)
+            ignored_dirs[folder] = rel != "." and (
+                (parent != folder and ignored_dir(parent))
+                or bool(names and names.match(os.path.basename(folder)))
+                or bool(paths and paths.match(rel)))
+        return ignored_dirs[folder]
+
+    keep = []
+    for path in files:
+        name = os.path.basename(path)
+        if os.path.splitext(name)[1].lower() in BINARY_SUFFIXES:
+            continue
+        if include and not fnmatch.fnmatch(name, include):
+            continue
+        if names is not None or paths is not None:
+            full = os.path.abspath(path)
+            if ((names and names.match(name)) or (paths and paths.match(os.path.relpath(full, base).replace(os.sep, "/")))
+                    or ignored_dir(os.path.dirname(full))):
+                continue
+        keep.append(path)
+    return keep
+
+def _search_chunk(paths, source, flags, needle, fold, literal, context, max_bytes, limit):
+    """Search a batch of files; (best hits, files matched, lines matched, whether any file was cut short).
+
+    A hit is (score, path, line number, [(n, line), ...] around it). Runs in
+    a worker process, so everything it needs comes in as arguments. `literal`
+    is the pattern unless it is a regex, lower-cased when `fold`.
+    """
+    rx = re.compile(source, flags)
+    name_hint = literal.lower() if literal else None
+    hits, files_matched, lines_matched, capped = [], 0, 0, False
+    for path in paths:
+        try:
+            if os.path.getsize(path) > max_bytes:
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        if b"\0" in data[:8192]:
+            continue  # binary
+        if needle is not None and needle not in (data.lower() if fold else data):
+            continue  # a literal can be ruled out on the raw bytes
+        text = data.decode("utf-8", "replace")
+        bonus = 1 if name_hint and name_hint in os.path.basename(path).lower() else 0
+        lines, found, line_no, pos = None, [], 1, 0
+        for m_start, m_end in _first_per_line(text, rx, literal if needle is not None else None, fold):
+            line_no += text.count("\n", pos, m_start)
+            pos = m_start
+            if len(found) == SEARCH_SCAN_PER_FILE:
+                capped = True
+                break
+            if lines is None:
+                lines = text.split("\n")
+            line = lines[line_no - 1]
+            start = m_start - (text.rfind("\n", 0, m_start) + 1)
+            end = start + m_end - m_start
+            whole_word = (start == 0 or not (line[start - 1].isalnum() or line[start - 1] == "_")) and \
+                (end >= len(line) or not (line[end].isalnum() or line[end] == "_"))
+            found.append((1 + 2 * whole_word + 3 * bool(DEFINITION.match(line)) + bonus, line_no))
+        if not found:
+            continue
+        files_matched += 1
+        lines_matched += len(found)
+        count = len(lines) - (lines[-1] == "")  # a trailing newline doesn't start another line
+        for score, n in sorted(found, key=lambda f: -f[0])[:SEARCH_PER_FILE]:
+            first, last = max(1, n - context), max(n, min(count, n + context))
+            snippet = [(k, lines[k - 1].rstrip("\r")[:SEARCH_LINE_CHARS]) for k in range(first, last + 1)]
+            hits.append((score, path, n, snippet))
+        if len(hits) > 4 * limit:
+            hits = heapq.nsmallest(limit, hits, key=_hit_rank)
+    return heapq.nsmallest(limit, hits, key=_hit_rank), files_matched, lines_matched, capped
+
+def _first_per_line(text, rx, literal, fold):
+    """(start, end) of the first match on each matching line.
+
+    A literal is found with str.find, skipping to the next line after each
+    hit, which is several times faster than a case-insensitive regex.
+    """
+    hay = text.lower() if literal is not None and fold else text
+    if literal is None or len(hay) != len(text):
+        last_line_start = -1
+        for m in rx.finditer(text):
+            line_start = text.rfind("\n", 0, m.start()) + 1
+            if line_start != last_line_start:
+                last_line_start = line_start
+                yield m.start(), m.end()
+        return
+    i = hay.find(literal)
+    while i >= 0:
+        yield i, i + len(literal)
+        next_line = hay.find("\n", i + len(literal)) + 1
+        if not next_line:
+            return
+        i = hay.find(literal, next_line)
+
+def _hit_rank(hit):
+    return -hit[0], hit[1], hit[2]
+
+_search_pool = None
+_search_pool_lock = threading.Lock()
+
+def get_search_pool():
+    """Worker processes for search_content, started on first use and kept for later searches"""
+    global _search_pool
+    with _search_pool_lock:
+        if _search_pool is None:
+            # spawn everywhere: forking a process that runs audio and UI threads is unsafe
+            _search_pool = ProcessPoolExecutor(max_workers=SEARCH_WORKERS,
+                                               mp_context=multiprocessing.get_context("spawn"))
+        return _search_pool
+
+def search_content(pattern, root=".", regex=False, include="", case_sensitive=False, context=2, limit=30):
+    """Lines matching `pattern` in the text files below `root`, best first, with context lines.
+
+    Files are searched in parallel worker processes, each returning only
+    its best `limit` hits. Definitions, whole-word matches and files named
+    after the pattern rank first; at most SEARCH_PER_FILE hits come from
+    one file.
+    """
+    try:
+        if not pattern:
+            return "Error: empty search pattern"
+        flags = 0 if case_sensitive else re.IGNORECASE
+        source = pattern if regex else re.escape(pattern)
+        try:
+            re.compile(source, flags)
+        except re.error as e:
+            return f"Error: invalid regular expression {pattern!r}: {e}"
+        needle = None
+        if not regex and (case_sensitive or pattern.isascii()):
+            needle = (pattern if case_sensitive else pattern.lower()).encode("utf-8")
+        files = _searchable_files(root, include)
+        limit = int(limit)
+        literal = None if regex else pattern if case_sensitive else pattern.lower()
+        args = (source, flags, needle, not case_sensitive, literal,
+                max(0, int(context)), int(SEARCH_MAX_FILE_MB * 1024 * 1024), limit)
+        if len(files) <= SEARCH_INLINE_FILES or SEARCH_WORKERS < 2:
+            chunks = [_search_chunk(files, *args)]
+        else:
+            size = max(32, len(files) // (SEARCH_WORKERS * 8))
+            batches = [files[i:i + size] for i in range(0, len(files), size)]
+            try:
+                chunks = list(get_search_pool().map(_search_chunk, batches, *[itertools.repeat(a) for a in args]))
+            except BrokenProcessPool:
+                global _search_pool
+                _search_pool = None
+                chunks = [_search_chunk(files, *args)]
+        shown = heapq.nsmallest(limit, (hit for chunk in chunks for hit in chunk[0]), key=_hit_rank)
+        if not shown:
+            return f"No matches for {pattern!r} in {len(files)} files below {root}"
+        files_matched = sum(chunk[1] for chunk in chunks)
+        lines_matched = sum(chunk[2] for chunk in chunks)
+        more = "+" if any(chunk[3] for chunk in chunks) else ""
+        summary = f"{lines_matched}{more} matching lines in {files_matched} of {len(files)} files"
+        if lines_matched > len(shown):
+            summary += f"; showing the best {len(shown)}"
+        base = os.path.abspath(root)
+        out = [summary]
+        for score, path, n, snippet in shown:
+            out.append(f"{os.path.relpath(os.path.abspath(path), base)}:{n}")
+            out.extend(f"{'>' if k == n else ' '}{k:4d}| {line}" for k, line in snippet)
+        return "\n".join(out)
+    except Exception as e:
+        return f"Error searching files: {str(e)}"
+
+class PatchError(ValueError):
+    """A patch that does not apply cleanly; the file is left untouched"""
+
+def _read_lines(path):
+    """File lines without line endings, plus the line ending the file uses"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        text = f.read()
+    eol = "\r\n" if "\r\n" in text else "\n"
+    text = text.replace("\r\n", "\n")
+    lines = text.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()  # a trailing newline doesn't start another line
+    return lines, eol, text.endswith("\n") or not text
+
+def _write_atomic(path, text):
+    """Write through a temporary file in the same folder, then swap it in"""
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=folder)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        if os.path.exists(path):
+            os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def _finish_edit(path, lines, eol, trailing_newline):
+    """Validate the edited lines and write them; Python files must still compile"""
+    text = "\n".join(lines) + ("\n" if trailing_newline and lines else "")
+    if path.endswith(".py"):
+        try:
+            compile(text, path, "exec")
+        except SyntaxError as e:
+            raise PatchError(f"result does not compile: line {e.lineno}: {e.msg}")
+    _write_atomic(path, text.replace("\n", eol))
+
+def _find_block(lines, block, hint):
+    """Start index of `block` in `lines` closest to `hint`, or None.
+
+    Exact matches win; otherwise trailing whitespace is ignored, since
+    models often drop or add it.
+    """
+    if not block:
+        return min(max(hint, 0), len(lines))
+    for strip in (False, True):
+        first = block[0].rstrip() if strip else block[0]
+        starts = []
+        for i in range(len(lines) - len(block) + 1):
+            if (lines[i].rstrip() if strip else lines[i]) != first:
+                continue
+            window = lines[i:i + len(block)]
+            if strip:
+                window, wanted = [l.rstrip() for l in window], [l.rstrip() for l in block]
+            else:
+                wanted = block
+            if window == wanted:
+                starts.append(i)
+        if starts:
+            return min(starts, key=lambda i: abs(i - hint))
+    return None
+
+def _starts_file(patch_lines, i):
+    """Whether line i opens the next file's headers: a diff line, or ---/+++ right before a hunk.
+
+    Anywhere else in a hunk, "--- x" is the removed line "-- x".
+    """
+    following = patch_lines[i + 1:i + 3]
+    return patch_lines[i].startswith("diff ") or (
+        patch_lines[i].startswith("--- ") and len(following) == 2
+        and following[0].startswith("+++ ") and following[1].startswith("@@"))
+
+def _parse_unified(patch):
+    """Hunks of a unified diff as (old start hint, old lines, new lines)"""
+    hunks = []
+    current = None
+    patch_lines = patch.replace("\r\n", "\n").split("\n")
+    for i, line in enumerate(patch_lines):
+        if line.startswith("@@"):
+            match = HUNK_HEADER.match(line)
+            current = (int(match.group(1)) - 1 if match else -1, [], [])
+            hunks.append(current)
+        elif _starts_file(patch_lines, i):
+            current = None
+        elif current is None or line.startswith("\\"):
+            continue
+        elif line.startswith("-"):
+            current[1].append(line[1:])
+        elif line.startswith("+"):
+            current[2].append(line[1:])
+        else:
+            context = line[1:] if line.startswith(" ") else line  # blank context lines often lose their space
+            current[1].append(context)
+            current[2].append(context)
+    for _, old, new in hunks:  # the split leaves an empty context line after the last hunk
+        while old and new and old[-1] == new[-1] == "":
+            old.pop()
+            new.pop()
+    return hunks
+
+def _apply_unified(lines, patch):
+    hunks = _parse_unified(patch)
+    if not hunks:
+        raise PatchError("no @@ hunks found")
+    offset = 0  # how far earlier hunks moved the rest of the file
+    for n, (hint, old, new) in enumerate(hunks, 1):
+        start = _find_block(lines, old, hint + offset if hint >= 0 else 0)
+        if start is None:
+            raise PatchError(f"hunk {n} does not match the file: {(old or [''])[0].strip()[:60]!r}")
+        lines[start:start + len(old)] = new
+        offset = start + len(new) - (hint + len(old)) if hint >= 0 else offset
+    return len(hunks)
+
+def _apply_search_replace(lines, patch):
+    text = "\n".join(lines)
+    blocks = SEARCH_BLOCK.findall(patch.replace("\r\n", "\n") + "\n")
+    if not blocks:
+        raise PatchError("no SEARCH/REPLACE blocks found")
+    for n, (search, replace) in enumerate(blocks, 1):
+        search, replace = search.rstrip("\n"), replace.rstrip("\n")
+        count = text.count(search) if search else 0
+        if count == 0:
+            start = _find_block(text.split("\n"), search.split("\n"), 0) if search else None
+            if start is None:
+                raise PatchError(f"block {n}: SEARCH text not found")
+            current = text.split("\n")
+            current[start:start + len(search.split("\n"))] = replace.split("\n")
+            text = "\n".join(current)
+        elif count > 1:
+            raise PatchError(f"block {n}: SEARCH text matches {count} places; include more surrounding lines")
+        elif not replace and search + "\n" in text:
+            text = text.replace(search + "\n", "", 1)  # drop the emptied line too
+        else:
+            text = text.replace(search, replace, 1)
+    lines[:] = text.split("\n") if text else []
+    return len(blocks)
+
+def apply_patch(path, patch):
+    """Apply a unified diff or SEARCH/REPLACE blocks to a text file.
+
+    Every hunk must apply, and a .py result must compile, before anything
+    is written; the file is then replaced atomically. A unified diff
+    against a missing file creates it.
+    """
+    try:
+        if os.path.exists(path):
+            lines, eol, trailing = _read_lines(path)
+        elif "<<<<<<< SEARCH" in patch:
+            return f"Error: {path} does not exist"
+        else:
+            lines, eol, trailing = [], "\n", True
+        before = len(lines)
+        if "<<<<<<< SEARCH" in patch:
+            count, kind = _apply_search_replace(lines, patch), "block"
+        else:
+            count, kind = _apply_unified(lines, patch), "hunk"
+        _finish_edit(path, lines, eol, trailing)
+        return f"✅ Patched {path}: {count} {kind}{'s' if count != 1 else ''}, {before} -> {len(lines)} lines"
+    except PatchError as e:
+        return f"Error: patch not applied to {path}: {e}"
+    except Exception as e:
+        return f"Error patching file: {str(e)}"
+
+def edit_range(path, start, end, content):
+    """Replace lines start..end (1-based, inclusive) with `content`.
+
+    end = start - 1 inserts before line `start` without removing anything.
+    """
+    try:
+        lines, eol, trailing = _read_lines(path)
+        start, end = int(start), int(end)
+        if not (1 <= start <= len(lines) + 1 and start - 1 <= end <= len(lines)):
+            return f"Error: lines {start}-{end} are outside {path} ({len(lines)} lines)"
+        new = content.replace("\r\n", "\n").split("\n") if content else []
+        if new and new[-1] == "":
+            new.pop()
+        lines[start - 1:end] = new
+        _finish_edit(path, lines, eol, trailing)
+        return f"✅ Edited {path}: lines {start}-{end} replaced with {len(new)} lines"
+    except PatchError as e:
+        return f"Error: edit not applied to {path}: {e}"
     except Exception as e:
-        return [f"Error: {str(e)}"]
\ No newline at end of file
+        return f"Error editing file: {str(e)}"
@@ -0,0 +1,241 @@
+# modules/tools/job_runner.py
+import atexit
+import codecs
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+JOB_BUFFER_KB = int(os.environ.get("COMMANDLY_JOB_BUFFER_KB", "64"))  # per stream
+MAX_JOBS = int(os.environ.get("COMMANDLY_MAX_JOBS", "4"))  # running at the same time
+JOB_MAX_S = float(os.environ.get("COMMANDLY_JOB_MAX_S", "3600"))  # killed when running longer
+JOB_WAIT_MAX_S = 60  # longest wait_job the agent may ask for
+JOBS_KEPT = 20  # finished jobs remembered for poll_job
+READ_CHUNK = 65536
+# Own process group, so a shell and everything it started can be killed together
+PROCESS_GROUP = ({"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if sys.platform == "win32"
+                 else {"start_new_session": True})
+
+
+def kill_tree(proc):
+    """Kill a subprocess and everything it started (a shell's children hold its pipes open)"""
+    try:
+        if sys.platform == "win32":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)], capture_output=True)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        proc.kill()
+
+
+class OutputBuffer:
+    """One stream's text: the first `head` characters and a ring of the last `tail` ones"""
+
+    def __init__(self, head, tail):
+        self.head_limit, self.tail_limit = head, tail
+        self.head = []
+        self.head_len = 0
+        self.tail = deque()
+        self.tail_len = 0
+        self.total = 0  # characters written so far, kept or not
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            self.total += len(text)
+            room = self.head_limit - self.head_len
+            if room > 0:
+                self.head.append(text[:room])
+                self.head_len += len(self.head[-1])
+                text = text[room:]
+            if not text:
+                return
+            self.tail.append(text)
+            self.tail_len += len(text)
+            while self.tail_len - len(self.tail[0]) >= self.tail_limit:
+                self.tail_len -= len(self.tail.popleft())
+            if self.tail_len > self.tail_limit:
+                self.tail[0] = self.tail[0][self.tail_len - self.tail_limit:]
+                self.tail_len = self.tail_limit
+
+    def read(self, start=0):
+        """(text written from character `start` on, characters of it that were dropped, end offset)"""
+        with self.lock:
+            head, tail, total = "".join(self.head), "".join(self.tail), self.total
+        tail_start = total - len(tail)
+        text, dropped = head[start:], 0
+        start = max(start, len(head))
+        if start < tail_start:
+            dropped = tail_start - start
+            text += f"\n[… {dropped:,} characters dropped …]\n"
+            start = tail_start
+        return text + tail[start - tail_start:], dropped, total
+
+
+class Job:
+    """A running or finished shell command; see JobRunner.start"""
+
+    def __init__(self, job_id, command, cwd=None, max_s=JOB_MAX_S):
+        self.id, self.command = job_id, command
+        size = JOB_BUFFER_KB * 1024
+        self.stdout, self.stderr = OutputBuffer(size // 4, size - size // 4), OutputBuffer(size // 4, size - size // 4)
+        self.seen = {"stdout": 0, "stderr": 0}  # how far poll_job has shown each stream
+        self.started, self.ended = time.time(), None
+        self.returncode = None
+        self.killed = False
+        self.done = threading.Event()
+        self.proc = subprocess.Popen(command, shell=True, cwd=cwd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                     stderr=subprocess.PIPE, bufsize=0, **PROCESS_GROUP)
+        readers = [threading.Thread(target=self._pump, args=(self.proc.stdout, self.stdout), daemon=True),
+                   threading.Thread(target=self._pump, args=(self.proc.stderr, self.stderr), daemon=True)]
+        for reader in readers:
+            reader.start()
+        threading.Thread(target=self._watch, args=(readers, max_s), name=f"{job_id}-watch", daemon=True).start()
+
+    def _pump(self, stream, buffer):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with stream:
+            for chunk in iter(lambda: stream.read(READ_CHUNK), b""):
+                buffer.write(decoder.decode(chunk))
+        buffer.write(decoder.decode(b"", final=True))
+
+    def _watch(self, readers, max_s):
+        try:
+            self.proc.wait(timeout=max_s)
+        except subprocess.TimeoutExpired:
+            print(f"⏰ {self.id} ran longer than {max_s:g}s; killing it")
+            self.kill()
+            self.proc.wait()
+        for reader in readers:
+            reader.join(timeout=2)  # a detached grandchild may keep a pipe open
+        self.returncode, self.ended = self.proc.returncode, time.time()
+        self.done.set()
+
+    @property
+    def running(self):
+        return not self.done.is_set()
+
+    def wait(self, timeout=None):
+        """True once the job has ended, False if it is still running after `timeout` seconds"""
+        return self.done.wait(timeout)
+
+    def kill(self):
+        """Kill the job's process tree; False if it had already ended"""
+        if self.proc.poll() is not None:
+            return False
+        self.killed = True
+        kill_tree(self.proc)
+        return True
+
+    def status(self):
+        elapsed = (self.ended or time.time()) - self.started
+        state = "running" if self.running else "killed" if self.killed else f"exit code {self.returncode}"
+        return f"{self.id} [{state}, {elapsed:.0f}s]: {self.command}"
+
+    def output(self, new=False):
+        """Output and Errors sections; only what poll_job hasn't shown yet when `new`"""
+        text = ""
+        for label, name in (("Output", "stdout"), ("Errors", "stderr")):
+            part, _, end = getattr(self, name).read(self.seen[name] if new else 0)
+            if new:
+                self.seen[name] = end
+            if part:
+                text += f"{label}:\n{part}\n"
+        return text
+
+    def report(self):
+        """What execute_command returns for a finished job"""
+        return f"Exit code: {self.returncode}\n" + self.output()
+
+
+class JobRunner:
+    """Shell commands run as jobs with ids ("job1", "job2", ...).
+
+    Each job's stdout and stderr are read by their own threads as the
+    process writes them, into OutputBuffers of JOB_BUFFER_KB each, so a
+    long build or a log tail never holds more than that in memory. At most
+    `max_jobs` run at once; JOBS_KEPT finished ones are remembered.
+    """
+
+    def __init__(self, max_jobs=MAX_JOBS):
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def start(self, command, cwd=None, max_s=JOB_MAX_S):
+        with self.lock:
+            running = sum(job.running for job in self.jobs.values())
+            if running >= self.max_jobs:
+                raise RuntimeError(f"{running} jobs are already running; wait for or kill one first")
+            self.count += 1
+            job = Job(f"job{self.count}", command, cwd, max_s)
+            self.jobs[job.id] = job
+            finished = [key for key, old in self.jobs.items() if not old.running]
+            for key in finished[:max(0, len(finished) - JOBS_KEPT)]:
+                del self.jobs[key]
+        print(f"⚙️ Started {job.id}: {command}")
+        return job
+
+    def get(self, job_id):
+        """The job with this id ("job3" or just "3"), or None"""
+        job_id = str(job_id).strip()
+        with self.lock:
+            return self.jobs.get(job_id if job_id.startswith("job") else f"job{job_id}")
+
+    def list(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def kill_all(self):
+        for job in self.list():
+            job.kill()
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    """Process-wide job runner; its jobs are killed when Commandly exits"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+            atexit.register(_runner.kill_all)
+        return _runner
+
+
+# ---- agent tools ----------------------------------------------------------------
+
+def poll_job(job_id=""):
+    """A job's status and the output it produced since the last poll; every job's status without an id"""
+    if not job_id:
+        jobs = get_job_runner().list()
+        return "\n".join(job.status() for job in jobs) if jobs else "No jobs."
+    job = get_job_runner().get(job_id)
+    if job is None:
+        return f"❌ No job {job_id}"
+    return f"{job.status()}\n{job.output(new=True) or '(no new output)'}"
+
+
+def wait_job(job_id, timeout=30):
+    """Wait up to `timeout` seconds (at most JOB_WAIT_MAX_S) for a job to end, then poll it"""
+    job = get_job_runner().get(job_id)
+    if job is None:
+        return f"❌ No job {job_id}"
+    job.wait(min(max(float(timeout), 0), JOB_WAIT_MAX_S))
+    return poll_job(job.id)
+
+
+def kill_job(job_id):
+    job = get_job_runner().get(job_id)
+    if job is None:
+        return f"❌ No job {job_id}"
+    if not job.kill():
+        return f"ℹ️ {job.status()} had already ended"
+    job.wait(5)
+    return f"🛑 Killed {job.id}\n{job.output(new=True)}".rstrip("\n")
@@ -5,6 +5,34 @@ import webbrowser
 import sys
 from pathlib import Path
 import platform
+from .job_runner import get_job_runner
+
+# Command fragments execute_command refuses to run
+DANGEROUS_COMMANDS = ['rm -rf', 'del /f', 'format', 'shutdown', 'reboot']
+
+# Map app names to working Windows commands
+APP_COMMANDS = {
+    "word": "start winword",
+    "microsoft word": "start winword",
+    "winword": "start winword",
+    "excel": "start excel", 
+    "microsoft excel": "start excel",
+    "notepad": "start notepad",
+    "calculator": "start calc",
+    "calc": "start calc",
+    "chrome": "start chrome",
+    "firefox": "start firefox",
+    "browser": "start chrome",
+}
+
+def is_dangerous(command):
+    return any(danger in command.lower() for danger in DANGEROUS_COMMANDS)
+
+def app_command(app_name):
+    """Shell command that launches an application, or None on unsupported platforms"""
+    if platform.system() != "Windows":
+        return None
+    return APP_COMMANDS.get(app_name.lower(), f"start {app_name}")
 
 def open_program(program_name):
     """Open programs by name"""
@@ -76,23 +104,27 @@ def install_package(package_name):
     except Exception as e:
         return f"❌ Installation error: {str(e)}"
 
-def execute_command(command):
-    """Execute system commands (USE WITH CAUTION)"""
+def execute_command(command, timeout=30, background=False):
+    """Execute system commands (USE WITH CAUTION)
+
+    Runs as a job (see job_runner.py), so output is streamed into bounded
+    buffers and a command killed at its timeout still reports what it
+    printed. With background=True the job id comes back at once, for
+    poll_job, wait_job and kill_job.
+    """
     try:
         # Safety check - don't allow dangerous commands
-        dangerous_commands = ['rm -rf', 'del /f', 'format', 'shutdown', 'reboot']
-        if any(danger in command.lower() for danger in dangerous_commands):
+        if is_dangerous(command):
             return f"❌ Dangerous command blocked: {command}"
         
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=30)
-        output = f"Exit code: {result.returncode}\n"
-        if result.stdout:
-            output += f"Output:\n{result.stdout}\n"
-        if result.stderr:
-            output += f"Errors:\n{result.stderr}\n"
-        return output
-    except subprocess.TimeoutExpired:
-        return "❌ Command timed out (30s limit)"
+        job = get_job_runner().start(command)
+        if background:
+            return f"⏳ Started {job.id}: {command}\nCheck on it with poll_job, wait_job or kill_job."
+        if not job.wait(timeout):
+            job.kill()
+            job.wait(5)
+            return f"❌ Command timed out ({timeout:g}s limit)\n{job.report()}"
+        return job.report()
     except Exception as e:
         return f"❌ Command failed: {str(e)}"
 
@@ -129,26 +161,9 @@ def kill_process(process_name):
 def open_application(app_name):  # This should match what agent_core.py calls
     """Open an application using the most reliable method."""
     
-    if platform.system() == "Windows":
-        # Map app names to working commands
-        app_commands = {
-            "word": "start winword",
-            "microsoft word": "start winword",
-            "winword": "start winword",
-            "excel": "start excel", 
-            "microsoft excel": "start excel",
-            "notepad": "start notepad",
-            "calculator": "start calc",
-            "calc": "start calc",
-            "chrome": "start chrome",
-            "firefox": "start firefox",
-            "browser": "start chrome",
-        }
-        
-        # Get the command for this app
-        app_lower = app_name.lower()
-        command = app_commands.get(app_lower, f"start {app_name}")
-        
+    # Get the command for this app
+    command = app_command(app_name)
+    if command is not None:
         try:
             print(f"🚀 Executing: {command}")
             # GUI apps can take longer to start on some setups; use a slightly longer timeout
@@ -0,0 +1,151 @@
+# modules/tts_cache.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+CACHE_DIR = os.path.expanduser(os.environ.get("COMMANDLY_CACHE_DIR", os.path.join("~", ".commandly", "cache")))
+TTS_CACHE_MB = float(os.environ.get("COMMANDLY_TTS_CACHE_MB", "64"))
+TTS_MEMORY_MB = float(os.environ.get("COMMANDLY_TTS_MEMORY_MB", "8"))
+# Phrases synthesised at startup so their first use is already a cache hit
+WARM_PHRASES = [p.strip() for p in os.environ.get(
+    "COMMANDLY_TTS_WARM_PHRASES",
+    "Goodbye!|Done.|Task completed."
+).split("|") if p.strip()]
+
+
+def cache_key(text, voice, model, fmt="pcm"):
+    """Content address for a synthesised phrase"""
+    raw = "\0".join((model, voice, fmt, text.strip()))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Two-level (memory + disk) cache of synthesised speech with LRU eviction.
+
+    Entries live on disk as <sha256>.<fmt> files; a file's mtime is its
+    last-use time, so the LRU order survives restarts. The most recently
+    used entries are also kept in memory, bounded by `memory_bytes`.
+    """
+
+    def __init__(self, directory=None, max_bytes=None, memory_bytes=None):
+        self.directory = directory or os.path.join(CACHE_DIR, "tts")
+        self.max_bytes = int(TTS_CACHE_MB * 1024 * 1024) if max_bytes is None else max_bytes
+        self.memory_bytes = int(TTS_MEMORY_MB * 1024 * 1024) if memory_bytes is None else memory_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk = OrderedDict()  # filename -> size, least recently used first
+        self._disk_size = 0
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_file() and not entry.name.endswith(".tmp"):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, entry.name, st.st_size))
+        except OSError as e:
+            print(f"⚠️ TTS cache unavailable: {e}")
+            return
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_size += size
+
+    def _remember(self, name, data):
+        if len(data) > self.memory_bytes:
+            return
+        if name in self._memory:
+            self._memory_size -= len(self._memory.pop(name))
+        self._memory[name] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_size -= len(old)
+
+    def get(self, text, voice, model, fmt="pcm"):
+        """Return cached audio bytes or None"""
+        name = f"{cache_key(text, voice, model, fmt)}.{fmt}"
+        with self._lock:
+            data = self._memory.get(name)
+            if data is not None:
+                self._memory.move_to_end(name)
+                if name in self._disk:
+                    self._disk.move_to_end(name)
+                self.hits += 1
+                return data
+            if name not in self._disk:
+                self.misses += 1
+                return None
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._disk_size -= self._disk.pop(name, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            if name in self._disk:
+                self._disk.move_to_end(name)
+            self._remember(name, data)
+            self.hits += 1
+        return data
+
+    def put(self, text, voice, model, data, fmt="pcm"):
+        """Store audio for a phrase, evicting least recently used entries"""
+        if not data or len(data) > self.max_bytes:
+            return
+        name = f"{cache_key(text, voice, model, fmt)}.{fmt}"
+        path = os.path.join(self.directory, name)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"⚠️ Could not write TTS cache entry: {e}")
+            return
+        with self._lock:
+            self._disk_size -= self._disk.pop(name, 0)
+            self._disk[name] = len(data)
+            self._disk_size += len(data)
+            self._remember(name, data)
+            evicted = []
+            while self._disk_size > self.max_bytes and len(self._disk) > 1:
+                old, size = self._disk.popitem(last=False)
+                self._disk_size -= size
+                if old in self._memory:
+                    self._memory_size -= len(self._memory.pop(old))
+                evicted.append(old)
+        for old in evicted:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except OSError:
+                pass
+
+    def warm(self, phrases, voice, model, synthesize, fmt="pcm"):
+        """Synthesise any phrases that are not cached yet; returns how many were fetched"""
+        fetched = 0
+        for phrase in phrases:
+            if self.get(phrase, voice, model, fmt) is not None:
+                continue
+            try:
+                self.put(phrase, voice, model, b"".join(synthesize(phrase)), fmt)
+                fetched += 1
+            except Exception as e:
+                print(f"⚠️ TTS warm-up failed for '{phrase}': {e}")
+        return fetched
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._disk),
+                    "disk_bytes": self._disk_size, "memory_bytes": self._memory_size}
@@ -0,0 +1,93 @@
+# modules/tts_pipeline.py
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_DONE = object()
+
+
+class SpeechPipeline:
+    """Three overlapping stages: sentences in, synthesis ahead of playback, audio out.
+
+    `synthesize(text)` must yield audio byte chunks as they arrive from the
+    speech endpoint; `sink(chunk)` hands one chunk to the player. Up to
+    `lookahead` sentences are synthesised while earlier ones play, and each
+    chunk reaches the sink as soon as it arrives, in sentence order.
+    """
+
+    def __init__(self, synthesize, sink, lookahead=2):
+        self.synthesize = synthesize
+        self.sink = sink
+        self.lookahead = max(1, lookahead)
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def _synthesize_into(self, text, chunks):
+        try:
+            for chunk in self.synthesize(text):
+                if self._cancel.is_set():
+                    break
+                if chunk:
+                    chunks.put(chunk)
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(_DONE)
+
+    def _schedule(self, sentences, executor, pending):
+        """Producer: start synthesis for each sentence, at most `lookahead` ahead"""
+        try:
+            for sentence in sentences:
+                if self._cancel.is_set():
+                    break
+                chunks = queue.Queue()
+                executor.submit(self._synthesize_into, sentence, chunks)
+                pending.put(chunks)  # blocks while we are `lookahead` sentences ahead
+        except Exception as e:
+            failed = queue.Queue()
+            failed.put(e)
+            failed.put(_DONE)
+            pending.put(failed)
+        finally:
+            pending.put(_DONE)
+
+    def run(self, sentences):
+        """Speak an iterable of sentences; returns timing stats for the reply.
+
+        `sentences` may be a generator that is still being produced (for
+        example from a streaming chat completion).
+        """
+        started = time.perf_counter()
+        stats = {"sentences": 0, "bytes": 0, "time_to_first_audio": None, "errors": []}
+        pending = queue.Queue(maxsize=self.lookahead)
+        with ThreadPoolExecutor(max_workers=self.lookahead, thread_name_prefix="tts") as executor:
+            producer = threading.Thread(target=self._schedule, args=(sentences, executor, pending), daemon=True)
+            producer.start()
+            while True:
+                chunks = pending.get()
+                if chunks is _DONE:
+                    break
+                stats["sentences"] += 1
+                while True:
+                    chunk = chunks.get()
+                    if chunk is _DONE:
+                        break
+                    if isinstance(chunk, Exception):
+                        stats["errors"].append(chunk)
+                        continue
+                    if self._cancel.is_set():
+                        continue  # drain so the worker can finish
+                    if stats["time_to_first_audio"] is None:
+                        stats["time_to_first_audio"] = time.perf_counter() - started
+                    stats["bytes"] += len(chunk)
+                    self.sink(chunk)
+            producer.join()
+        stats["total_time"] = time.perf_counter() - started
+        return stats
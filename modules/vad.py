@@ -0,0 +1,183 @@
+# modules/vad.py
+import os
+import numpy as np
+
+# Endpointing defaults; override through the environment.
+THRESHOLD_DB = float(os.environ.get("COMMANDLY_VAD_THRESHOLD_DB", "6"))
+HANGOVER_MS = int(os.environ.get("COMMANDLY_VAD_HANGOVER_MS", "600"))
+PREROLL_MS = int(os.environ.get("COMMANDLY_VAD_PREROLL_MS", "300"))
+
+START, PAUSE, END = "start", "pause", "end"
+
+
+def frame_features(samples, frame_len):
+    """Per-frame energy (dBFS) and zero-crossing rate for every complete frame.
+
+    Frames are taken as a (n_frames, frame_len) view so both features are
+    computed for the whole block in a couple of NumPy passes.
+    """
+    samples = np.asarray(samples)
+    n = len(samples) // frame_len
+    if n == 0:
+        return np.zeros(0), np.zeros(0)
+    frames = samples[:n * frame_len].reshape(n, frame_len).astype(np.float32) / 32768.0
+    energy_db = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / float(frame_len - 1)
+    return energy_db, zcr
+
+
+class VoiceActivityDetector:
+    """Energy/ZCR voice activity detector with an adaptive noise floor.
+
+    Feed it consecutive blocks of int16 samples with `push`; it returns
+    (START, index) when speech begins and (END, index) when the utterance
+    has ended, where indices are absolute sample positions in the stream.
+    A shorter gap inside an utterance yields (PAUSE, index) at the middle of
+    the gap, a safe place to cut the utterance into segments.
+    START already includes the pre-roll, END includes the trailing pad, so
+    callers can slice the utterance straight out of their buffer.
+    """
+
+    def __init__(self, rate=44100, frame_ms=20, threshold_db=THRESHOLD_DB, hangover_ms=HANGOVER_MS,
+                 preroll_ms=PREROLL_MS, tail_ms=150, min_speech_ms=100, max_utterance_s=15.0,
+                 min_level_db=-60.0, zcr_max=0.45, floor_tau_s=0.4, speech_floor_tau_s=6.0,
+                 warmup_ms=200, pause_ms=250):
+        self.rate = rate
+        self.frame_len = int(rate * frame_ms / 1000)
+        self.threshold_db = threshold_db
+        self.hangover_frames = max(1, int(hangover_ms / frame_ms))
+        self.preroll_samples = int(rate * preroll_ms / 1000)
+        self.tail_samples = int(rate * min(tail_ms, hangover_ms) / 1000)
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.max_utterance_samples = int(rate * max_utterance_s)
+        self.warmup_frames = max(1, int(warmup_ms / frame_ms))
+        self.pause_frames = max(1, int(pause_ms / frame_ms))
+        self.min_level_db = min_level_db
+        self.zcr_max = zcr_max
+        # Per-frame smoothing factors for the noise floor: quick while idle,
+        # slow during speech so a steady noise source is eventually absorbed.
+        self.floor_alpha = 1.0 - np.exp(-frame_ms / 1000.0 / floor_tau_s)
+        self.speech_floor_alpha = 1.0 - np.exp(-frame_ms / 1000.0 / speech_floor_tau_s)
+        self.noise_floor = None
+        self._warmup = []
+        self.reset()
+
+    def reset(self, position=0):
+        """Start a new utterance at absolute sample `position` (the noise floor is kept)"""
+        self.position = int(position)
+        self._pending = np.zeros(0, dtype=np.int16)
+        self.in_speech = False
+        self.speech_start = None
+        self._run = 0
+        self._run_start = None
+        self._silence = 0
+        self._last_speech_end = None
+
+    def calibrate(self, samples):
+        """Seed the noise floor from audio known to be (mostly) background"""
+        energy, _ = frame_features(samples, self.frame_len)
+        if len(energy):
+            self.noise_floor = float(np.percentile(energy, 20))
+
+    def is_speech(self, energy_db, zcr):
+        """Vectorised frame decision against the current noise floor"""
+        floor = self.noise_floor if self.noise_floor is not None else self.min_level_db
+        loud = (energy_db > floor + self.threshold_db) & (energy_db > self.min_level_db)
+        # Broadband hiss has a high crossing rate; let it through only when clearly loud
+        return loud & ((zcr < self.zcr_max) | (energy_db > floor + 2 * self.threshold_db))
+
+    def push(self, samples):
+        """Consume the next block of samples and return any START/END events"""
+        samples = np.asarray(samples, dtype=np.int16)
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        energy, zcr = frame_features(samples, self.frame_len)
+        used = len(energy) * self.frame_len
+        self._pending = samples[used:]
+
+        events = []
+        base = self.position
+        self.position += used
+        if not len(energy):
+            return events
+
+        # Features and the first-pass decision are computed for the whole
+        # block; only the cheap state machine walks frame by frame.
+        speech = self.is_speech(energy, zcr)
+        for i in range(len(energy)):
+            frame_start = base + i * self.frame_len
+            frame_end = frame_start + self.frame_len
+            e = float(energy[i])
+            if self.noise_floor is None:
+                # Without calibration the first frames only estimate the floor
+                self._warmup.append(e)
+                if len(self._warmup) >= self.warmup_frames:
+                    self.noise_floor = float(np.median(self._warmup))
+                    self._warmup = []
+                continue
+            if speech[i]:
+                # Re-check against the floor as it stands now
+                speech_now = e > self.noise_floor + self.threshold_db
+            else:
+                speech_now = False
+
+            if speech_now:
+                self.noise_floor += self.speech_floor_alpha * (e - self.noise_floor)
+            else:
+                alpha = 0.5 if e < self.noise_floor else self.floor_alpha
+                self.noise_floor += alpha * (e - self.noise_floor)
+
+            if not self.in_speech:
+                if speech_now:
+                    if self._run == 0:
+                        self._run_start = frame_start
+                    self._run += 1
+                    if self._run >= self.min_speech_frames:
+                        self.in_speech = True
+                        self.speech_start = max(0, self._run_start - self.preroll_samples)
+                        self._last_speech_end = frame_end
+                        self._silence = 0
+                        events.append((START, self.speech_start))
+                else:
+                    self._run = 0
+                continue
+
+            if speech_now:
+                self._silence = 0
+                self._last_speech_end = frame_end
+            else:
+                self._silence += 1
+                if self._silence == self.pause_frames and self.pause_frames < self.hangover_frames:
+                    events.append((PAUSE, self._last_speech_end + self.pause_frames * self.frame_len // 2))
+
+            ended = self._silence >= self.hangover_frames
+            capped = frame_end - self.speech_start >= self.max_utterance_samples
+            if ended or capped:
+                end = frame_end if capped and not ended else self._last_speech_end + self.tail_samples
+                events.append((END, end))
+                self.in_speech = False
+                self._run = 0
+                self._silence = 0
+                self.speech_start = None
+        return events
+
+    def detect(self, samples, block=1024):
+        """Run over a whole recording and return [(start, end, decided_at), ...].
+
+        `decided_at` is the sample index at which END was emitted, i.e. how
+        much audio the detector needed before it could endpoint.
+        """
+        self.reset(0)
+        segments = []
+        start = None
+        for offset in range(0, len(samples), block):
+            for kind, index in self.push(samples[offset:offset + block]):
+                if kind == START:
+                    start = index
+                elif kind == END:
+                    segments.append((start, index, self.position))
+                    start = None
+        if start is not None:
+            segments.append((start, len(samples), None))
+        return segments
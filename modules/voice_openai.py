@@ -1,161 +1,440 @@
 # modules/voice_openai.py
-import pyaudio
-import wave
-import openai
+import io
 import os
 import time
-import pygame
+import threading
 import numpy as np
-from pydub import AudioSegment
-from dotenv import load_dotenv
+from .api_client import get_client
+from .audio_capture import get_capture_engine
+from .audio_encoding import pcm_to_wav, encode_for_upload
+from .incremental_transcriber import IncrementalTranscriber, client_transcriber, INCREMENTAL_TRANSCRIPTION
+from .vad import VoiceActivityDetector, START, PAUSE, END
+from .wake_word import get_wake_word_detector, WAKE_WORD, WAKE_WORD_FOLLOWUP_S
+from .sentences import split_sentences, stream_sentences
+from .tts_pipeline import SpeechPipeline
+from .tts_cache import TTSCache, WARM_PHRASES
+from .audio_output import get_playback_worker, OUTPUT_RATE
 
-load_dotenv()
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Audio stays in memory between recording, transcription and playback.
+# Set COMMANDLY_DEBUG_AUDIO=true to also keep copies on disk for inspection.
+DEBUG_AUDIO = os.environ.get("COMMANDLY_DEBUG_AUDIO", "false").lower() in {"1","true","yes"}
+DEBUG_AUDIO_DIR = os.environ.get("COMMANDLY_DEBUG_AUDIO_DIR", "debug_audio")
 
-def record_audio(filename="user_input.wav", duration=5, silence_threshold=1000):
-    """Record audio with silence detection"""
-    CHUNK = 1024
-    FORMAT = pyaudio.paInt16
-    CHANNELS = 1
-    RATE = 44100
+def save_debug_audio(data, prefix, ext):
+    """Write a debug copy of an audio payload; names are unique per process and turn"""
+    try:
+        os.makedirs(DEBUG_AUDIO_DIR, exist_ok=True)
+        path = os.path.join(DEBUG_AUDIO_DIR, f"{prefix}_{os.getpid()}_{int(time.time() * 1000)}.{ext}")
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+    except Exception as e:
+        print(f"⚠️ Could not save debug audio: {e}")
+        return None
+
+_vad = None
+
+def get_vad(rate):
+    """Shared detector so the learned noise floor carries over between turns"""
+    global _vad
+    if _vad is None or _vad.rate != rate:
+        _vad = VoiceActivityDetector(rate=rate)
+    return _vad
+
+def record_audio(filename=None, duration=5, max_utterance=15):
+    """Record one utterance using voice-activity detection.
 
-    p = pyaudio.PyAudio()
-    stream = p.open(format=FORMAT, channels=CHANNELS, rate=RATE,
-                    input=True, frames_per_buffer=CHUNK)
+    Waits up to `duration` seconds for speech to start, then captures until
+    the detector endpoints or `max_utterance` seconds have passed. Returns
+    the utterance as int16 PCM at the capture rate, or None if no speech
+    was heard. `filename` (or COMMANDLY_DEBUG_AUDIO) also writes a WAV.
+    """
+    engine = get_capture_engine()
+    CHUNK = engine.chunk
+    RATE = engine.rate
+    vad = get_vad(RATE)
+    vad.max_utterance_samples = int(RATE * max_utterance)
+
+    # Audio from before this call is already in the ring buffer: use the last
+    # second to refresh the noise floor and start early enough for the pre-roll.
+    now = engine.position()
+    pos = max(engine.buffer.oldest(), now - vad.preroll_samples)
+    history = engine.read(max(engine.buffer.oldest(), now - RATE), pos)
+    if len(history) >= vad.frame_len * vad.warmup_frames:
+        vad.calibrate(history)
+    vad.reset(pos)
 
     print("🎤 Speak now...")
-    frames = []
-    silence_count = 0
-    max_silence = int(RATE / CHUNK * 1.5)  # 1.5 seconds of silence
-    speech_detected = False
-
-    for i in range(int(RATE / CHUNK * duration)):
-        data = stream.read(CHUNK)
-        frames.append(data)
-        
-        # Check audio level for silence detection
-        audio_data = np.frombuffer(data, dtype=np.int16)
-        audio_level = np.abs(audio_data).mean()
-        
-        # If we detect speech (above threshold)
-        if audio_level > silence_threshold:
-            speech_detected = True
-            silence_count = 0
-        else:
-            silence_count += 1
-        
-        # If we detected speech and then silence, stop recording
-        if speech_detected and silence_count > max_silence:
-            print("🔇 Silence after speech detected, stopping recording...")
+    onset_deadline = now + int(RATE * duration)
+    speech_start = speech_end = None
+
+    while speech_end is None:
+        # Block on the ring buffer until the callback has delivered the next chunk
+        if not engine.wait_for(pos + CHUNK, timeout=2.0):
+            print("⚠️ Capture stream stalled")
+            break
+        chunk = engine.read(pos, pos + CHUNK)
+        pos += CHUNK
+        for kind, index in vad.push(chunk):
+            if kind == START:
+                speech_start = index
+            elif kind == END:
+                speech_end = index
+                print("🔇 End of speech detected, stopping recording...")
+        if speech_start is None and pos >= onset_deadline:
             break
 
     print("✅ Recording complete.")
 
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
-
-    # Only save if we detected actual speech
-    if speech_detected and len(frames) > 10:
-        with wave.open(filename, 'wb') as wf:
-            wf.setnchannels(CHANNELS)
-            wf.setsampwidth(p.get_sample_size(FORMAT))
-            wf.setframerate(RATE)
-            wf.writeframes(b''.join(frames))
-        return True
-    else:
+    # Only keep the audio if we detected actual speech
+    if speech_start is None:
         print("⚠️ No speech detected")
-        return False
+        return None
+    if speech_end is None:
+        speech_end = pos
+    engine.wait_for(speech_end, timeout=1.0)  # trailing pad may lie just ahead
+    samples = engine.read(speech_start, speech_end)
+    if filename:
+        with open(filename, 'wb') as f:
+            f.write(pcm_to_wav(samples, RATE).getvalue())
+    elif DEBUG_AUDIO:
+        save_debug_audio(pcm_to_wav(samples, RATE).getvalue(), "user_input", "wav")
+    return samples
+
+# While we are speaking, the microphone also hears the speakers. Raising the
+# VAD threshold by this margin lets a user talking over the reply interrupt
+# it (barge-in) without our own voice triggering that.
+BARGE_IN_MARGIN_DB = float(os.environ.get("COMMANDLY_BARGE_IN_MARGIN_DB", "12"))
+
+def listen_utterances(stop_event, on_speech_start=None, is_speaking=None, max_utterance=15,
+                      incremental=INCREMENTAL_TRANSCRIPTION, wake_word=WAKE_WORD):
+    """Yield utterances from the always-open capture stream.
+
+    Unlike record_audio this never stops listening between turns: it walks
+    the ring buffer continuously, calls `on_speech_start()` as soon as an
+    onset is confirmed and yields each utterance once the VAD endpoints it.
+    Utterances are int16 PCM, or with `incremental` an IncrementalTranscriber
+    whose earlier segments were already sent for transcription during
+    pauses in the speech; either can be passed to transcribe_audio.
+
+    With `wake_word`, speech is only accepted once the local detector has
+    heard the wake word in it (or shortly after a previous accepted
+    utterance); everything else is dropped without touching the network.
+    The wake word itself is cut off the front of the utterance.
+    """
+    engine = get_capture_engine()
+    CHUNK = engine.chunk
+    RATE = engine.rate
+    vad = get_vad(RATE)
+    vad.max_utterance_samples = int(RATE * max_utterance)
+    base_threshold = vad.threshold_db
+    wake = get_wake_word_detector(RATE) if wake_word else None
+    followup = int(WAKE_WORD_FOLLOWUP_S * RATE)
+    awake_until = -1  # follow-ups starting before this sample skip the wake word
+    pos = engine.position()
+    vad.reset(pos)
+    speech_start = segment_start = None
+    waiting = False  # in speech, but no wake word heard yet
+    pending = None
+
+    def accept(index):
+        nonlocal speech_start, segment_start, pending, waiting
+        speech_start = segment_start = index
+        waiting = False
+        if incremental:
+            pending = IncrementalTranscriber(whisper_transcribe, RATE)
+        if on_speech_start is not None:
+            on_speech_start()
+
+    while not stop_event.is_set():
+        if not engine.wait_for(pos + CHUNK, timeout=0.5):
+            continue
+        if is_speaking is not None:
+            vad.threshold_db = base_threshold + (BARGE_IN_MARGIN_DB if is_speaking() else 0.0)
+        chunk = engine.read(pos, pos + CHUNK)
+        pos += CHUNK
+        if waiting:
+            hits = wake.push(chunk)
+            if hits:
+                print("👂 Wake word detected")
+                accept(hits[0])
+        for kind, index in vad.push(chunk):
+            if kind == START:
+                if wake is None or index < awake_until:
+                    accept(index)
+                else:
+                    speech_start, waiting = index, True
+                    wake.reset(index)
+                    hits = wake.push(engine.read(index, pos))
+                    if hits:
+                        print("👂 Wake word detected")
+                        accept(hits[0])
+            elif kind == PAUSE and pending is not None:
+                pending.add_segment(engine.read(segment_start, index))
+                segment_start = index
+            elif kind == END and speech_start is not None:
+                if waiting:
+                    print("🔕 No wake word, ignoring speech")
+                    speech_start, waiting = None, False
+                    continue
+                if wake is not None:
+                    awake_until = index + followup
+                    if index - vad.tail_samples - speech_start < 0.3 * RATE:
+                        # Just the wake word: keep listening for the request itself
+                        speech_start = segment_start = pending = None
+                        continue
+                engine.wait_for(index, timeout=1.0)
+                if DEBUG_AUDIO:
+                    save_debug_audio(pcm_to_wav(engine.read(speech_start, index), RATE).getvalue(), "user_input", "wav")
+                if pending is not None:
+                    pending.finish(engine.read(segment_start, index))
+                    utterance, pending = pending, None
+                else:
+                    utterance = engine.read(speech_start, index)
+                speech_start = segment_start = None
+                yield utterance
 
-def transcribe_audio(filename="user_input.wav"):
+def _as_upload(audio, rate):
+    """Turn PCM samples, WAV bytes or a file path into an uploadable file object"""
+    if isinstance(audio, np.ndarray):
+        return encode_for_upload(audio, rate)
+    if isinstance(audio, (bytes, bytearray)):
+        buf = io.BytesIO(audio)
+        buf.name = "speech.wav"
+        return buf
+    if isinstance(audio, io.BytesIO):
+        audio.seek(0)
+        return audio
+    with open(audio, "rb") as f:  # debug path: transcribe a saved recording
+        buf = io.BytesIO(f.read())
+    buf.name = os.path.basename(audio)
+    return buf
+
+def whisper_transcribe(samples, rate):
+    """Raw Whisper transcript for a block of PCM (no filtering)"""
+    return client_transcriber(get_client("transcription"))(samples, rate)
+
+def transcribe_audio(audio, rate=44100):
     """Send to Whisper for transcription with better filtering"""
     try:
-        # Check if file exists and has content
-        if not os.path.exists(filename) or os.path.getsize(filename) < 5000:
-            return ""
-        
-        with open(filename, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                language="en"  # Force English to reduce phantom phrases
-            )
-        
-        text = transcript.text.strip()
-        
-        # Filter out common phantom phrases and background noise
-        phantom_phrases = [
-            "thank you", "thanks", "you", "bye", "goodbye", "mm-hmm", "uh-huh",
-            "um", "uh", "oh", "ah", "okay", "ok", "yes", "no", "hello", "hi",
-            "the", "a", "an", "and", "or", "but", "so", "well", "now", "then",
-            "i", "me", "my", "we", "us", "our", "you", "your", "he", "she", "it",
-            "they", "them", "their", "this", "that", "these", "those", "here", "there",
-            "music", "sound", "noise", "background", "audio", "video", "youtube",
-            "playing", "play", "song", "track", "volume", "speaker", "headphone"
-        ]
-        
-        # Convert to lowercase for comparison
-        text_lower = text.lower()
-        
-        # If the text is very short or just phantom phrases, ignore it
-        words = text_lower.split()
-        if len(words) <= 3 and all(word in phantom_phrases for word in words):
-            print(f"🚫 Filtering phantom phrase: '{text}'")
-            return ""
-        
-        # If it's too short and doesn't seem like a real command, ignore it
-        if len(text) < 5:
-            print(f"🚫 Text too short: '{text}'")
-            return ""
-        
-        # Filter out common background noise transcriptions
-        noise_patterns = [
-            "music", "playing", "song", "audio", "video", "youtube", "sound",
-            "background", "noise", "speaker", "headphone", "volume"
-        ]
-        
-        if any(pattern in text_lower for pattern in noise_patterns) and len(words) < 5:
-            print(f"🚫 Filtering background noise: '{text}'")
+        if audio is None:
             return ""
+        if isinstance(audio, IncrementalTranscriber):
+            # Most segments were transcribed while the user was still talking
+            text = audio.result()
+            print(f"🧩 Stitched {audio.segments} segment transcripts")
+            return filter_transcript(text)
+
+        # Check that the recording has content
+        if isinstance(audio, np.ndarray):
+            if len(audio) < rate * 0.05:
+                return ""
+            upload = _as_upload(audio, rate)
+        else:
+            upload = _as_upload(audio, rate)
+            if upload.getbuffer().nbytes < 5000:
+                return ""
         
-        print(f"📝 Transcribed: '{text}'")
-        return text
+        transcript = get_client("transcription").audio.transcriptions.create(
+            model="whisper-1",
+            file=upload,
+            language="en"  # Force English to reduce phantom phrases
+        )
+        return filter_transcript(transcript.text.strip())
         
     except Exception as e:
         print(f"❌ Transcription error: {e}")
         return ""
 
-def speak_text(text, voice="nova"):
-    """Use OpenAI TTS to synthesize speech"""
+def filter_transcript(text):
+    """Drop phantom phrases and background-noise transcriptions"""
+    # Filter out common phantom phrases and background noise
+    phantom_phrases = [
+        "thank you", "thanks", "you", "bye", "goodbye", "mm-hmm", "uh-huh",
+        "um", "uh", "oh", "ah", "okay", "ok", "yes", "no", "hello", "hi",
+        "the", "a", "an", "and", "or", "but", "so", "well", "now", "then",
+        "i", "me", "my", "we", "us", "our", "you", "your", "he", "she", "it",
+        "they", "them", "their", "this", "that", "these", "those", "here", "there",
+        "music", "sound", "noise", "background", "audio", "video", "youtube",
+        "playing", "play", "song", "track", "volume", "speaker", "headphone"
+    ]
+
+    # Convert to lowercase for comparison
+    text_lower = text.lower()
+
+    # If the text is very short or just phantom phrases, ignore it
+    words = text_lower.split()
+    if len(words) <= 3 and all(word in phantom_phrases for word in words):
+        print(f"🚫 Filtering phantom phrase: '{text}'")
+        return ""
+
+    # If it's too short and doesn't seem like a real command, ignore it
+    if len(text) < 5:
+        print(f"🚫 Text too short: '{text}'")
+        return ""
+
+    # Filter out common background noise transcriptions
+    noise_patterns = [
+        "music", "playing", "song", "audio", "video", "youtube", "sound",
+        "background", "noise", "speaker", "headphone", "volume"
+    ]
+
+    if any(pattern in text_lower for pattern in noise_patterns) and len(words) < 5:
+        print(f"🚫 Filtering background noise: '{text}'")
+        return ""
+
+    print(f"📝 Transcribed: '{text}'")
+    return text
+
+TTS_MODEL = "tts-1"
+TTS_PCM_RATE = OUTPUT_RATE  # the speech endpoint's raw "pcm" format: 24 kHz 16-bit mono
+TTS_PIPELINE = os.environ.get("COMMANDLY_TTS_PIPELINE", "true").lower() in {"1","true","yes"}
+TTS_LOOKAHEAD = int(os.environ.get("COMMANDLY_TTS_LOOKAHEAD", "2"))
+
+def synthesize_speech(text, voice="nova"):
+    """Yield raw PCM from the speech endpoint as the bytes arrive"""
+    with get_client("speech").audio.speech.with_streaming_response.create(
+        model=TTS_MODEL,
+        voice=voice,
+        input=text,
+        response_format="pcm"
+    ) as response:
+        for chunk in response.iter_bytes(4800):
+            yield chunk
+
+_tts_cache = None
+
+def get_tts_cache():
+    global _tts_cache
+    if _tts_cache is None:
+        _tts_cache = TTSCache()
+    return _tts_cache
+
+def cached_speech(text, voice="nova"):
+    """Like synthesize_speech, but serve repeated phrases from the TTS cache"""
+    cache = get_tts_cache()
+    data = cache.get(text, voice, TTS_MODEL)
+    if data is not None:
+        yield data
+        return
+    chunks = []
+    for chunk in synthesize_speech(text, voice):
+        chunks.append(chunk)
+        yield chunk
+    # Only reached when the stream completed (not cancelled midway)
+    cache.put(text, voice, TTS_MODEL, b"".join(chunks))
+
+def warm_tts_cache(voice="nova", phrases=None):
+    """Pre-synthesise stock phrases so they play without an API call"""
+    fetched = get_tts_cache().warm(WARM_PHRASES if phrases is None else phrases,
+                                   voice, TTS_MODEL, lambda p: synthesize_speech(p, voice))
+    if fetched:
+        print(f"🗄️ TTS cache warmed with {fetched} phrases")
+
+_speech_lock = threading.Lock()
+_speech_threads = []
+_pipelines = set()
+
+def _speak_pipelined(sentences, voice):
+    worker = get_playback_worker()
+    recorded = [] if DEBUG_AUDIO else None
+
+    def sink(chunk):
+        if recorded is not None:
+            recorded.append(chunk)
+        worker.enqueue(chunk)
+
+    pipeline = SpeechPipeline(lambda s: cached_speech(s, voice), sink, lookahead=TTS_LOOKAHEAD)
+    with _speech_lock:
+        _pipelines.add(pipeline)
     try:
-        # Truncate text if it's too long
-        if len(text) > 4000:
-            text = text[:4000] + "..."
-        
-        filename = f"response_{int(time.time())}.mp3"
+        stats = pipeline.run(sentences)
+    finally:
+        with _speech_lock:
+            _pipelines.discard(pipeline)
+    for error in stats["errors"]:
+        print(f"Speech error: {str(error)}")
+    if stats["time_to_first_audio"] is not None:
+        print(f"🔊 First audio after {stats['time_to_first_audio'] * 1000:.0f} ms ({stats['sentences']} sentences)")
+    if recorded:
+        data = b"".join(recorded)
+        pcm = np.frombuffer(data[:len(data) & ~1], dtype=np.int16)
+        save_debug_audio(pcm_to_wav(pcm, TTS_PCM_RATE).getvalue(), "response", "wav")
 
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice=voice,
-            input=text
-        )
-        
-        response.stream_to_file(filename)
-        
-        pygame.mixer.init()
-        pygame.mixer.music.load(filename)
-        pygame.mixer.music.play()
-        
-        while pygame.mixer.music.get_busy():
-            time.sleep(0.1)
-        
-        pygame.mixer.quit()
-        
-        try:
-            os.remove(filename)
-        except:
-            pass
-            
+def _speak(text, voice, pipelined):
+    try:
+        if pipelined:
+            sentences = split_sentences(text) if isinstance(text, str) else stream_sentences(text)
+            _speak_pipelined(sentences, voice)
+        else:
+            speak_text_whole(text if isinstance(text, str) else "".join(text), voice)
     except Exception as e:
         print(f"Speech error: {str(e)}")
 
+def speak_text(text, voice="nova", pipelined=None, wait=True):
+    """Use OpenAI TTS to synthesize speech.
+
+    In pipelined mode (the default) the reply is split into sentences that
+    are synthesised ahead of playback and played as their bytes arrive, so
+    the first words are heard after one short request instead of the whole
+    reply. `text` may also be an iterable of fragments that is still being
+    generated (a streaming chat reply); each sentence is then synthesised
+    as soon as it is complete. With wait=False synthesis runs in the background and the call
+    returns at once; use wait_for_speech() / stop_speaking() to follow up.
+    """
+    if pipelined is None:
+        pipelined = TTS_PIPELINE
+    if not wait:
+        thread = threading.Thread(target=_speak, args=(text, voice, pipelined), daemon=True)
+        with _speech_lock:
+            _speech_threads[:] = [t for t in _speech_threads if t.is_alive()]
+            _speech_threads.append(thread)
+        thread.start()
+        return
+    _speak(text, voice, pipelined)
+    wait_for_speech()
+
+def wait_for_speech(timeout=None):
+    """Block until all pending speech has been synthesised and played"""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _speech_lock:
+        threads = list(_speech_threads)
+    for thread in threads:
+        thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+    try:
+        worker = get_playback_worker()
+    except Exception:
+        return True
+    return worker.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+def stop_speaking():
+    """Cancel in-flight synthesis and silence playback immediately"""
+    with _speech_lock:
+        pipelines = list(_pipelines)
+    for pipeline in pipelines:
+        pipeline.cancel()
+    try:
+        get_playback_worker().cancel()
+    except Exception:
+        pass
+
+def speak_text_whole(text, voice="nova"):
+    """Synthesize the whole reply in one request, then queue it for playback"""
+    # Truncate text if it's too long
+    if len(text) > 4000:
+        text = text[:4000] + "..."
+    
+    cache = get_tts_cache()
+    audio_bytes = cache.get(text, voice, TTS_MODEL, "mp3")
+    if audio_bytes is None:
+        response = get_client("speech").audio.speech.create(
+            model=TTS_MODEL,
+            voice=voice,
+            input=text
+        )
+        audio_bytes = response.read()
+        cache.put(text, voice, TTS_MODEL, audio_bytes, "mp3")
+    if DEBUG_AUDIO:
+        save_debug_audio(audio_bytes, "response", "mp3")
+    
+    get_playback_worker().enqueue(audio_bytes, "mp3")
@@ -0,0 +1,272 @@
+# modules/wake_word.py
+import glob
+import os
+import sys
+import wave
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .audio_encoding import pcm_to_wav
+
+WAKE_WORD = os.environ.get("COMMANDLY_WAKE_WORD", "false").lower() in {"1","true","yes"}
+WAKE_WORD_DIR = os.path.expanduser(os.environ.get("COMMANDLY_WAKE_WORD_DIR", os.path.join("~", ".commandly", "wake_word")))
+# Mean cosine distance along the best alignment; lower is a closer match.
+WAKE_WORD_THRESHOLD = float(os.environ.get("COMMANDLY_WAKE_WORD_THRESHOLD", "0.35"))
+# After a wake word, follow-up utterances are accepted without it for this long.
+WAKE_WORD_FOLLOWUP_S = float(os.environ.get("COMMANDLY_WAKE_WORD_FOLLOWUP_S", "8"))
+
+
+def _mel(hz):
+    return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+
+def _hz(mel):
+    return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+
+class MFCC:
+    """Mel-frequency cepstral coefficients computed with NumPy only.
+
+    Framing is defined in milliseconds and the filterbank stops at 8 kHz,
+    so features from 16 kHz and 44.1 kHz audio are directly comparable.
+    c0 (overall loudness) is dropped and every frame is L2-normalised, so
+    the cosine distance between frames ignores how loudly a word was said.
+    """
+
+    def __init__(self, rate, win_ms=25, hop_ms=10, n_mels=26, n_ceps=13, fmin=60.0, fmax=8000.0):
+        self.rate = rate
+        self.win = int(rate * win_ms / 1000)
+        self.hop = int(rate * hop_ms / 1000)
+        self.n_fft = 1 << (self.win - 1).bit_length()
+        self.window = np.hamming(self.win).astype(np.float32)
+        fmax = min(fmax, rate / 2)
+        edges = _hz(np.linspace(_mel(fmin), _mel(fmax), n_mels + 2))
+        bins = np.fft.rfftfreq(self.n_fft, 1.0 / rate)
+        lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+        rising = (bins - lower) / (center - lower)
+        falling = (upper - bins) / (upper - center)
+        self.filterbank = np.maximum(0.0, np.minimum(rising, falling)).astype(np.float32)
+        k = np.arange(n_mels)
+        dct = np.cos(np.pi / n_mels * (k[None, :] + 0.5) * np.arange(1, n_ceps)[:, None])
+        lifter = 1 + 11 * np.sin(np.pi * np.arange(1, n_ceps) / 22)  # standard sinusoidal lifter
+        self.dct = (dct * lifter[:, None]).astype(np.float32)
+
+    def frames_in(self, n_samples):
+        return 0 if n_samples < self.win else 1 + (n_samples - self.win) // self.hop
+
+    def __call__(self, samples):
+        """(n_frames, n_ceps - 1) features for every complete frame of int16 PCM"""
+        x = np.asarray(samples, dtype=np.float32) / 32768.0
+        n = self.frames_in(len(x))
+        if n == 0:
+            return np.zeros((0, self.dct.shape[0]), dtype=np.float32)
+        x = np.append(x[0], x[1:] - 0.97 * x[:-1])  # pre-emphasis
+        frames = sliding_window_view(x, self.win)[::self.hop][:n] * self.window
+        power = np.abs(np.fft.rfft(frames, self.n_fft)) ** 2
+        ceps = np.log(power @ self.filterbank.T + 1e-8) @ self.dct.T
+        return ceps / (np.linalg.norm(ceps, axis=1, keepdims=True) + 1e-8)
+
+
+def subsequence_dtw(template, stream):
+    """Best alignment of `template` against any stretch of `stream`.
+
+    Both are (frames, dims) unit-norm features. Each template frame steps
+    the stream forward by 1 or 2 frames, or by 0 (never twice in a row),
+    so a match may be half to twice as long as the template. That keeps
+    every path exactly len(template) cells long and lets each template row
+    be computed in one vectorised pass over the stream. Returns
+    (mean cost, index of the stream frame where the match ends).
+    """
+    cost = 1.0 - template @ stream.T
+    T, W = cost.shape
+    if W == 0:
+        return np.inf, -1
+    moved = cost[0].copy()  # best path into (i, j) whose last step advanced the stream
+    stayed = np.full(W, np.inf, dtype=cost.dtype)  # ... whose last step held the stream still
+    for i in range(1, T):
+        best = np.minimum(moved, stayed)
+        step = np.full(W, np.inf, dtype=cost.dtype)
+        step[1:] = best[:-1]
+        np.minimum(step[2:], best[:-2], out=step[2:])
+        stayed = cost[i] + moved
+        moved = cost[i] + step
+    final = np.minimum(moved, stayed)
+    best = int(np.argmin(final))
+    # A steady final sound aligns almost equally well at several end frames;
+    # take the latest so the match covers the whole word.
+    end = best
+    while end + 1 < W and final[end + 1] <= final[best] + 0.01 * T:
+        end += 1
+    return float(final[best]) / T, end
+
+
+def trim_silence(samples, rate, floor_db=30.0, frame_ms=10):
+    """Cut leading/trailing frames more than `floor_db` below the loudest frame"""
+    samples = np.asarray(samples, dtype=np.int16)
+    frame = int(rate * frame_ms / 1000)
+    n = len(samples) // frame
+    if n == 0:
+        return samples
+    x = samples[:n * frame].reshape(n, frame).astype(np.float32)
+    energy = 10 * np.log10(np.mean(x * x, axis=1) + 1e-10)
+    loud = np.flatnonzero(energy > energy.max() - floor_db)
+    return samples[loud[0] * frame:(loud[-1] + 1) * frame]
+
+
+class WakeWordDetector:
+    """Streaming keyword spotter: MFCC features matched against enrolled templates.
+
+    Call `reset(position)` at the start of an utterance, then `push` blocks
+    of int16 samples. Every `scan_ms` the most recent features are aligned
+    with each template by subsequence DTW. A match below `threshold` is
+    reported once the following scan no longer improves on it, so `push`
+    returns the absolute sample index where the whole wake word ends.
+    """
+
+    def __init__(self, templates, rate, threshold=WAKE_WORD_THRESHOLD, scan_ms=100):
+        self.mfcc = MFCC(rate)
+        self.rate = rate
+        self.threshold = threshold
+        self.templates = [t for t in templates if len(t)]
+        longest = max((len(t) for t in self.templates), default=0)
+        self.history = 2 * longest + 10  # a match may be stretched up to 2x
+        self.scan_frames = max(1, int(scan_ms / 10))
+        self.reset()
+
+    @classmethod
+    def from_audio(cls, clips, rate, **kwargs):
+        """Build a detector from raw template recordings at `rate`"""
+        mfcc = MFCC(rate)
+        return cls([mfcc(trim_silence(c, rate)) for c in clips], rate, **kwargs)
+
+    def reset(self, position=0):
+        self.origin = int(position)  # absolute index of the first sample after reset
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._features = np.zeros((0, self.mfcc.dct.shape[0]), dtype=np.float32)
+        self._frames = 0  # frames computed since reset
+        self._since_scan = 0
+        self.last_score = np.inf
+        self._candidate = None  # (score, end index) of a match that may still improve
+
+    def score(self, features):
+        """Best (lowest) template distance for a feature window, and its end frame"""
+        best, end = np.inf, -1
+        for template in self.templates:
+            s, e = subsequence_dtw(template, features)
+            if s < best:
+                best, end = s, e
+        return best, end
+
+    def push(self, samples):
+        samples = np.asarray(samples, dtype=np.int16)
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        n = self.mfcc.frames_in(len(samples))
+        if n == 0:
+            self._pending = samples
+            return []
+        feats = self.mfcc(samples[:(n - 1) * self.mfcc.hop + self.mfcc.win])
+        self._pending = samples[n * self.mfcc.hop:]
+        self._features = np.concatenate((self._features, feats))[-self.history:]
+        self._frames += n
+        self._since_scan += n
+        if self._since_scan < self.scan_frames or not self.templates:
+            return []
+        self._since_scan = 0
+
+        self.last_score, end = self.score(self._features)
+        candidate = self._candidate
+        if self.last_score <= self.threshold and (candidate is None or self.last_score < candidate[0]):
+            # Still improving: the word may not be over yet, look again next scan
+            frame = self._frames - len(self._features) + end
+            # Frame k since reset covers samples [k*hop, k*hop + win) after the origin
+            self._candidate = (self.last_score, self.origin + frame * self.mfcc.hop + self.mfcc.win)
+            return []
+        if candidate is None:
+            return []
+        self._candidate = None
+        self._features = self._features[:0]  # don't fire twice on the same word
+        return [candidate[1]]
+
+
+def template_paths(directory=None):
+    return sorted(glob.glob(os.path.join(directory or WAKE_WORD_DIR, "*.wav")))
+
+
+def load_templates(rate, directory=None):
+    """Features of every enrolled recording (MFCCs are comparable across sample rates)"""
+    clips = []
+    for path in template_paths(directory):
+        try:
+            with wave.open(path, 'rb') as wf:
+                clip_rate = wf.getframerate()
+                clip = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        except (OSError, wave.Error) as e:
+            print(f"⚠️ Skipping wake word template {path}: {e}")
+            continue
+        clips.append(MFCC(clip_rate)(trim_silence(clip, clip_rate)))
+    return clips
+
+
+def enroll(samples, rate, directory=None):
+    """Save one recording of the wake word as a template; returns its path"""
+    directory = directory or WAKE_WORD_DIR
+    os.makedirs(directory, exist_ok=True)
+    clip = trim_silence(samples, rate)
+    path = os.path.join(directory, f"template_{len(template_paths(directory)) + 1:02d}.wav")
+    with open(path, "wb") as f:
+        f.write(pcm_to_wav(clip, rate).getvalue())
+    return path
+
+
+def cross_scores(templates):
+    """How well each template is matched by the others (leave-one-out)"""
+    scores = []
+    for i, template in enumerate(templates):
+        others = templates[:i] + templates[i + 1:]
+        if others:
+            scores.append(min(subsequence_dtw(template, o)[0] for o in others))
+    return scores
+
+
+def get_wake_word_detector(rate):
+    """Detector for the capture stream, or None when the wake word is off or not enrolled"""
+    if not WAKE_WORD:
+        return None
+    templates = load_templates(rate)
+    if not templates:
+        print("⚠️ Wake word enabled but no templates enrolled; "
+              "run `python -m modules.wake_word enroll`. Listening without it.")
+        return None
+    print(f"👂 Wake word active ({len(templates)} templates)")
+    return WakeWordDetector(templates, rate)
+
+
+def main(argv):
+    """python -m modules.wake_word enroll [count] | list | clear"""
+    command = argv[0] if argv else "list"
+    if command == "enroll":
+        from .voice_openai import record_audio  # capture stack only needed here
+        from .audio_capture import RATE
+        count = int(argv[1]) if len(argv) > 1 else 3
+        for i in range(count):
+            print(f"🎙️ Say your wake word ({i + 1}/{count})...")
+            samples = record_audio(duration=3, max_utterance=3)
+            if samples is None:
+                print("🔇 Nothing heard, try again")
+                continue
+            print(f"💾 Saved {enroll(samples, RATE)}")
+    elif command == "clear":
+        for path in template_paths():
+            os.remove(path)
+        print("🗑️ Wake word templates removed")
+    if command in ("enroll", "list"):
+        templates = load_templates(16000)
+        print(f"📂 {len(templates)} templates in {WAKE_WORD_DIR}")
+        scores = cross_scores(templates)
+        if scores:
+            print(f"📏 Templates match each other at {max(scores):.3f} "
+                  f"(threshold {WAKE_WORD_THRESHOLD:.3f})")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,63 @@
+import json
+import pytest
+from benchmarks.stub_openai_server import StubServer
+from modules import agent_core, api_client, llm_cache
+from modules.llm_cache import LLMCache
+
+
+def call(call_id, name, **args):
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+
+
+@pytest.fixture
+def stub_api(monkeypatch, tmp_path):
+    servers = []
+
+    def start(script):
+        server = StubServer(latency=0.0, script=script).start()
+        servers.append(server)
+        monkeypatch.setattr(api_client, "_client", api_client.make_client(server.base_url))
+        monkeypatch.setattr(api_client, "_views", {})
+        monkeypatch.setattr(llm_cache, "_cache", LLMCache(enabled=False))
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def test_schemas_follow_permissions(monkeypatch):
+    names = {s["function"]["name"] for s in agent_core.tool_schemas()}
+    assert {"read_file", "apply_patch", "list_dir"} <= names
+    monkeypatch.setitem(agent_core.TOOLS, "execute_command", agent_core.TOOLS["execute_command"][:2] + (False,))
+    assert "execute_command" not in {s["function"]["name"] for s in agent_core.tool_schemas()}
+
+
+def test_parallel_tool_calls_are_fed_back_together(stub_api, tmp_path):
+    (tmp_path / "a.txt").write_text("alpha\n")
+    (tmp_path / "b.txt").write_text("beta\n")
+    server = stub_api([
+        {"tool_calls": [call("c1", "read_file", path=str(tmp_path / "a.txt")),
+                        call("c2", "read_file", path=str(tmp_path / "b.txt"))]},
+        {"content": "Both files read."},
+    ])
+    assert agent_core.run_agent("read a and b") == "Both files read."
+    assert len(server.chat_requests) == 2  # one round trip for both reads
+    followup = server.chat_requests[1]["messages"]
+    assert [m["role"] for m in followup[-3:]] == ["assistant", "tool", "tool"]
+    assert [m["tool_call_id"] for m in followup[-2:]] == ["c1", "c2"]
+    assert "alpha" in followup[-2]["content"] and "beta" in followup[-1]["content"]
+    assert server.chat_requests[0]["tools"]
+
+
+def test_bad_arguments_become_a_tool_error():
+    args, error = agent_core.call_arguments({"id": "c1", "type": "function",
+                                             "function": {"name": "read_file", "arguments": "{not json"}})
+    assert args is None and "Invalid arguments for read_file" in error
+
+
+def test_calls_on_the_same_path_share_a_chain():
+    calls = [call("c1", "edit_range", path="x.py"), call("c2", "read_file", path="y.py"),
+             call("c3", "apply_patch", path="./x.py"), call("c4", "search_web", query="q")]
+    chains = agent_core.call_chains(calls)
+    assert [[index for index, _ in chain] for chain in chains] == [[0, 2], [1], [3]]
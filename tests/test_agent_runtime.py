@@ -0,0 +1,116 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from modules import agent_core, agent_runtime
+from modules.agent_runtime import AgentRuntime
+from modules.tools import system_control
+
+
+def call(call_id, name, **args):
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+
+
+def run_calls(runtime, calls):
+    return asyncio.run_coroutine_threadsafe(runtime.run_tool_calls(calls), runtime.loop).result()
+
+
+def test_independent_calls_overlap_and_same_path_calls_run_in_order(monkeypatch):
+    log, lock = [], threading.Lock()
+
+    def fake_execute(name, args):
+        with lock:
+            log.append(("start", args["path"], args.get("n")))
+        time.sleep(0.1)
+        with lock:
+            log.append(("end", args["path"], args.get("n")))
+        return "ok"
+
+    monkeypatch.setattr(agent_core, "execute_tool", fake_execute)
+    calls = [call("c1", "edit_range", path="x.py", n=1), call("c2", "read_file", path="y.py"),
+             call("c3", "edit_range", path="x.py", n=2)]
+    start = time.perf_counter()
+    results = run_calls(AgentRuntime(), calls)
+    assert time.perf_counter() - start < 0.28  # y.py overlapped the two x.py edits
+    assert [r["tool_call_id"] for r in results] == ["c1", "c2", "c3"]
+    x_events = [e[0] + str(e[2]) for e in log if e[1] == "x.py"]
+    assert x_events == ["start1", "end1", "start2", "end2"]
+
+
+def test_slow_tool_hits_its_deadline(monkeypatch):
+    monkeypatch.setattr(agent_core, "execute_tool", lambda name, args: time.sleep(1) or "late")
+    runtime = AgentRuntime(tool_timeout=0.1)
+    start = time.perf_counter()
+    result = run_calls(runtime, [call("c1", "list_dir", path=".")])[0]
+    assert "timed out" in result["content"] and time.perf_counter() - start < 0.5
+
+
+def test_command_is_killed_at_its_deadline(monkeypatch):
+    monkeypatch.setattr(agent_core, "FULL_CONTROL", True)
+    runtime = AgentRuntime(tool_timeouts={"execute_command": 0.3})
+    command = f'"{sys.executable}" -u -c "import time; print(\'partial\'); time.sleep(5)"'
+    start = time.perf_counter()
+    result = run_calls(runtime, [call("c1", "execute_command", command=command)])[0]
+    assert "timed out" in result["content"] and time.perf_counter() - start < 2
+    assert "partial" in result["content"]  # what it printed before the deadline is kept
+    ok = run_calls(runtime, [call("c2", "execute_command", command=f'"{sys.executable}" -c "print(42)"')])[0]
+    assert "Exit code: 0" in ok["content"] and "42" in ok["content"]
+
+
+
+LAUNCHER = """import subprocess, sys, time
+subprocess.Popen([sys.executable, "-c", "import sys, time; time.sleep(0.5); open(sys.argv[1], 'w').close()", sys.argv[1]])
+time.sleep(5)
+"""
+
+
+def test_slow_launcher_is_abandoned_but_the_app_keeps_running(monkeypatch, tmp_path):
+    script, marker = tmp_path / "launcher.py", tmp_path / "app-ran"
+    script.write_text(LAUNCHER)
+    monkeypatch.setattr(system_control, "app_command", lambda name: f'"{sys.executable}" "{script}" "{marker}"')
+    runtime = AgentRuntime(tool_timeouts={"open_application": 0.3})
+    start = time.perf_counter()
+    result = run_calls(runtime, [call("c1", "open_application", application="editor")])[0]
+    assert "Launched editor" in result["content"] and time.perf_counter() - start < 2
+    deadline = time.time() + 3
+    while not marker.exists() and time.time() < deadline:
+        time.sleep(0.05)
+    assert marker.exists()  # the app the launcher started was not killed with it
+
+
+def test_async_tool_errors_become_that_calls_result(monkeypatch):
+    async def broken(args, timeout):
+        raise OSError("spawn failed")
+
+    monkeypatch.setattr(agent_runtime, "ASYNC_TOOLS", {"open_application": broken})
+    monkeypatch.setattr(agent_core, "execute_tool", lambda name, args: "a.txt")
+    results = run_calls(AgentRuntime(), [call("c1", "open_application", application="x"), call("c2", "list_dir", path=".")])
+    assert "spawn failed" in results[0]["content"] and results[1]["content"] == "a.txt"
+
+def slow_agent(monkeypatch, seconds):
+    def ask(user_text, conversation):
+        time.sleep(seconds)
+        return {"role": "assistant", "content": None, "tool_calls": [call("c", "list_dir", path=".")]}
+
+    monkeypatch.setattr(agent_core, "ask_agent", ask)
+    monkeypatch.setattr(agent_core, "execute_tool", lambda name, args: "a.txt")
+
+
+def test_task_budget_replaces_the_iteration_cap(monkeypatch):
+    slow_agent(monkeypatch, 0.05)
+    start = time.perf_counter()
+    reply = AgentRuntime(budget=0.5).run("loop forever")
+    assert "longer than" in reply and time.perf_counter() - start < 1.0
+
+
+def test_cancel_from_another_thread(monkeypatch):
+    slow_agent(monkeypatch, 0.05)
+    runtime = AgentRuntime(budget=30)
+    assert not runtime.cancel()
+    threading.Timer(0.3, runtime.cancel).start()
+    start = time.perf_counter()
+    assert runtime.run("loop forever") == "Task cancelled."
+    assert time.perf_counter() - start < 1.0 and not runtime.running
+    monkeypatch.setattr(agent_core, "ask_agent", lambda text, convo: {"role": "assistant", "content": "Done."})
+    assert runtime.run("next task") == "Done."  # the runtime is reusable after a cancel
@@ -0,0 +1,52 @@
+import time
+import openai
+import pytest
+from benchmarks.stub_openai_server import StubServer
+from modules.api_client import httpx, make_client, backoff_delay
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+@pytest.fixture
+def server():
+    server = StubServer(latency=0.0).start()
+    yield server
+    server.shutdown()
+
+
+def test_call_types_share_one_keepalive_connection(server):
+    client = make_client(server.base_url)
+    chat = client.with_options(timeout=5)
+    voice = client.with_options(timeout=10)
+    for _ in range(3):
+        voice.audio.transcriptions.create(model="whisper-1", file=("speech.wav", b"\0" * 1000))
+        reply = chat.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+    assert reply.choices[0].message.content == "Stub reply to: hello"
+    assert server.stats == {"connections": 1, "requests": 6, "failures": 0}
+
+
+def test_failed_requests_are_retried(server):
+    server.fail_rate = 1.0
+    client = make_client(server.base_url, retries=2)
+    with pytest.raises(openai.InternalServerError):
+        client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+    assert server.stats["requests"] == 3  # first try + two retries
+
+    server.fail_rate = 0.0
+    assert client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES).choices
+
+
+def test_hung_request_times_out(server):
+    server.hang, server.hang_rate = 5.0, 1.0
+    client = make_client(server.base_url).with_options(timeout=httpx.Timeout(0.3, connect=1.0))
+    start = time.perf_counter()
+    with pytest.raises(openai.APITimeoutError):
+        client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+    assert time.perf_counter() - start < 1.0
+    assert server.stats["requests"] == 1  # timeouts are not retried
+
+
+def test_backoff_is_jittered_and_capped():
+    delays = [backoff_delay(3, base=0.25, cap=1.0) for _ in range(200)]
+    assert 0.0 <= min(delays) and max(delays) <= 1.0
+    assert len(set(delays)) > 100
@@ -0,0 +1,66 @@
+import pytest
+
+pipeline_module = pytest.importorskip("modules.assistant_pipeline")  # needs the audio stack
+AssistantPipeline = pipeline_module.AssistantPipeline
+
+
+class App:
+    def __init__(self):
+        self.modes = []
+
+    def set_mode(self, mode):
+        self.modes.append(mode)
+
+    def update_status(self, status):
+        pass
+
+
+class Feed:
+    """Stands in for a stage's input queue; the stage stops after the last item"""
+
+    def __init__(self, stop_event, *items):
+        self.stop_event, self.items = stop_event, list(items)
+
+    def get(self):
+        item = self.items.pop(0)
+        if not self.items:
+            self.stop_event.set()
+        return item
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    monkeypatch.setattr(pipeline_module, "stop_speaking", lambda: None)
+    monkeypatch.setattr(pipeline_module, "cancel_agent", lambda: False)
+    return AssistantPipeline(App())
+
+
+def test_turn_cancelled_during_transcription_is_released(pipeline, monkeypatch):
+    def transcribe(audio):
+        pipeline.cancel()  # Escape while the audio is being transcribed
+        return "open notepad"
+
+    monkeypatch.setattr(pipeline_module, "transcribe_audio", transcribe)
+    turn = pipeline._new_turn()
+    pipeline.utterances = Feed(pipeline.stop_event, (turn, b"audio", 0.0))
+    pipeline.transcribe_stage()
+    assert pipeline.busy_turn is None and pipeline.transcripts.empty()
+
+
+def test_stale_transcript_is_dropped_and_released(pipeline):
+    turn = pipeline._new_turn()
+    pipeline.busy_turn = turn
+    pipeline.interrupt()  # a newer turn started before the transcript was answered
+    pipeline.transcripts = Feed(pipeline.stop_event, (turn, "what time is it", 0.0, 0.0))
+    pipeline.respond_stage()
+    assert pipeline.busy_turn is None and pipeline.replies.empty()
+
+
+def test_spoken_turn_goes_back_to_idle(pipeline, monkeypatch):
+    monkeypatch.setattr(pipeline_module, "speak_text", lambda reply, wait=False: None)
+    monkeypatch.setattr(pipeline_module, "wait_for_speech", lambda: None)
+    turn = pipeline._new_turn()
+    pipeline.busy_turn = turn
+    pipeline.replies = Feed(pipeline.stop_event, (turn, "Done.", 0.0))
+    pipeline.speak_stage()
+    assert pipeline.busy_turn is None and pipeline.app.modes == ["speaking", "idle"]
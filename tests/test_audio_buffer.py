@@ -0,0 +1,27 @@
+import threading
+import numpy as np
+from modules.audio_buffer import RingBuffer
+
+
+def test_read_across_wraparound():
+    ring = RingBuffer(8)
+    ring.write(np.arange(6))
+    ring.write(np.arange(6, 11))
+    assert ring.written == 11
+    assert ring.oldest() == 3
+    assert ring.read(3, 11).tolist() == list(range(3, 11))
+    assert ring.read(7, 10).tolist() == [7, 8, 9]
+
+
+def test_read_clamps_to_held_range():
+    ring = RingBuffer(4)
+    ring.write(np.arange(10))
+    assert ring.read(0).tolist() == [6, 7, 8, 9]
+    assert ring.read(12, 20).size == 0
+
+
+def test_wait_for_wakes_on_write():
+    ring = RingBuffer(16)
+    threading.Timer(0.05, lambda: ring.write(np.ones(4))).start()
+    assert ring.wait_for(4, timeout=2.0)
+    assert not ring.wait_for(100, timeout=0.01)
@@ -0,0 +1,40 @@
+import wave
+import numpy as np
+from modules.audio_encoding import resample, encode_for_upload
+
+RATE = 44100
+
+
+def tone(freq, seconds=1.0, amplitude=10000):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (np.sin(2 * np.pi * freq * t) * amplitude).astype(np.int16)
+
+
+def level_db(samples, amplitude=10000):
+    rms = np.sqrt(np.mean(samples[500:-500].astype(np.float64) ** 2))
+    return 20 * np.log10(rms / (amplitude / np.sqrt(2)))
+
+
+def test_resample_keeps_speech_band_and_removes_aliases():
+    assert len(resample(tone(1000), RATE, 16000)) == 16000
+    assert abs(level_db(resample(tone(1000), RATE, 16000))) < 0.1
+    assert abs(level_db(resample(tone(3500), RATE, 16000))) < 0.1
+    # Above the new Nyquist frequency the tone must not fold back into the band
+    assert level_db(resample(tone(12000), RATE, 16000)) < -60
+
+
+def test_resample_preserves_timing():
+    clicks = np.zeros(RATE, dtype=np.int16)
+    clicks[[4410, 22050]] = 20000
+    out = resample(clicks, RATE, 16000)
+    peaks = sorted(np.argsort(np.abs(out.astype(np.int32)))[-2:])
+    assert [abs(p - e) <= 1 for p, e in zip(peaks, (1600, 8000))] == [True, True]
+
+
+def test_wav_upload_is_16k_and_smaller():
+    upload = encode_for_upload(tone(440, seconds=2.0), RATE, fmt="wav")
+    assert upload.name == "speech.wav"
+    with wave.open(upload, 'rb') as wf:
+        assert wf.getframerate() == 16000
+        assert wf.getnframes() == 32000
+    assert upload.getbuffer().nbytes < 2 * RATE * 2 / 2.7
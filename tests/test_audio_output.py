@@ -0,0 +1,36 @@
+import os
+import time
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from modules.audio_output import PlaybackWorker, OUTPUT_RATE
+
+
+def _silence(seconds):
+    return b"\0\0" * int(OUTPUT_RATE * seconds)
+
+
+def test_wait_returns_when_queued_audio_has_played():
+    worker = PlaybackWorker()
+    worker.start()
+    started = time.monotonic()
+    audio = _silence(0.4)
+    for i in range(0, len(audio), 4800):
+        worker.enqueue(audio[i:i + 4800])
+    assert worker.wait(timeout=5)
+    assert 0.35 <= time.monotonic() - started < 1.0
+    assert not worker.busy
+
+
+def test_cancel_discards_queue_and_unblocks_wait():
+    worker = PlaybackWorker()
+    worker.start()
+    worker.enqueue(_silence(2.0))
+    worker.enqueue(_silence(2.0))
+    time.sleep(0.1)
+    assert worker.busy
+    worker.cancel()
+    assert worker.wait(timeout=0.5)
+    # The worker keeps serving new audio after a cancel
+    worker.enqueue(_silence(0.1))
+    assert worker.wait(timeout=2)
@@ -0,0 +1,55 @@
+import threading
+import time
+import pytest
+from modules import agent_core, agent_runtime, command_parser
+from modules.agent_runtime import AgentRuntime
+from modules.command_parser import Command, parse_command
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Open notepad", ("open_application", {"name": "notepad"})),
+    ("Hey Commandly, could you please launch the calculator for me?", ("open_application", {"name": "calculator"})),
+    ("fire up VS Code", ("open_application", {"name": "code"})),
+    ("open the file explorer window", ("open_application", {"name": "explorer"})),
+    ("search the web for python tutorials", ("search_web", {"query": "python tutorials"})),
+    ("look up the latest news online", ("search_web", {"query": "the latest news"})),
+    ("Google cheap flights to Paris.", ("search_web", {"query": "cheap flights to paris"})),
+])
+def test_simple_commands_map_to_tools(text, expected):
+    command = parse_command(text)
+    assert command is not None and (command.tool, command.args) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "open my downloads folder",  # not an app
+    "search the code for todo comments",  # not a web search
+    "find all python files in the project",
+    "open notepad and write hello",  # more than one step
+    "what is the best code editor",
+    "start the local web server",
+])
+def test_everything_else_goes_to_the_llm(text):
+    assert parse_command(text) is None
+
+
+def test_failed_command_hands_over_to_the_agent(monkeypatch):
+    monkeypatch.setattr(agent_runtime, "get_agent_runtime", lambda: AgentRuntime())
+    search = Command("search_web", {"query": "cats"}, "Searching the web for cats.")
+    monkeypatch.setattr(agent_core, "execute_tool", lambda tool, args: "🔍 Searching for cats")
+    assert command_parser.run_command(search) == "Searching the web for cats."
+    monkeypatch.setattr(agent_core, "execute_tool", lambda tool, args: "❌ No browser")
+    assert command_parser.run_command(search) is None
+
+
+def test_command_has_a_deadline_and_can_be_cancelled(monkeypatch):
+    runtime = AgentRuntime(tool_timeout=0.2)
+    monkeypatch.setattr(agent_runtime, "get_agent_runtime", lambda: runtime)
+    monkeypatch.setattr(agent_core, "execute_tool", lambda tool, args: time.sleep(2) or "🔍 late")
+    search = Command("search_web", {"query": "cats"}, "Searching the web for cats.")
+    start = time.perf_counter()
+    assert command_parser.run_command(search) is None and time.perf_counter() - start < 1  # timed out
+    runtime.tool_timeout = 10
+    threading.Timer(0.2, runtime.cancel).start()  # Escape or barge-in
+    start = time.perf_counter()
+    assert command_parser.run_command(search) == "Task cancelled." and time.perf_counter() - start < 1
+    assert not runtime.running
@@ -0,0 +1,118 @@
+import threading
+from modules import conversation
+from modules.conversation import ConversationManager, estimate_tokens
+
+
+def fake_summarize(summary, messages):
+    return " | ".join(filter(None, [summary] + [(m["content"] or "")[:8] for m in messages]))
+
+
+def test_estimate_counts_text_and_tool_calls():
+    assert estimate_tokens({"role": "user", "content": "x" * 40}) == 14
+    call = {"role": "assistant", "content": None, "tool_calls": [{"id": "1", "function": {"name": "f"}}]}
+    assert estimate_tokens(call) > estimate_tokens({"role": "assistant", "content": None})
+
+
+def test_history_stays_under_budget_and_is_summarised():
+    convo = ConversationManager("sys", budget=200, summarize=fake_summarize)
+    for i in range(50):
+        convo.extend([{"role": "user", "content": f"question {i} " + "q" * 80},
+                      {"role": "assistant", "content": f"answer {i} " + "a" * 80}])
+        history = [m for m in convo.messages() if m["role"] != "system"]
+        assert sum(estimate_tokens(m) for m in history) <= 200
+    assert convo.wait(5)
+    messages = convo.messages([{"role": "user", "content": "next"}])
+    assert messages[0]["content"] == "sys"
+    assert messages[1]["role"] == "system" and "question" in messages[1]["content"]
+    assert messages[-2]["content"].startswith("answer 49")
+    assert messages[-1]["content"] == "next"
+    assert convo.evicted > 0
+
+
+def test_tool_results_stay_with_their_assistant_message():
+    convo = ConversationManager("sys", budget=60, summarize=fake_summarize)
+    convo.add("user", "list files " + "x" * 60)
+    convo.add("assistant", None, tool_calls=[{"id": "c1", "type": "function",
+                                              "function": {"name": "list_dir", "arguments": "{}"}}])
+    convo.add("tool", "a.txt\nb.txt", tool_call_id="c1")
+    convo.add("user", "thanks " + "y" * 120)
+    convo.wait(5)
+    roles = [m["role"] for m in convo.messages()]
+    assert "tool" not in roles and roles[-1] == "user"  # the whole first turn went together
+    assert convo.messages()[-1]["content"].startswith("thanks")
+
+
+def test_building_a_request_does_not_wait_for_the_summary():
+    release = threading.Event()
+
+    def slow_summarize(summary, messages):
+        release.wait(5)
+        return "summary"
+
+    convo = ConversationManager("sys", budget=50, summarize=slow_summarize)
+    for i in range(5):
+        convo.extend([{"role": "user", "content": "u" * 100}, {"role": "assistant", "content": "a" * 100}])
+    assert len(convo.messages()) == 3  # system + latest turn, summary still pending
+    assert not convo.wait(0.05)
+    release.set()
+    assert convo.wait(5)
+    assert convo.messages()[1]["content"].endswith("summary")
+
+
+def test_failed_summary_keeps_the_previous_one(monkeypatch):
+    monkeypatch.setattr(conversation, "SUMMARY_RETRY_S", 0.01)
+    calls = []
+
+    def flaky(summary, messages):
+        calls.append(len(messages))
+        if len(calls) > 1:
+            raise RuntimeError("offline")
+        return "first"
+
+    convo = ConversationManager("sys", budget=50, summarize=flaky)
+    convo.extend([{"role": "user", "content": "u" * 100}, {"role": "user", "content": "v" * 100}])
+    convo.wait(5)
+    convo.add("user", "w" * 100)
+    convo.wait(5)
+    assert convo.summary == "first"
+    assert [m["content"][0] for m in convo.messages() if m["role"] == "user"] == ["v", "w"]  # sent as is
+
+
+def test_failed_summaries_are_retried_and_their_turns_kept(monkeypatch):
+    monkeypatch.setattr(conversation, "SUMMARY_RETRY_S", 0.01)
+    monkeypatch.setattr(conversation, "SUMMARY_ATTEMPTS", 2)
+    online = threading.Event()
+
+    def flaky(summary, messages):
+        if not online.is_set():
+            raise RuntimeError("offline")
+        return fake_summarize(summary, messages)
+
+    convo = ConversationManager("sys", budget=120, summarize=flaky, keep_first=True)
+    convo.add("user", "task: tidy up")
+    for i in range(3):
+        convo.add("user", f"step {i} " + "s" * 150)
+    assert convo.wait(5) and convo.summary == ""  # gave up for now
+    contents = [m["content"] for m in convo.messages()]
+    assert contents[1].startswith("task:") and [c[:6] for c in contents[2:]] == ["step 0", "step 1", "step 2"]
+    online.set()
+    convo.add("user", "step 3 " + "s" * 150)  # the next message retries what failed
+    assert convo.wait(5)
+    assert convo.summary == "step 0 s | step 1 s"
+    assert [m["content"][:6] for m in convo.messages()[2:]] == ["task: ", "step 2", "step 3"]
+
+
+def test_agent_steps_are_evicted_but_the_task_is_kept():
+    convo = ConversationManager("sys", budget=120, summarize=fake_summarize, keep_first=True)
+    convo.add("user", "task: tidy the downloads folder")
+    for i in range(10):
+        convo.extend([{"role": "assistant", "content": None,
+                       "tool_calls": [{"id": f"c{i}", "type": "function",
+                                       "function": {"name": "list_dir", "arguments": "{}"}}]},
+                      {"role": "tool", "tool_call_id": f"c{i}", "content": "f" * 120}])
+    convo.wait(5)
+    history = [m for m in convo.messages() if m["role"] != "system"]
+    assert history[0]["content"].startswith("task:")
+    assert history[1]["role"] == "assistant" and history[1]["tool_calls"][0]["id"] == history[2]["tool_call_id"]
+    assert history[-1]["tool_call_id"] == "c9"
+    assert convo.evicted >= 8
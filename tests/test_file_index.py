@@ -0,0 +1,83 @@
+import os
+import pytest
+from modules.tools.file_index import FileIndex, build_trigrams
+
+
+@pytest.fixture
+def tree(tmp_path):
+    files = ["src/config.py", "src/app/config_loader.py", "src/app/main.py", "docs/configuration.md",
+             "README.md", "node_modules/pkg/config.js", ".git/config", "src/.hidden/config.py"]
+    for name in files:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x")
+    old = 1_000_000_000
+    for folder, _, _ in os.walk(tmp_path):
+        os.utime(folder, (old, old))  # settled long ago, so mtimes are trusted
+    return tmp_path
+
+
+def index_for(tree, tmp_path_factory):
+    return FileIndex(str(tree), path=str(tmp_path_factory.mktemp("cache") / "index.json"))
+
+
+def test_trigram_postings(tmp_path):
+    trigrams, offsets, ids = build_trigrams(["abcd", "bcx"])
+    postings = {int(t): list(ids[offsets[k]:offsets[k + 1]]) for k, t in enumerate(trigrams)}
+    code = lambda s: (ord(s[0]) << 16) | (ord(s[1]) << 8) | ord(s[2])
+    assert postings == {code("abc"): [0], code("bcd"): [0], code("bcx"): [1]}
+
+
+def test_search_ranks_and_skips_ignored_folders(tree, tmp_path_factory):
+    index = index_for(tree, tmp_path_factory)
+    hits = [os.path.relpath(p, tree) for p in index.search("CONFIG")]
+    assert hits == [os.path.join("src", "config.py"), os.path.join("docs", "configuration.md"),
+                    os.path.join("src", "app", "config_loader.py")]
+    assert index.search("config", limit=1) == [os.path.join(str(tree), "src", "config.py")]
+    assert [os.path.basename(p) for p in index.search("confg_loader")] == ["config_loader.py"]  # misspelt
+    assert [os.path.basename(p) for p in index.search("ma")] == ["main.py"]
+    assert index.search("nothing like it") == []
+
+
+def test_wildcard_queries_match_like_glob(tree, tmp_path_factory):
+    index = index_for(tree, tmp_path_factory)
+    hits = [os.path.relpath(p, tree) for p in index.search("*.py")]
+    assert hits == [os.path.join("src", "app", "main.py"), os.path.join("src", "config.py"),
+                    os.path.join("src", "app", "config_loader.py")]  # shortest name first
+    assert [os.path.basename(p) for p in index.search("conf*.md")] == ["configuration.md"]
+    assert [os.path.basename(p) for p in index.search("ma?n")] == ["main.py"]
+    assert index.search("*.txt") == []
+
+
+def test_refresh_rescans_only_changed_folders_and_survives_restart(tree, tmp_path_factory):
+    index = index_for(tree, tmp_path_factory)
+    assert index.rescanned == 0 and len(index) == 0  # nothing saved yet
+    assert index.refresh(force=True) and index.rescanned == 4 and len(index) == 5
+    (tree / "src" / "app" / "settings.py").write_text("x")
+    os.utime(tree / "src" / "app", (1_500_000_000, 1_500_000_000))
+    assert index.search("settings") == []  # within the refresh interval
+    assert index.refresh(force=True) and index.rescanned == 1
+    assert index.search("settings") == [os.path.join(str(tree), "src", "app", "settings.py")]
+    assert not index.refresh(force=True) and index.rescanned == 0
+    (tree / "src" / "app" / "main.py").unlink()
+    os.utime(tree / "src" / "app", (1_600_000_000, 1_600_000_000))
+    assert index.refresh(force=True) and index.search("main") == []
+
+    index.flush()
+    restarted = FileIndex(str(tree), path=index.path)
+    assert len(restarted) == 5
+    assert not restarted.refresh(force=True) and restarted.rescanned == 0
+
+
+def test_recently_changed_folders_are_rechecked_without_resaving(tree, tmp_path_factory):
+    index = index_for(tree, tmp_path_factory)
+    assert index.refresh(force=True)
+    index.flush()
+    (tree / "docs" / "notes.md").write_text("x")  # docs' mtime is now: within the racy window
+    assert index.refresh(force=True) and index.rescanned == 1
+    index.flush()
+    saver = index._saver
+    assert not index.refresh(force=True) and index.rescanned == 1  # read again, nothing new
+    assert index._saver is saver  # and not saved again
+    (tree / "docs" / "todo.md").write_text("x")
+    assert index.refresh(force=True) and index.search("todo") == [os.path.join(str(tree), "docs", "todo.md")]
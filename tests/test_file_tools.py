@@ -0,0 +1,204 @@
+import os
+from modules.tools import file_tools
+from modules.tools.file_tools import (apply_patch, edit_range, list_dir, read_numbered, read_text, search_content,
+                                      text_stats)
+
+SOURCE = "def greet(name):\n    return 'hi ' + name\n\n\ndef color():\n    return 'blue'\n"
+
+
+def write(tmp_path, text, name="mod.py", newline="\n"):
+    path = str(tmp_path / name)
+    with open(path, "w", encoding="utf-8", newline=newline) as f:
+        f.write(text)
+    return path
+
+
+def read(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def test_search_replace_block(tmp_path):
+    path = write(tmp_path, SOURCE)
+    result = apply_patch(path, "<<<<<<< SEARCH\n    return 'blue'\n=======\n    return 'green'\n>>>>>>> REPLACE")
+    assert result.startswith("✅")
+    assert read(path) == SOURCE.replace("blue", "green")
+
+
+def test_ambiguous_or_missing_search_is_rejected(tmp_path):
+    path = write(tmp_path, SOURCE)
+    assert "matches 2 places" in apply_patch(path, "<<<<<<< SEARCH\n    return\n=======\n    pass\n>>>>>>> REPLACE")
+    assert "not found" in apply_patch(path, "<<<<<<< SEARCH\nnope\n=======\nx\n>>>>>>> REPLACE")
+    assert read(path) == SOURCE
+
+
+def test_unified_diff_with_stale_line_numbers(tmp_path):
+    path = write(tmp_path, SOURCE)
+    patch = ("--- a/mod.py\n+++ b/mod.py\n"
+             "@@ -1,2 +1,3 @@\n def greet(name):\n-    return 'hi ' + name\n+    name = name.title()\n+    return 'hello ' + name\n"
+             "@@ -40,2 +41,2 @@\n def color():\n-    return 'blue'\n+    return 'red'\n")
+    assert apply_patch(path, patch).startswith("✅")
+    assert read(path) == ("def greet(name):\n    name = name.title()\n    return 'hello ' + name\n\n\n"
+                          "def color():\n    return 'red'\n")
+
+
+def test_unified_diff_lines_that_look_like_file_headers(tmp_path):
+    path = write(tmp_path, "select 1;\n-- old comment\nselect 2;\n", name="query.sql")
+    patch = ("--- a/query.sql\n+++ b/query.sql\n"
+             "@@ -1,3 +1,3 @@\n select 1;\n--- old comment\n+++ new comment\n select 2;\n")
+    assert apply_patch(path, patch).startswith("✅")
+    assert read(path) == "select 1;\n++ new comment\nselect 2;\n"
+
+
+def test_patch_that_breaks_python_is_not_written(tmp_path):
+    path = write(tmp_path, SOURCE)
+    result = apply_patch(path, "<<<<<<< SEARCH\n    return 'blue'\n=======\n    return 'blue'(\n>>>>>>> REPLACE")
+    assert "does not compile" in result
+    assert read(path) == SOURCE
+    assert os.listdir(tmp_path) == ["mod.py"]  # no temporary file left behind
+
+
+def test_crlf_files_keep_their_line_endings(tmp_path):
+    path = write(tmp_path, SOURCE, newline="\r\n")
+    apply_patch(path, "<<<<<<< SEARCH\n    return 'blue'\n=======\n    return 'green'\n>>>>>>> REPLACE")
+    assert read(path) == SOURCE.replace("blue", "green").replace("\n", "\r\n")
+
+
+def test_unified_diff_creates_new_file(tmp_path):
+    path = str(tmp_path / "notes.txt")
+    assert apply_patch(path, "--- /dev/null\n+++ b/notes.txt\n@@ -0,0 +1,2 @@\n+one\n+two\n").startswith("✅")
+    assert read(path) == "one\ntwo\n"
+
+
+def test_edit_range_replaces_and_inserts(tmp_path):
+    path = write(tmp_path, SOURCE)
+    assert edit_range(path, 6, 6, "    return 'teal'").startswith("✅")
+    assert edit_range(path, 1, 0, "# colors\n").startswith("✅")
+    assert read(path) == "# colors\n" + SOURCE.replace("blue", "teal")
+    assert "outside" in edit_range(path, 50, 52, "x")
+
+
+def test_list_dir_pages_sorts_and_filters(tmp_path):
+    for i in range(25):
+        (tmp_path / f"f{i:02d}.txt").write_text("x" * i)
+    (tmp_path / "sub").mkdir()
+    (tmp_path / ".hidden").write_text("")
+    names, cursor = [], None
+    while True:
+        page = list_dir(str(tmp_path), limit=10, cursor=cursor)
+        if not page[-1].startswith("…"):
+            break
+        names += page[:-1]
+        cursor = page[-1].split("pass cursor ")[1].split(" for the next page")[0]
+    names += page
+    assert names == ["📁 sub/"] + [f"📄 f{i:02d}.txt" for i in range(25)]  # each entry exactly once
+    assert list_dir(str(tmp_path), sort="size", limit=2)[:2] == ["📄 f24.txt", "📄 f23.txt"]
+    assert list_dir(str(tmp_path), sort="size", kind="file", reverse=True, limit=1)[0] == "📄 f00.txt"
+    assert list_dir(str(tmp_path), pattern="F1*", details=True)[0].split()[:3] == ["📄", "f10.txt", "10"]
+    assert list_dir(str(tmp_path), cursor="oops")[0].startswith("Error: invalid cursor")
+
+
+def test_list_dir_cache_follows_folder_mtime(tmp_path, monkeypatch):
+    (tmp_path / "a.txt").write_text("")
+    assert list_dir(str(tmp_path)) == ["📄 a.txt"]
+    (tmp_path / "b.txt").write_text("")
+    assert list_dir(str(tmp_path)) == ["📄 a.txt", "📄 b.txt"]  # the folder's mtime changed
+    mtime = os.stat(tmp_path).st_mtime_ns
+    (tmp_path / "c.txt").write_text("")
+    os.utime(tmp_path, ns=(mtime, mtime))
+    assert list_dir(str(tmp_path)) == ["📄 a.txt", "📄 b.txt"]  # cached while the mtime says nothing changed
+    monkeypatch.setattr(file_tools, "LIST_CACHE_S", 0)
+    assert list_dir(str(tmp_path)) == ["📄 a.txt", "📄 b.txt", "📄 c.txt"]
+
+
+def test_ranged_reads_use_the_line_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_tools, "LINE_INDEX_STEP", 4)  # checkpoints every 4 lines
+    lines = [f"line {i}" for i in range(1, 51)]
+    path = write(tmp_path, "\n".join(lines) + "\n", name="big.log", newline="\r\n")
+    assert read_text(path, start=3, end=4) == "line 3\nline 4\n"
+    assert read_text(path, start=30, end=33) == "\n".join(lines[29:33]) + "\n"
+    assert read_text(path, head=2) == "line 1\nline 2\n" and read_text(path, tail=1) == "line 50\n"
+    assert read_text(path, start=49) == "line 49\nline 50\n" and read_text(path, start=70) == ""
+    assert read_text(path, byte_start=8, byte_end=14) == "line 2"
+    assert text_stats(path) == {"size": len(read(path)), "lines": 50}
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        f.write("line 51\r\nline 52")  # an appended log is indexed from where the last pass stopped
+    assert read_text(path, tail=2) == "line 51\nline 52" and text_stats(path)["lines"] == 52
+    write(tmp_path, "a\nb\n", name="big.log")  # rewritten: indexed again
+    assert read_text(path, start=2) == "b\n" and text_stats(path)["lines"] == 2
+    assert read_text(str(tmp_path / "missing.log"), tail=5).startswith("Error reading file")
+
+
+def test_read_numbered_is_bounded(tmp_path):
+    path = write(tmp_path, "".join(f"row {i}\n" for i in range(1, 1001)), name="rows.txt")
+    shown = read_numbered(path, max_lines=3).split("\n")
+    assert shown == [f"[{path}: lines 1-3 of 1000 (7,893 bytes); pass start/end or tail to read other lines]",
+                     "   1| row 1", "   2| row 2", "   3| row 3"]
+    assert read_numbered(path, start=500, end=501).split("\n")[1:] == [" 500| row 500", " 501| row 501"]
+    assert read_numbered(path, tail=2).split("\n")[1:] == [" 999| row 999", "1000| row 1000"]
+    assert read_numbered(write(tmp_path, SOURCE)) == "\n".join(
+        f"{n:4d}| {line}" for n, line in enumerate(SOURCE.split("\n")[:-1], 1))  # whole file: no header
+
+
+
+def test_large_files_are_read_without_counting_every_line(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_tools, "LINE_COUNT_MAX_BYTES", 0)  # every file counts as large
+    path = write(tmp_path, "".join(f"row {i}\n" for i in range(1, 1001)), name="huge.log")
+    assert read_numbered(path, max_lines=2).split("\n")[0] == (
+        f"[{path}: lines 1-2 (7,893 bytes); pass start/end or tail to read other lines]")
+    assert read_numbered(path, tail=2).split("\n") == [
+        f"[{path}: last 2 lines (7,893 bytes); pass start/end to read numbered lines]", "   …| row 999", "   …| row 1000"]
+    assert file_tools._line_index(path).size == 0  # neither read scanned the whole file
+    assert read_text(path, tail=1) == "row 1000\n" and read_text(path, tail=5000).startswith("row 1\n")
+    assert text_stats(path)["lines"] == 1000
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("row 1001\n")  # indexed and only appended to: numbered from the new bytes alone
+    assert read_numbered(path, tail=1).split("\n")[1:] == ["1001| row 1001"]
+
+def search_tree(tmp_path, extra=0):
+    files = {"pkg/render.py": "import os\n\ndef render_page(page):\n    return page\n",
+             "pkg/views.py": "from pkg.render import render_page\n\nprint(render_page(1))\n",
+             "pkg/rendering_notes.txt": "prerender_page is not the same\n",
+             "build/out.py": "def render_page(): pass\n",
+             "logo.png": "def render_page\n",
+             "blob.dat": "render_page\0\0binary",
+             ".gitignore": "build/\n*.log\n"}
+    files.update({f"many/m{i}.py": f"x = {i}\n" for i in range(extra)})
+    for name, text in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return str(tmp_path)
+
+
+def test_search_content_ranks_definitions_and_skips_ignored_and_binary(tmp_path):
+    result = search_content("render_page", search_tree(tmp_path), context=1)
+    lines = result.split("\n")
+    assert lines[0].startswith("4 matching lines in 3 of")
+    assert lines[1] == os.path.join("pkg", "render.py") + ":3"
+    assert ">   3| def render_page(page):" in lines
+    assert "build" not in result and "logo" not in result and "blob" not in result
+    assert result.index("views.py") < result.index("rendering_notes.txt")  # whole words first
+
+
+def test_search_content_regex_include_and_errors(tmp_path):
+    root = search_tree(tmp_path)
+    result = search_content(r"def \w+\(page\)", root, regex=True, include="*.py", context=0)
+    assert result.split("\n")[1:] == [os.path.join("pkg", "render.py") + ":3", ">   3| def render_page(page):"]
+    assert search_content("RENDER_PAGE", root, case_sensitive=True).startswith("No matches")
+    assert search_content("(", root, regex=True).startswith("Error: invalid regular expression")
+
+
+def test_case_sensitive_search_finds_capitalised_literals(tmp_path):
+    (tmp_path / "shapes.py").write_text("class MyClass:\n    pass\n\nmyclass = MyClass()\n")
+    result = search_content("MyClass", str(tmp_path), case_sensitive=True, context=0)
+    assert result.startswith("2 matching lines in 1 of 1 files") and ">   1| class MyClass:" in result
+    assert search_content("MYCLASS", str(tmp_path), case_sensitive=True).startswith("No matches")
+
+
+def test_search_content_uses_worker_processes_for_many_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_tools, "SEARCH_WORKERS", 2)
+    root = search_tree(tmp_path, extra=300)
+    result = search_content("x = 29", root, limit=3)
+    assert result.startswith("11 matching lines in 11 of 304 files; showing the best 3")  # 29, 290-299
+    assert search_content("render_page", root).startswith("4 matching lines in 3 of 304 files")
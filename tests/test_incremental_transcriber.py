@@ -0,0 +1,79 @@
+import time
+import wave
+import numpy as np
+from modules.incremental_transcriber import IncrementalTranscriber, client_transcriber, stitch
+from modules.vad import VoiceActivityDetector, START, PAUSE, END
+
+RATE = 16000
+WORDS = {1.0: "open the", 1.5: "project", 2.0: "folder"}
+
+
+class StubTranscriptions:
+    """Local stand-in for client.audio.transcriptions: names a clip by its duration"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def create(self, model, file, language):
+        self.calls += 1
+        with wave.open(file, 'rb') as wf:
+            seconds = wf.getnframes() / wf.getframerate()
+        time.sleep(self.latency)
+        word = WORDS[min(WORDS, key=lambda d: abs(d - seconds))]
+        return type("Transcript", (), {"text": f" {word} "})()
+
+
+class StubClient:
+    def __init__(self, latency):
+        self.audio = type("Audio", (), {})()
+        self.audio.transcriptions = StubTranscriptions(latency)
+
+
+def test_stitch_joins_pause_split_sentences():
+    assert stitch(["Open the.", "project folder."]) == "Open the project folder."
+    assert stitch(["Done.", "Next one.", ""]) == "Done. Next one."
+
+
+def test_segments_are_transcribed_while_speaking():
+    client = StubClient(latency=0.2)
+    transcriber = IncrementalTranscriber(client_transcriber(client, fmt="wav"), RATE, min_segment_s=0.5)
+    t = np.arange(int(2.5 * RATE)) / RATE
+    speech = (np.sin(2 * np.pi * 200 * t) * 6000).astype(np.int16)
+
+    transcriber.add_segment(speech[:RATE])
+    transcriber.add_segment(speech[:int(1.5 * RATE)])
+    time.sleep(0.3)  # the user keeps talking; earlier segments finish meanwhile
+    ended = time.perf_counter()
+    transcriber.finish(speech[:2 * RATE])  # speaker kept going past the cap: no pause
+    assert transcriber.result(timeout=5) == "open the project folder"
+    # Only the last segment was outstanding when speech ended
+    assert time.perf_counter() - ended < 0.35
+    assert client.audio.transcriptions.calls == 3
+
+
+def test_short_segments_are_carried_into_the_next():
+    calls = []
+    transcriber = IncrementalTranscriber(lambda s, r: calls.append(len(s)) or "x", RATE, min_segment_s=1.0)
+    transcriber.add_segment(np.zeros(RATE // 2, dtype=np.int16))
+    transcriber.add_segment(np.zeros(RATE // 2, dtype=np.int16))
+    transcriber.add_segment(np.zeros(RATE // 4, dtype=np.int16))
+    transcriber.finish(np.zeros(RATE // 20, dtype=np.int16))
+    transcriber.result()
+    # The trailing pad is sent along with the carried audio, never on its own
+    assert calls == [RATE, RATE // 4 + RATE // 20]
+
+
+def test_vad_reports_pauses_inside_an_utterance():
+    t = np.arange(RATE) / RATE
+    word = np.sin(2 * np.pi * 220 * t) * 6000
+    gap = np.zeros(int(0.35 * RATE))
+    audio = np.concatenate((np.zeros(RATE // 2), word, gap, word, np.zeros(RATE)))
+    audio = (audio + np.random.default_rng(0).standard_normal(len(audio)) * 30).astype(np.int16)
+    vad = VoiceActivityDetector(rate=RATE, hangover_ms=600, pause_ms=250)
+    events = []
+    for i in range(0, len(audio), 512):
+        events.extend(vad.push(audio[i:i + 512]))
+    # One pause in the gap between words, one in the trailing silence before END
+    assert [kind for kind, _ in events] == [START, PAUSE, PAUSE, END]
+    assert 1.5 * RATE <= events[1][1] <= 1.85 * RATE
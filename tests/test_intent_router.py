@@ -0,0 +1,38 @@
+import pytest
+from modules.intent_router import IntentClassifier, IntentRouter, KeywordMatcher, features, load_examples
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return IntentClassifier.fit(*load_examples())
+
+
+def test_triggers_match_whole_words_only():
+    matcher = KeywordMatcher()
+    for text in ["decode this message", "what is your address", "brunch ideas", "a startup story"]:
+        assert matcher.match(text) == [], text
+    assert matcher.match("Open Notepad") == ["open", "notepad"]
+    assert matcher.match("launching chrome and two files") == ["launching", "chrome", "files"]
+    assert matcher.match("open it in visual   studio") == ["open", "visual   studio"]
+
+
+def test_features_include_word_pairs_and_char_grams():
+    feats = features("Open notepad")
+    assert "open" in feats and "open notepad" in feats and "#<op" in feats
+
+
+def test_classifier_generalises_to_unseen_requests(classifier):
+    assert classifier.probability("please open the snipping tool") > 0.5
+    assert classifier.probability("install the flask package") > 0.5
+    assert classifier.probability("what is the capital of italy") < 0.5
+    assert classifier.probability("tell me a joke about cats") < 0.5
+
+
+def test_router_uses_keywords_only_when_the_model_is_unsure(classifier):
+    router = IntentRouter(classifier, agent_threshold=0.65, chat_threshold=0.35)
+    route = router.route("open notepad")
+    assert route.mode == "agent" and route.source == "model" and route.confidence >= 0.65
+    unsure = IntentRouter(classifier, agent_threshold=1.01, chat_threshold=-0.01)
+    assert unsure.route("open notepad") == ("agent", 1.0, "keywords", ("open", "notepad"))
+    assert unsure.route("decode this").mode == "chat"
+    assert IntentRouter(None).route("what color is it").mode == "agent"  # keywords alone
@@ -0,0 +1,51 @@
+import sys
+import time
+import pytest
+from modules.tools import job_runner, system_control
+from modules.tools.job_runner import JobRunner, OutputBuffer
+
+PYTHON = f'"{sys.executable}" -u -c'
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    runner = JobRunner(max_jobs=2)
+    monkeypatch.setattr(job_runner, "get_job_runner", lambda: runner)
+    monkeypatch.setattr(system_control, "get_job_runner", lambda: runner)
+    yield runner
+    runner.kill_all()
+
+
+def test_output_buffer_keeps_head_and_tail():
+    buffer = OutputBuffer(head=4, tail=6)
+    for chunk in ["abc", "defgh", "ijklmnop", "qr"]:
+        buffer.write(chunk)
+    assert buffer.read() == ("abcd\n[… 8 characters dropped …]\nmnopqr", 8, 18)
+    assert buffer.read(15) == ("pqr", 0, 18)  # only what came after an earlier read
+    assert buffer.head_len + buffer.tail_len == 10
+
+
+def test_jobs_stream_run_concurrently_and_can_be_killed(runner):
+    slow = runner.start(f'{PYTHON} "import time; print(\'tick\'); time.sleep(30)"')
+    quick = runner.start(f'{PYTHON} "import sys; print(\'out\'); sys.stderr.write(\'err\')"')
+    with pytest.raises(RuntimeError, match="already running"):
+        runner.start("echo third")
+    assert quick.wait(10) and quick.report() == "Exit code: 0\nOutput:\nout\n\nErrors:\nerr\n"
+    deadline = time.time() + 10
+    while "tick" not in slow.stdout.read()[0] and time.time() < deadline:
+        time.sleep(0.05)
+    polled = job_runner.poll_job(slow.id)
+    assert polled.startswith(f"{slow.id} [running") and "tick" in polled  # before the job ends
+    assert "(no new output)" in job_runner.poll_job("1")
+    assert job_runner.kill_job(slow.id).startswith(f"🛑 Killed {slow.id}") and slow.wait(5)
+    assert [job.status().split(",")[0] for job in runner.list()] == ["job1 [killed", "job2 [exit code 0"]
+    assert job_runner.poll_job("job9") == "❌ No job job9"
+
+
+def test_execute_command_keeps_output_of_a_timed_out_command(runner):
+    result = system_control.execute_command(f'{PYTHON} "import time; print(\'partial\'); time.sleep(30)"',
+                                            timeout=1)
+    assert result.startswith("❌ Command timed out (1s limit)") and "partial" in result
+    started = system_control.execute_command(f'{PYTHON} "print(42)"', background=True)
+    assert started.startswith("⏳ Started job2")
+    assert "42" in job_runner.wait_job("job2", 10) and not runner.get("job2").running
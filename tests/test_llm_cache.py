@@ -0,0 +1,94 @@
+import time
+import pytest
+from benchmarks.stub_openai_server import StubServer
+from modules import agent_core, api_client, gpt_integration, llm_cache
+from modules.llm_cache import LLMCache, request_key
+
+MESSAGES = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "open notepad"}]
+
+
+def test_key_is_canonical():
+    reordered = [{"content": m["content"], "role": m["role"]} for m in MESSAGES]
+    assert request_key("m", 0, MESSAGES) == request_key("m", 0.0, reordered)
+    assert request_key("m", 0, MESSAGES) != request_key("m", 0.2, MESSAGES)
+    assert request_key("m", 0, MESSAGES) != request_key("m", 0, MESSAGES[1:])
+
+
+def test_replies_persist_and_expire(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    LLMCache(path, enabled=True).put("k", "hello")
+    cache = LLMCache(path, ttl=0.2, enabled=True)
+    assert cache.get("k") == "hello"
+    time.sleep(0.3)
+    assert cache.get("k") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_replies_are_evicted(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"), max_bytes=250, enabled=True)
+    for name in "abc":
+        cache.put(name, name * 100)
+        time.sleep(0.01)
+    assert cache.get("a") is None  # oldest went first to make room for "c"
+    cache.get("b")
+    time.sleep(0.01)
+    cache.put("d", "d" * 100)
+    assert cache.get("b") is not None and cache.get("c") is None
+    assert cache.stats()["bytes"] <= 250
+
+
+def test_sampling_requests_bypass_the_cache_unless_enabled(tmp_path):
+    assert not LLMCache(str(tmp_path / "a.sqlite3"), enabled=True).cacheable(0.7)
+    assert LLMCache(str(tmp_path / "a.sqlite3"), enabled=True).cacheable(0)
+    assert LLMCache(str(tmp_path / "b.sqlite3"), enabled=True, nondeterministic=True).cacheable(0.7)
+    assert not LLMCache(str(tmp_path / "c.sqlite3"), enabled=False).cacheable(0)
+    assert LLMCache(str(tmp_path / "d.sqlite3"), enabled=True).cacheable(0.7, policy=True)
+
+
+@pytest.fixture
+def stub_api(monkeypatch, tmp_path):
+    server = StubServer(latency=0.0, reply="Opening Notepad.").start()
+    monkeypatch.setattr(api_client, "_client", api_client.make_client(server.base_url))
+    monkeypatch.setattr(api_client, "_views", {})
+    monkeypatch.setattr(llm_cache, "_cache", LLMCache(str(tmp_path / "llm.sqlite3"), enabled=True, nondeterministic=True))
+    yield server
+    server.shutdown()
+
+
+def test_repeated_requests_skip_the_api(stub_api):
+    assert gpt_integration.chat_completion_json(MESSAGES) == "Opening Notepad."
+    assert gpt_integration.chat_completion_json(MESSAGES) == "Opening Notepad."
+    assert "".join(gpt_integration.chat_completion_stream(MESSAGES)) == "Opening Notepad."
+    assert "".join(gpt_integration.chat_completion_stream(MESSAGES)) == "Opening Notepad."
+    assert stub_api.stats["requests"] == 2  # one per temperature / max_tokens setting
+    assert llm_cache.get_llm_cache().stats()["hits"] == 2
+
+
+@pytest.fixture
+def default_policy(stub_api, monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_cache, "_cache", LLMCache(str(tmp_path / "policy.sqlite3"), enabled=True))
+    return stub_api
+
+
+def test_repeated_agent_command_reuses_the_plan(default_policy):
+    assert agent_core.ask_agent("open notepad")["content"] == "Opening Notepad."
+    assert agent_core.ask_agent("open notepad")["content"] == "Opening Notepad."
+    assert default_policy.stats["requests"] == 1
+    conversation = agent_core.new_conversation("open notepad")
+    conversation.add("assistant", "Opening Notepad.")
+    conversation.add("user", "now close it")
+    agent_core.ask_agent("", conversation)  # a later turn depends on what happened, so it is sampled
+    agent_core.ask_agent("", conversation)
+    assert default_policy.stats["requests"] == 3
+
+
+def test_chat_is_keyed_on_the_latest_messages(default_policy):
+    def chat(*history):
+        return gpt_integration.chat_completion(
+            [MESSAGES[0]] + [{"role": role, "content": text} for role, text in history])
+
+    chat(("user", "what's up"), ("assistant", "Not much."), ("user", "thanks"), ("assistant", "Any time."), ("user", "hi"))
+    chat(("user", "open paint"), ("assistant", "Any time."), ("user", "hi"))
+    assert default_policy.stats["requests"] == 1
+    chat(("user", "open paint"), ("assistant", "Done."), ("user", "hi"))
+    assert default_policy.stats["requests"] == 2
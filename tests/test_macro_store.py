@@ -0,0 +1,82 @@
+import json
+import pytest
+from modules import agent_core, agent_runtime
+from modules.agent_runtime import AgentRuntime
+from modules.macro_store import MacroStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MacroStore(path=str(tmp_path / "macros.json"), enabled=True)
+
+
+def test_slots_let_a_macro_serve_similar_requests(store):
+    entry = store.record("Please open Spotify and Discord", [[("open_application", {"name": "Spotify"}),
+                                                              ("open_application", {"name": "discord"})]],
+                         "Spotify and Discord are open.")
+    assert entry["key"] == "open {slot0} and {slot1}"
+    match = store.match("open steam and paint")
+    # Slot values take the letter case the recorded ones had
+    assert [step["args"]["name"] for step in match.turns[0]] == ["Steam", "paint"]
+    assert match.reply == "Steam and Paint are open." and not match.recorded
+    assert store.match("open spotify and discord").recorded
+    assert store.match("open steam") is None
+    reloaded = MacroStore(path=store.path, enabled=True)  # persisted as JSON
+    assert reloaded.match("open steam and paint").slots == ("steam", "paint")
+
+
+def test_paths_and_file_contents_become_slots(store):
+    store.record("create notes.txt on my desktop saying hello",
+                 [[("write_file", {"path": "C:/Users/me/Desktop/notes.txt", "content": "hello"})]], "Done.")
+    match = store.match("create todo.md on my desktop saying buy milk")
+    assert match is None  # two words where the slot had one
+    match = store.match("create todo.md on my desktop saying goodbye")
+    assert match.turns == [[{"name": "write_file",
+                             "args": {"path": "C:/Users/me/Desktop/todo.md", "content": "goodbye"}}]]
+
+
+def test_tasks_that_read_or_ran_commands_are_not_recorded(store):
+    assert store.record("what is in my downloads", [[("list_dir", {"path": "Downloads"})]], "3 files.") is None
+    assert store.record("spotify", [[("open_application", {"name": "spotify"})]], "Done.") is None
+    assert store.entries() == []
+
+
+def test_invalidate_and_size_cap(store):
+    store.max_entries = 2
+    for app in ["chrome", "paint", "word"]:
+        store.record(f"start {app} please now", [[("open_application", {"name": app})]], "ok")
+    assert len(store.entries()) == 1  # one template, re-recorded
+    store.record("open chrome", [[("open_application", {"name": "chrome"})]], "ok")
+    store.used(store.match("start paint"))
+    store.record("install flask", [[("install_package", {"name": "flask"})]], "ok")
+    assert sorted(e["key"] for e in store.entries()) == ["install {slot0}", "start {slot0}"]
+    assert store.invalidate("start excel") and not store.invalidate("start excel")
+    assert store.invalidate("install {slot0}")
+    assert store.entries() == []
+
+
+def test_runtime_records_replays_and_falls_back(monkeypatch, store):
+    monkeypatch.setattr(agent_runtime, "get_macro_store", lambda: store)
+    searched, asked = [], []
+
+    def execute(name, args):
+        searched.append(args["query"])
+        return "❌ No browser" if args["query"] == "broken" else f"🔍 Searching for {args['query']}"
+
+    def ask(user_text, conversation):
+        asked.append(user_text)
+        if conversation.messages()[-1]["role"] == "tool":
+            return {"role": "assistant", "content": "Done."}
+        call = {"id": "c1", "type": "function",
+                "function": {"name": "search_web", "arguments": json.dumps({"query": "cats"})}}
+        return {"role": "assistant", "content": None, "tool_calls": [call]}
+
+    monkeypatch.setattr(agent_core, "execute_tool", execute)
+    monkeypatch.setattr(agent_core, "ask_agent", ask)
+    runtime = AgentRuntime()
+    assert runtime.run("look for cats on the internet") == "Done." and len(asked) == 2
+    assert runtime.run("look for cats on the internet") == "Done." and len(asked) == 2  # no model turn
+    assert runtime.run("look for dogs on the internet") == "Done." and searched == ["cats", "cats", "dogs"]
+    # A failed step hands over to the model, which sees the replayed calls and their results
+    assert runtime.run("look for broken on the internet") == "Done." and len(asked) == 3
+    assert searched[-1] == "broken" and store.match("look for cats on the internet") is not None
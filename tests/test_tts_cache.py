@@ -0,0 +1,43 @@
+from modules.tts_cache import TTSCache, cache_key
+
+
+def test_key_depends_on_text_voice_and_model():
+    assert cache_key("Done.", "nova", "tts-1") == cache_key(" Done. ", "nova", "tts-1")
+    assert cache_key("Done.", "nova", "tts-1") != cache_key("Done.", "alloy", "tts-1")
+    assert cache_key("Done.", "nova", "tts-1") != cache_key("Done.", "nova", "tts-1-hd")
+
+
+def test_memory_and_disk_hits(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=1000, memory_bytes=100)
+    assert cache.get("Done.", "nova", "tts-1") is None
+    cache.put("Done.", "nova", "tts-1", b"abc")
+    assert cache.get("Done.", "nova", "tts-1") == b"abc"
+    # A fresh instance finds the entry on disk
+    reopened = TTSCache(str(tmp_path), max_bytes=1000, memory_bytes=100)
+    assert reopened.get("Done.", "nova", "tts-1") == b"abc"
+    assert reopened.stats()["hits"] == 1
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=250, memory_bytes=0)
+    cache.put("one", "nova", "tts-1", b"1" * 100)
+    cache.put("two", "nova", "tts-1", b"2" * 100)
+    assert cache.get("one", "nova", "tts-1") is not None  # "two" is now least recent
+    cache.put("three", "nova", "tts-1", b"3" * 100)
+    assert cache.get("two", "nova", "tts-1") is None
+    assert cache.get("one", "nova", "tts-1") is not None
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_warm_only_fetches_missing_phrases(tmp_path):
+    cache = TTSCache(str(tmp_path))
+    cache.put("Goodbye!", "nova", "tts-1", b"bye")
+    calls = []
+
+    def synthesize(text):
+        calls.append(text)
+        yield text.encode()
+
+    assert cache.warm(["Goodbye!", "Done."], "nova", "tts-1", synthesize) == 1
+    assert calls == ["Done."]
+    assert cache.get("Done.", "nova", "tts-1") == b"Done."
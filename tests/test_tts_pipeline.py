@@ -0,0 +1,57 @@
+import threading
+import time
+from modules.sentences import SentenceBuffer, split_sentences, stream_sentences
+from modules.tts_pipeline import SpeechPipeline
+
+
+def test_split_sentences_keeps_abbreviations_and_numbers():
+    text = "Version 3.5 is out, e.g. on Dr. Smith's machine. Ready? Yes!"
+    assert split_sentences(text) == ["Version 3.5 is out, e.g. on Dr. Smith's machine.", "Ready?", "Yes!"]
+
+
+def test_split_sentences_bounds_chunk_length():
+    pieces = split_sentences("word " * 2000, max_chars=300)
+    assert len(pieces) > 1
+    assert all(len(p) <= 300 for p in pieces)
+
+
+def test_sentence_buffer_releases_closed_sentences():
+    buf = SentenceBuffer()
+    assert buf.feed("It costs 3") == []
+    assert buf.feed(".50 today. Th") == ["It costs 3.50 today."]
+    assert buf.flush() == ["Th"]
+
+
+def test_stream_sentences_releases_each_sentence_before_the_stream_ends():
+    produced = []
+
+    def tokens():
+        for token in ["Hello", " there.", " The total", " is 3", ".5 now.", " Bye"]:
+            produced.append(token)
+            yield token
+
+    stream = stream_sentences(tokens())
+    assert next(stream) == "Hello there."
+    assert len(produced) == 3  # only read up to the token after the full stop
+    assert list(stream) == ["The total is 3.5 now.", "Bye"]
+
+
+def test_pipeline_plays_in_order_while_synthesising_ahead():
+    active = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def synthesize(text):
+        with lock:
+            active.append(text)
+            peak[0] = max(peak[0], len(active))
+        time.sleep(0.05 if text == "one" else 0.01)
+        yield text.encode()
+        with lock:
+            active.remove(text)
+
+    played = []
+    stats = SpeechPipeline(synthesize, played.append, lookahead=2).run(["one", "two", "three"])
+    assert played == [b"one", b"two", b"three"]
+    assert peak[0] == 2
+    assert stats["sentences"] == 3 and stats["time_to_first_audio"] is not None
@@ -0,0 +1,45 @@
+import numpy as np
+from modules.vad import VoiceActivityDetector, frame_features
+
+RATE = 16000
+
+
+def _noise(seconds, level, seed=0):
+    return np.random.default_rng(seed).standard_normal(int(seconds * RATE)) * level
+
+
+def _tone(seconds, level):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return np.sin(2 * np.pi * 220 * t) * level
+
+
+def _pcm(x):
+    return np.clip(x, -32768, 32767).astype(np.int16)
+
+
+def test_frame_features_shapes():
+    energy, zcr = frame_features(_pcm(_tone(1.0, 8000)), 320)
+    assert energy.shape == zcr.shape == (50,)
+    assert np.allclose(energy, -15.3, atol=0.3)  # 8000/32768 sine, RMS ≈ -15.3 dBFS
+    assert np.all(zcr < 0.05)
+
+
+def test_detects_burst_with_preroll_and_hangover():
+    audio = _noise(3.0, 100)
+    audio[int(1.0 * RATE):int(2.0 * RATE)] += _tone(1.0, 6000)
+    vad = VoiceActivityDetector(rate=RATE, hangover_ms=300, preroll_ms=200)
+    segments = vad.detect(_pcm(audio), block=512)
+    assert len(segments) == 1
+    start, end, decided = segments[0]
+    assert 0.75 * RATE <= start <= 1.0 * RATE
+    assert 2.0 * RATE <= end <= 2.2 * RATE
+    assert decided - 2.0 * RATE <= 0.4 * RATE
+
+
+def test_steady_noise_never_holds_utterance_open():
+    # A loud background that starts mid-stream must eventually be absorbed
+    audio = _noise(20.0, 50)
+    audio[int(2.0 * RATE):] += _noise(18.0, 3000, seed=1)
+    segments = VoiceActivityDetector(rate=RATE, max_utterance_s=30).detect(_pcm(audio), block=512)
+    assert segments and segments[0][2] is not None
+    assert segments[0][2] < 15 * RATE
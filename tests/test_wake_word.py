@@ -0,0 +1,67 @@
+import numpy as np
+from modules.wake_word import MFCC, WakeWordDetector, subsequence_dtw, enroll, load_templates
+
+RATE = 16000
+
+
+def _glide(f0, f1, seconds):
+    t = np.arange(int(seconds * RATE)) / RATE
+    phase = 2 * np.pi * (f0 * t + (f1 - f0) * t * t / (2 * seconds))
+    return np.sin(phase) + 0.5 * np.sin(2 * phase)
+
+
+def _word(*parts):
+    """A synthetic 'word': a sequence of pitch glides"""
+    return np.concatenate([_glide(*p) for p in parts])
+
+
+WAKE = _word((300, 900, 0.25), (900, 500, 0.2), (500, 500, 0.15))
+OTHER = _word((1500, 2500, 0.3), (2500, 2000, 0.3))
+
+
+def _pcm(*parts, noise=40, seed=0):
+    x = np.concatenate([p * 8000 for p in parts])
+    x += np.random.default_rng(seed).standard_normal(len(x)) * noise
+    return np.clip(x, -32768, 32767).astype(np.int16)
+
+
+def _stream(detector, audio, block=1024):
+    hits = []
+    detector.reset(0)
+    for offset in range(0, len(audio), block):
+        hits.extend(detector.push(audio[offset:offset + block]))
+    return hits
+
+
+def test_mfcc_frames_are_unit_vectors():
+    feats = MFCC(RATE)(_pcm(WAKE))
+    assert feats.shape == (58, 12)
+    assert np.allclose(np.linalg.norm(feats, axis=1), 1.0, atol=1e-4)
+
+
+def test_dtw_finds_template_inside_longer_stream():
+    mfcc = MFCC(RATE)
+    template = mfcc(_pcm(WAKE))
+    stream = mfcc(_pcm(np.zeros(RATE // 2), OTHER, WAKE, np.zeros(RATE // 4)))
+    score, end = subsequence_dtw(template, stream)
+    assert score < 0.1
+    # The match ends where the wake word ends (frame index, 10 ms hop)
+    assert abs(end - (len(stream) - 25 - 1)) <= 3
+
+
+def test_detector_fires_on_wake_word_only():
+    detector = WakeWordDetector.from_audio([_pcm(WAKE, seed=1)], RATE, threshold=0.25)
+    slower = np.interp(np.arange(0, len(WAKE), 0.9), np.arange(len(WAKE)), WAKE)
+    silence = np.zeros(RATE // 2)
+    hits = _stream(detector, _pcm(silence, slower, silence, seed=2))
+    assert len(hits) == 1
+    assert abs(hits[0] - (len(silence) + len(slower))) < 0.1 * RATE
+    assert _stream(detector, _pcm(silence, OTHER, silence, seed=3)) == []
+
+
+def test_enrolled_templates_are_trimmed_and_reloaded(tmp_path):
+    enroll(_pcm(np.zeros(RATE // 2), WAKE, np.zeros(RATE // 2)), RATE, directory=str(tmp_path))
+    enroll(_pcm(WAKE), RATE, directory=str(tmp_path))
+    templates = load_templates(RATE, directory=str(tmp_path))
+    assert len(templates) == 2
+    assert abs(len(templates[0]) - len(templates[1])) <= 2